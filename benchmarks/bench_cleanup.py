@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+"""清理路径：使用伪造的 procfs 和 cgroup 目录树，不需要 root 权限。"""
+
+import subprocess
+import threading
+
+from core import system_monitor
+from fakes import fake_procfs, fake_cgroup_tree, MB
+
+
+def _use_fake_procfs(monkeypatch, tmp_path):
+    drop_caches, compact_memory = fake_procfs(str(tmp_path))
+    stages = tuple((name, compact_memory if path == system_monitor.COMPACT_MEMORY_PATH else drop_caches,
+                    value, message)
+                   for name, path, value, message in system_monitor.LINUX_STAGES)
+    monkeypatch.setattr(system_monitor, 'LINUX_STAGES', stages)
+    # sync 会真实刷盘，与清理逻辑本身的开销无关
+    monkeypatch.setattr(subprocess, 'run', lambda *args, **kwargs: None)
+
+
+def bench_clean_memory_linux_tiered(bench, fake_kernel, monkeypatch, tmp_path):
+    _use_fake_procfs(monkeypatch, tmp_path)
+    write_proc = system_monitor._write_proc
+
+    def fake_write(path, value):
+        write_proc(path, value)
+        fake_kernel.drop(value)
+
+    monkeypatch.setattr(system_monitor, '_write_proc', fake_write)
+
+    def clean():
+        fake_kernel.used = 10 * 1024 * MB
+        success, result = system_monitor.clean_memory_linux(target_mb=600)
+        assert success and result['target_met']
+
+    # 包含等待释放曲线稳定的时间，迭代次数较少，但仍足够计算 p95
+    bench(clean, iterations=20, warmup=1)
+
+
+def bench_clean_memory_cgroups(bench, fake_kernel, tmp_path):
+    cgroups = ['batch.slice', 'system.slice/backup.service']
+    fake_cgroup_tree(str(tmp_path), cgroups)
+    config = {'reclaim_cgroups': cgroups, 'reclaim_target_mb': 128, 'cgroup_root': str(tmp_path)}
+
+    def clean():
+        success, result = system_monitor.clean_memory_cgroups(config)
+        assert success
+
+    bench(clean, iterations=200)
+
+
+class _CancelAfter:
+    """前 n 次 is_set() 返回 False，之后返回 True，模拟在回收中途取消。"""
+
+    def __init__(self, n):
+        self.remaining = n
+
+    def is_set(self):
+        self.remaining -= 1
+        return self.remaining < 0
+
+
+def bench_clean_memory_cgroups_cancelled(fake_kernel, tmp_path):
+    cgroups = ['batch.slice', 'system.slice/backup.service', 'user.slice']
+    fake_cgroup_tree(str(tmp_path), cgroups)
+    config = {'reclaim_cgroups': cgroups, 'reclaim_target_mb': 128, 'cgroup_root': str(tmp_path)}
+
+    success, result = system_monitor.clean_memory_cgroups(config)
+    assert success and [entry['cgroup'] for entry in result['cgroups']] == cgroups
+
+    # 处理完第一个 cgroup 后取消
+    cancel = _CancelAfter(1)
+    assert system_monitor.clean_memory_cgroups(config, cancel_event=cancel) == (False, "清理已取消。")
+    assert cancel.remaining < 0
+
+    cancel = threading.Event()
+    cancel.set()
+    success, result = system_monitor.clean_memory_cgroups(config, cancel_event=cancel)
+    assert not success
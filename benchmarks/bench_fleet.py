@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+"""多主机汇总：在本机回环地址上运行汇总端和多个 agent，采样器和清理执行器是伪造的。"""
+
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+
+from core import fleet
+from fakes import FakeKernel, MB
+
+AGENTS = 3
+
+
+class FakeSampler:
+    def subscribe(self, callback, resolution=None):
+        pass
+
+    def unsubscribe(self, callback):
+        pass
+
+
+class FakeExecutor:
+    def __init__(self):
+        self.submitted = []
+
+    def add_listener(self, callback):
+        pass
+
+    def remove_listener(self, callback):
+        pass
+
+    def submit(self, source='manual', timeout=None, **options):
+        self.submitted.append(source)
+
+
+@pytest.fixture
+def aggregator():
+    """在独立线程的事件循环中运行汇总端，返回 (汇总端, 实际监听地址)。结束时确认没有未处理的异常。"""
+    server = fleet.FleetAggregator('127.0.0.1:0')
+    loop = asyncio.new_event_loop()
+    errors = []
+    loop.set_exception_handler(lambda loop, context: errors.append(context))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    listener = asyncio.run_coroutine_threadsafe(server.start(), loop).result(5)
+    port = listener.sockets[0].getsockname()[1]
+    yield server, f'127.0.0.1:{port}'
+    asyncio.run_coroutine_threadsafe(server.close(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+    assert not errors, errors
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+def _sample(kernel):
+    return {'timestamp': time.time(), 'cpu_percent': kernel.cpu_percent(), 'mem_info': kernel.virtual_memory()}
+
+
+def bench_fleet_multi_agent_localhost(aggregator, fake_kernel):
+    server, address = aggregator
+    agents = [fleet.FleetAgent(address, hostname=f'host{i}', batch_seconds=0.05,
+                               sampler=FakeSampler(), executor=FakeExecutor())
+              for i in range(AGENTS)]
+    for i, agent in enumerate(agents):
+        agent.start()
+        agent._on_sample(_sample(FakeKernel(used=(4 + i * 4) * 1024 * MB)))
+    try:
+        _wait_for(lambda: all(host.samples for host in server.hosts.values()) and len(server.hosts) == AGENTS)
+        summary = fleet.query_summary(address)['summary']
+        assert summary['connected'] == AGENTS and not summary['stale']
+        # 内存压力最高的主机排在最前
+        assert [h['host'] for h in summary['top_pressure']] == ['host2', 'host1', 'host0']
+
+        assert fleet.request_remote_cleanup(address, 'host1')['ok']
+        _wait_for(lambda: agents[1].executor.submitted)
+        assert agents[1].executor.submitted == ['remote']
+        assert not agents[0].executor.submitted and not agents[2].executor.submitted
+    finally:
+        for agent in agents:
+            agent.stop()
+    _wait_for(lambda: all(host.writer is None for host in server.hosts.values()))
+
+
+def bench_fleet_rejects_malformed_frame(aggregator):
+    server, address = aggregator
+    host, port = fleet.parse_address(address)[1]
+    with socket.create_connection((host, port), timeout=5) as sock:
+        sock.sendall(fleet._json_frame(fleet.HELLO, {'host': 'broken', 'version': fleet.PROTOCOL_VERSION}))
+        sock.sendall(fleet.encode_frame(fleet.SAMPLES, b'\0' * (fleet.SAMPLE.size + 1)))
+        # 读完握手答复后，汇总端应当主动断开连接
+        received = b''
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            received += chunk
+    assert received.startswith(fleet.HEADER.pack(fleet.REPLY, 0, len(received) - fleet.HEADER.size))
+    assert server.hosts['broken'].writer is None and not server.hosts['broken'].samples
+    # 汇总端仍然可以正常应答
+    assert fleet.query_summary(address)['summary']['hosts'] == 1
+
+
+def bench_fleet_summary(bench):
+    server = fleet.FleetAggregator()
+    now = time.time()
+    for i in range(100):
+        host = server.hosts[f'host{i}'] = fleet.HostState(f'host{i}')
+        host.writer = object()
+        host.last_seen = now
+        host.samples.extend((now - (fleet.HOST_SAMPLES - n) * fleet.SAMPLE_RESOLUTION, 10.0, (i + n) % 100, 1024)
+                            for n in range(fleet.HOST_SAMPLES))
+    bench(lambda: server.summary(now=now), iterations=50)
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+"""热键状态机：每个按键事件 (按下+松开) 的处理开销，包括普通打字和命中热键的情况。"""
+
+from core.hotkey_engine import HotkeyEngine
+
+BINDINGS = {
+    "alt alt": "clean",
+    "ctrl+alt+c": "clean",
+    "ctrl+k ctrl+s": "settings",
+    "shift shift shift@400": "show",
+}
+
+
+def _events(engine, keys):
+    return [engine.code(name) for name in keys]
+
+
+def bench_hotkey_typing(bench):
+    engine = HotkeyEngine(BINDINGS)
+    codes = _events(engine, "the quick brown fox jumps over the lazy dog".replace(' ', '') + "shift")
+    now = [0.0]
+
+    def feed():
+        # 每次调用处理一个按键的按下和松开
+        now[0] += 0.05
+        code = codes[int(now[0] * 20) % len(codes)]
+        engine.press(code, now[0])
+        engine.release(code)
+
+    bench(feed, iterations=20000, warmup=100)
+
+
+def bench_hotkey_chord_match(bench):
+    engine = HotkeyEngine(BINDINGS)
+    ctrl, alt, c = engine.code('ctrl'), engine.code('alt'), engine.code('c')
+    now = [0.0]
+
+    def chord():
+        now[0] += 1.0
+        engine.press(ctrl, now[0])
+        engine.press(alt, now[0])
+        assert engine.press(c, now[0]) == "clean"
+        engine.release(c)
+        engine.release(alt)
+        engine.release(ctrl)
+
+    bench(chord, iterations=20000, warmup=100)
+
+
+def bench_hotkey_double_tap(bench):
+    engine = HotkeyEngine(BINDINGS)
+    alt = engine.code('alt')
+    now = [0.0]
+
+    def double_tap():
+        now[0] += 1.0
+        engine.press(alt, now[0])
+        engine.release(alt)
+        assert engine.press(alt, now[0] + 0.1) == "clean"
+        engine.release(alt)
+
+    bench(double_tap, iterations=20000, warmup=100)
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+
+"""进程排行榜：在 10000 个进程的缓存数据中选出前 K 个 (不含读取 /proc 的开销)。"""
+
+import random
+
+from core.process_leaderboard import ProcessLeaderboard, _Usage
+
+PROCESSES = 10000
+
+
+def _filled(sort_key):
+    board = ProcessLeaderboard(sort_key=sort_key)
+    rng = random.Random(42)
+    for pid in range(1, PROCESSES + 1):
+        usage = _Usage(pid)
+        usage.name = f"proc{pid}"
+        usage.rss = rng.randrange(1 << 30)
+        usage.uss = usage.rss // 2 if pid % 3 else None
+        usage.swap = rng.randrange(1 << 20)
+        board._usage[pid] = usage
+    return board
+
+
+def bench_leaderboard_rank_rss(bench):
+    board = _filled('rss')
+    bench(board._rank, iterations=200)
+
+
+def bench_leaderboard_rank_uss(bench):
+    board = _filled('uss')
+    bench(board._rank, iterations=200)
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+"""绘制路径：托盘图标更新 (缓存命中与数值变化) 和加速球的每帧绘制。"""
+
+from PySide6.QtGui import QImage
+
+
+def bench_tray_update_icon_steady(bench, qapp, fake_kernel):
+    from ui.tray_manager import TrayManager
+    tray = TrayManager(qapp)
+    bench(lambda: tray.update_icon(12.0, 63.4), iterations=2000)
+    tray.stats_bridge.stop()
+    tray.hide()
+
+
+def bench_tray_update_icon_varying(bench, qapp, fake_kernel):
+    from ui.tray_manager import TrayManager
+    tray = TrayManager(qapp)
+    values = [float(v) for v in range(100)]
+    index = [0]
+
+    def update():
+        index[0] = (index[0] + 1) % len(values)
+        tray.update_icon(values[-index[0]], values[index[0]])
+
+    # 预热一整轮，之后每个状态的图标都已缓存
+    bench(update, iterations=2000, warmup=len(values))
+    tray.stats_bridge.stop()
+    tray.hide()
+
+
+def bench_ball_paint(bench, qapp, fake_kernel):
+    from ui.accelerator_ball import AcceleratorBall
+    ball = AcceleratorBall()
+    ball.update_system_data({'cpu_percent': 35.0, 'mem_info': fake_kernel.virtual_memory()})
+    image = QImage(ball.size(), QImage.Format_ARGB32_Premultiplied)
+
+    def frame():
+        ball.advance_animation(0.016)
+        ball.render(image)
+
+    # ops_per_sec 即只计算绘制时的最高帧率
+    bench(frame, iterations=1000)
+    ball.deleteLater()
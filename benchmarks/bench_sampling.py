@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+"""采样路径：单次采样，以及一次样本分发给所有订阅者 (含历史数据写入)。"""
+
+from core import system_monitor
+from core.history import HistoryStore
+
+
+def bench_get_system_stats(bench, fake_kernel):
+    system_monitor.get_sampler().stop()
+    bench(system_monitor.get_system_stats, iterations=2000)
+
+
+def bench_sampler_publish(bench, fake_kernel):
+    sampler = system_monitor.SystemSampler()
+    history = HistoryStore(None)
+    # 不启动采样线程，直接测量一次分发的开销
+    sampler._subscribers = {history.record: 10.0, (lambda sample: None): 1.0, (lambda sample: None): 10.0}
+    sample = system_monitor._take_sample()
+
+    def publish():
+        sample['timestamp'] += 0.5
+        sampler._publish(sample)
+
+    bench(publish, iterations=2000)
+    history.close()
+
+
+def bench_metric_schedule_adapt(bench):
+    schedule = system_monitor._MetricSchedule(1.0)
+    values = [float(v % 100) for v in range(0, 700, 7)]
+    index = [0]
+
+    def adapt():
+        index[0] = (index[0] + 1) % len(values)
+        schedule.adapt(values[index[0]], 5.0, system_monitor.MAX_INTERVAL, 1.0)
+
+    bench(adapt, iterations=5000)
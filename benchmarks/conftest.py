@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+"""
+基准测试框架
+- 使用 Qt 的 offscreen 平台和伪造的 psutil/procfs，在没有桌面和 root 权限的环境下运行。
+- bench(func) 分轮测量每次调用的耗时 (中位数取最好的一轮，p95 取所有轮次的全部调用)、每秒次数，
+  以及每次调用的峰值内存分配和残留的内存块数。
+- 结果与 baselines.json 比较，中位耗时或峰值分配超过基线的 MEMCLEAN_BENCH_THRESHOLD 倍 (默认 1.5) 时失败。
+- 加上 --update-baselines 运行会把本次结果写入 baselines.json。
+"""
+
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pytest
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baselines.json')
+RESULTS_FILE = os.path.join(BENCH_DIR, 'results.json')
+DEFAULT_THRESHOLD = 1.5
+# 计时分成的轮数
+ROUNDS = 5
+# 耗时增加不超过这个微秒数、峰值分配低于这个字节数时不做比较，避免小数值上的抖动
+TIMING_SLACK_US = 2.0
+ALLOCATION_SLACK = 4096
+# 计算 p95 至少需要的计时次数，不足时不报告 p95
+MIN_P95_SAMPLES = 20
+
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+# 配置文件放在临时目录，不读写项目中的 config.json
+os.environ["MEMCLEAN_CONFIG"] = os.path.join(tempfile.mkdtemp(prefix="memclean-bench-"), "config.json")
+
+from fakes import FakeKernel  # noqa: E402
+
+_results = {}
+
+
+def pytest_addoption(parser):
+    parser.addoption("--update-baselines", action="store_true", help="把本次结果写入 baselines.json")
+
+
+def _load_baselines():
+    try:
+        with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    from PySide6.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+    yield app
+
+
+@pytest.fixture
+def fake_kernel(monkeypatch):
+    """用 FakeKernel 替换 psutil 的内存和 CPU 读数。"""
+    import psutil
+    kernel = FakeKernel()
+    monkeypatch.setattr(psutil, 'virtual_memory', kernel.virtual_memory)
+    monkeypatch.setattr(psutil, 'cpu_percent', kernel.cpu_percent)
+    return kernel
+
+
+@pytest.fixture
+def bench(request):
+    """
+    bench(func, iterations=200, warmup=10, name=None) -> dict
+    先计时，再在 tracemalloc 下单独跑一轮统计内存分配，两者互不干扰。
+    """
+    update = request.config.getoption("--update-baselines")
+    threshold = float(os.environ.get("MEMCLEAN_BENCH_THRESHOLD", DEFAULT_THRESHOLD))
+    baselines = _load_baselines()
+
+    def run(func, iterations=200, warmup=10, name=None):
+        name = name or request.node.name
+        for _ in range(warmup):
+            func()
+
+        # 与 timeit 一样分成几轮，取中位数最小的一轮，减少调度和变频带来的抖动
+        timings = None
+        all_timings = []
+        per_round = max(iterations // ROUNDS, 1)
+        for _ in range(ROUNDS):
+            round_timings = []
+            for _ in range(per_round):
+                start = time.perf_counter_ns()
+                func()
+                round_timings.append(time.perf_counter_ns() - start)
+            all_timings.extend(round_timings)
+            if timings is None or statistics.median(round_timings) < statistics.median(timings):
+                timings = round_timings
+
+        alloc_iterations = max(iterations // 10, 1)
+        tracemalloc.start()
+        peaks = []
+        blocks_before = sys.getallocatedblocks()
+        for _ in range(alloc_iterations):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            func()
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+        retained = (sys.getallocatedblocks() - blocks_before) / alloc_iterations
+        tracemalloc.stop()
+
+        median_us = statistics.median(timings) / 1000
+        result = {
+            'median_us': round(median_us, 2),
+            'p95_us': _p95_us(all_timings),
+            'ops_per_sec': round(1e6 / median_us, 1) if median_us else None,
+            'peak_alloc_bytes': int(statistics.median(peaks)),
+            'retained_blocks_per_call': round(retained, 2),
+        }
+        _results[name] = result
+
+        baseline = baselines.get(name)
+        if baseline and not update:
+            failures = []
+            if median_us > baseline['median_us'] * threshold and median_us - baseline['median_us'] > TIMING_SLACK_US:
+                failures.append(f"median {median_us:.1f}us > {threshold}x baseline {baseline['median_us']}us")
+            peak, base_peak = result['peak_alloc_bytes'], baseline.get('peak_alloc_bytes', 0)
+            if peak > ALLOCATION_SLACK and peak > base_peak * threshold:
+                failures.append(f"peak allocation {peak}B > {threshold}x baseline {base_peak}B")
+            if failures:
+                pytest.fail(f"{name} regressed: " + "; ".join(failures))
+        return result
+
+    return run
+
+
+def _p95_us(timings):
+    """最近秩法的 p95 (微秒)；次数太少时 p95 没有意义，返回 None。"""
+    if len(timings) < MIN_P95_SAMPLES:
+        return None
+    timings = sorted(timings)
+    return round(timings[math.ceil(0.95 * len(timings)) - 1] / 1000, 2)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not _results:
+        return
+    with open(RESULTS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(_results, f, indent=2, sort_keys=True)
+    if session.config.getoption("--update-baselines"):
+        baselines = _load_baselines()
+        baselines.update(_results)
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _results:
+        return
+    terminalreporter.section("benchmarks")
+    for name, result in sorted(_results.items()):
+        p95 = f"{result['p95_us']:>10.2f}us" if result['p95_us'] is not None else f"{'-':>12}"
+        terminalreporter.write_line(
+            f"{name:<40} median {result['median_us']:>10.2f}us  p95 {p95}  "
+            f"{result['ops_per_sec'] or 0:>10.1f}/s  peak {result['peak_alloc_bytes']:>8}B  "
+            f"retained {result['retained_blocks_per_call']:>6} blocks")
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+"""
+基准测试用的伪造系统层
+- FakeKernel 代替 psutil 的 virtual_memory/cpu_percent，数值可预测，写入 drop_caches 后按阶段“释放”内存。
+- fake_procfs 在临时目录中创建 drop_caches/compact_memory 文件，通过 system_monitor 的路径常量接入，
+  清理路径可以在没有 root 权限的情况下完整运行。
+- fake_cgroup_tree 创建一个最小的 cgroup v2 目录树，供 memory.reclaim 后端使用。
+"""
+
+import os
+from collections import namedtuple
+
+MB = 1024 * 1024
+
+FakeMemory = namedtuple('FakeMemory', 'total available percent used free')
+
+
+class FakeKernel:
+    """一台总内存 16GB 的伪造机器。"""
+
+    # 写入 drop_caches 的值对应释放的缓存量
+    RELEASE = {'1': 512 * MB, '2': 128 * MB, '3': 768 * MB}
+
+    def __init__(self, total=16 * 1024 * MB, used=10 * 1024 * MB):
+        self.total = total
+        self.used = used
+        self._cpu = 0
+
+    def virtual_memory(self):
+        free = self.total - self.used
+        return FakeMemory(self.total, free, self.used / self.total * 100, self.used, free)
+
+    def cpu_percent(self, interval=None):
+        # 在 0-100 之间循环变化，模拟有波动的负载
+        self._cpu = (self._cpu + 7) % 100
+        return float(self._cpu)
+
+    def drop(self, value):
+        self.used = max(self.used - self.RELEASE.get(value, 0), 0)
+
+
+def fake_procfs(directory):
+    """创建伪造的 /proc/sys/vm 文件，返回 (drop_caches 路径, compact_memory 路径)。"""
+    drop_caches = os.path.join(directory, 'drop_caches')
+    compact_memory = os.path.join(directory, 'compact_memory')
+    for path in (drop_caches, compact_memory):
+        with open(path, 'w') as f:
+            f.write('0\n')
+    return drop_caches, compact_memory
+
+
+def fake_cgroup_tree(root, cgroups, current=256 * MB):
+    """创建 cgroup v2 目录树：根目录的 cgroup.controllers，以及每个 cgroup 的 memory.current/memory.reclaim。"""
+    with open(os.path.join(root, 'cgroup.controllers'), 'w') as f:
+        f.write('cpu memory\n')
+    for name in cgroups:
+        path = os.path.join(root, name)
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, 'memory.current'), 'w') as f:
+            f.write(f'{current}\n')
+        open(os.path.join(path, 'memory.reclaim'), 'w').close()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+"""
+加速球绘制耗时测量
+- 离屏创建 AcceleratorBall，推进动画并渲染指定帧数，输出每帧 paintEvent 耗时的平均值/p95/最大值 (毫秒)。
+- 60 FPS 下每帧的预算为 16.7 毫秒，悬浮球只应占用其中很小一部分。
+- 用法: python benchmarks/measure_ball_paint.py [--frames 600]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication
+from PySide6.QtGui import QImage
+
+from ui.accelerator_ball import AcceleratorBall
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="测量加速球每帧的绘制耗时")
+    parser.add_argument("--frames", type=int, default=600, help="渲染的帧数")
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    ball = AcceleratorBall()
+    ball.update_system_data({'cpu_percent': 35.0, 'mem_info': type('mem', (), {'percent': 62.0})()})
+    image = QImage(ball.size(), QImage.Format_ARGB32_Premultiplied)
+
+    timings = []
+    for _ in range(args.frames):
+        ball.advance_animation(0.016)
+        image.fill(0)
+        start = time.perf_counter()
+        ball.render(image)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    report = {
+        'frames': args.frames,
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'p95_ms': round(timings[int(len(timings) * 0.95) - 1], 3),
+        'max_ms': round(timings[-1], 3),
+    }
+    print(json.dumps(report, indent=2))
+    app.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
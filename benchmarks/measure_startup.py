@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+"""
+启动耗时与空闲内存测量
+- 以 MEMCLEAN_STARTUP_PROBE 环境变量多次启动 main.py，收集从进程创建到托盘显示的耗时 (time_to_tray_ms)
+  和空闲一段时间后的常驻内存 (idle_rss_mb)，输出中位数/最小值/最大值。
+- 用法: python benchmarks/measure_startup.py [--runs 5] [--idle 3]
+- 在没有桌面的环境下可设置 QT_QPA_PLATFORM=offscreen。
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_once(idle_seconds):
+    env = dict(os.environ, MEMCLEAN_STARTUP_PROBE=str(idle_seconds))
+    proc = subprocess.run([sys.executable, os.path.join(ROOT, "main.py")], cwd=ROOT, env=env,
+                          capture_output=True, text=True, timeout=idle_seconds + 60)
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    raise RuntimeError(f"main.py did not report startup metrics (exit {proc.returncode}):\n{proc.stderr}")
+
+
+def summarize(samples, key):
+    values = [sample[key] for sample in samples]
+    return {'median': statistics.median(values), 'min': min(values), 'max': max(values)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="测量 MemClean 的启动耗时和空闲常驻内存")
+    parser.add_argument("--runs", type=int, default=5, help="启动次数")
+    parser.add_argument("--idle", type=float, default=3.0, help="托盘显示后空闲多少秒再读取常驻内存")
+    args = parser.parse_args(argv)
+
+    samples = [run_once(args.idle) for _ in range(args.runs)]
+    report = {
+        'runs': args.runs,
+        'time_to_tray_ms': summarize(samples, 'time_to_tray_ms'),
+        'idle_rss_mb': summarize(samples, 'idle_rss_mb'),
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
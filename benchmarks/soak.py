@@ -0,0 +1,436 @@
+# -*- coding: utf-8 -*-
+
+"""
+内存压力浸泡测试 (Linux)
+- 启动一组合成负载进程，在同样的负载下依次运行不同的清理策略，比较清理到底是帮了忙还是帮了倒忙：
+    * anon_hot   匿名内存，持续逐页写入 (活跃的工作集)
+    * anon_idle  匿名内存，写入一次后空闲
+    * filemap    mmap 映射文件并反复逐页读取 (页缓存被清掉后产生主缺页)
+    * reader     用 read() 反复顺序读取文件 (页缓存被清掉后需要重新读盘)
+    * cpu        小工作集上的 CPU 密集计算 (只受清理本身占用 CPU 的影响)
+- 策略：none (对照组)、manual (定时手动清理)、tiered (分级清理，达到目标后停止)、
+  auto (与无界面模式相同的预测式自动清理策略)。清理都经过 CleanupExecutor 和 clean_memory。
+- 每次清理记录释放量和耗时，并比较清理前后同样长的窗口内：
+  各负载的主缺页数、系统的 refault 数 (/proc/vmstat) 和各负载吞吐量的下降比例。
+- drop_caches 需要 root 权限；非 root 运行时可以用 --set linux_reclaim_backend=cgroup_reclaim 等配置。
+- 用法: sudo python benchmarks/soak.py [--strategies none,manual,tiered,auto] [--duration 120]
+                                       [--scale 1.0] [--output soak.json]
+"""
+
+import argparse
+import json
+import mmap
+import multiprocessing
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import psutil  # noqa: E402
+
+MB = 1024 * 1024
+PAGE = mmap.PAGESIZE
+# 记录负载计数和缺页的间隔 (秒)
+TICK_SECONDS = 0.25
+
+# (名称, 占物理内存的比例)，cpu 负载使用固定大小
+WORKLOADS = (
+    ('anon_hot', 0.20),
+    ('anon_idle', 0.20),
+    ('filemap', 0.25),
+    ('reader', 0.15),
+    ('cpu', None),
+)
+CPU_WORKING_SET_MB = 16
+
+# 策略名 -> (驱动方式, 覆盖的配置)
+STRATEGIES = {
+    'none': ('none', {}),
+    'manual': ('manual', {}),
+    'tiered': ('manual', {'clean_target_mb': 256}),
+    'auto': ('auto', {'auto_clean_enabled': True}),
+}
+
+VMSTAT_KEYS = ('pgmajfault', 'workingset_refault', 'workingset_refault_anon', 'workingset_refault_file')
+
+Snapshot = namedtuple('Snapshot', 'ts ops majflt pgmajfault refaults used_mb cached_mb')
+
+
+# --- 负载进程 ---
+def _anon_worker(counter, size_mb, hot):
+    buf = bytearray(size_mb * MB)
+    for offset in range(0, len(buf), PAGE):
+        buf[offset] = 1
+    if not hot:
+        while True:
+            time.sleep(1)
+    while True:
+        for offset in range(0, len(buf), PAGE):
+            buf[offset] ^= 1
+        counter.value += size_mb
+
+
+def _filemap_worker(counter, size_mb, path):
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        while True:
+            total = 0
+            for offset in range(0, len(m), PAGE):
+                total += m[offset]
+            counter.value += size_mb
+
+
+def _reader_worker(counter, size_mb, path):
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            f.seek(0)
+            while f.read(MB):
+                counter.value += 1
+
+
+def _cpu_worker(counter, size_mb):
+    import hashlib
+    data = os.urandom(size_mb * MB)
+    while True:
+        hashlib.sha1(data).digest()
+        counter.value += size_mb
+
+
+def _write_file(path, size_mb):
+    block = os.urandom(MB)
+    with open(path, 'wb') as f:
+        for _ in range(size_mb):
+            f.write(block)
+
+
+class Workloads:
+    """一组负载进程，吞吐量计数 (MB) 放在共享内存中，父进程直接读取。"""
+
+    def __init__(self, scale, directory):
+        self.scale = scale
+        self.directory = directory
+        self.names = [name for name, _ in WORKLOADS]
+        self.sizes = {}
+        self.processes = []
+        self.counters = []
+
+    def start(self):
+        total_mb = psutil.virtual_memory().total // MB
+        context = multiprocessing.get_context('fork')
+        for name, fraction in WORKLOADS:
+            size_mb = CPU_WORKING_SET_MB if fraction is None else max(int(total_mb * fraction * self.scale), 1)
+            self.sizes[name] = size_mb
+            counter = context.RawValue('d', 0.0)
+            if name in ('anon_hot', 'anon_idle'):
+                target, args = _anon_worker, (counter, size_mb, name == 'anon_hot')
+            elif name in ('filemap', 'reader'):
+                path = os.path.join(self.directory, f'{name}.dat')
+                if not os.path.exists(path) or os.path.getsize(path) != size_mb * MB:
+                    _write_file(path, size_mb)
+                target = _filemap_worker if name == 'filemap' else _reader_worker
+                args = (counter, size_mb, path)
+            else:
+                target, args = _cpu_worker, (counter, size_mb)
+            process = context.Process(target=target, args=args, name=f'soak-{name}', daemon=True)
+            process.start()
+            self.processes.append(process)
+            self.counters.append(counter)
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join(timeout=5)
+        self.processes = []
+        self.counters = []
+
+    def ops(self):
+        return tuple(counter.value for counter in self.counters)
+
+    def major_faults(self):
+        return tuple(_read_major_faults(process.pid) for process in self.processes)
+
+
+# --- 计数器 ---
+def _read_major_faults(pid):
+    """/proc/<pid>/stat 的第 12 个字段 majflt。"""
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            data = f.read()
+    except OSError:
+        return 0
+    # 进程名可能包含空格，从最后一个右括号之后开始数 (该处为第 3 个字段)
+    return int(data[data.rindex(')') + 2:].split()[9])
+
+
+def _read_vmstat():
+    values = {}
+    with open('/proc/vmstat', 'r') as f:
+        for line in f:
+            key, _, value = line.partition(' ')
+            if key in VMSTAT_KEYS:
+                values[key] = int(value)
+    return values
+
+
+def _snapshot(workloads):
+    vmstat = _read_vmstat()
+    mem = psutil.virtual_memory()
+    # 新内核区分 anon/file 两种 refault，旧内核只有一个总数
+    refaults = vmstat.get('workingset_refault',
+                          vmstat.get('workingset_refault_anon', 0) + vmstat.get('workingset_refault_file', 0))
+    return Snapshot(time.time(), workloads.ops(), workloads.major_faults(), vmstat.get('pgmajfault', 0),
+                    refaults, mem.used / MB, getattr(mem, 'cached', 0) / MB)
+
+
+def _window(timeline, start, end):
+    """返回 [start, end] 内的第一个和最后一个快照，少于两个时返回 None。"""
+    inside = [s for s in timeline if start <= s.ts <= end]
+    return (inside[0], inside[-1]) if len(inside) >= 2 else None
+
+
+def _rates(first, last):
+    seconds = last.ts - first.ts
+    return {
+        'ops': [(b - a) / seconds for a, b in zip(first.ops, last.ops)],
+        'majflt': sum(last.majflt) - sum(first.majflt),
+        'pgmajfault': last.pgmajfault - first.pgmajfault,
+        'refaults': last.refaults - first.refaults,
+    }
+
+
+# --- 策略 ---
+class StrategyRun:
+    """
+    在当前负载下运行一个策略并记录时间线和每一次清理。
+    :param mode: 'none' / 'manual' / 'auto'
+    :param config: 传给 clean_memory 的完整配置
+    """
+
+    def __init__(self, name, mode, config, workloads, manual_interval, timeout):
+        from core.cleanup_executor import CleanupExecutor
+        self.name = name
+        self.mode = mode
+        self.config = config
+        self.workloads = workloads
+        self.manual_interval = manual_interval
+        self.timeout = timeout
+        self.executor = CleanupExecutor()
+        self.executor.add_listener(self._on_cleanup)
+        self.timeline = []
+        self.handles = []
+        self._lock = threading.Lock()
+
+    def _on_cleanup(self, event, handle):
+        if event == 'submitted':
+            with self._lock:
+                self.handles.append(handle)
+
+    def run(self, duration):
+        from core.system_monitor import get_sampler
+        from core.history import HistoryStore
+        from core.auto_clean_policy import AutoCleanPolicy
+
+        sampler = get_sampler()
+        history = HistoryStore(None)
+        policy = AutoCleanPolicy.from_config(self.config)
+        sampler.subscribe(history.record)
+        started = time.time()
+        next_manual = started + self.manual_interval
+        next_check = started
+        try:
+            while time.time() - started < duration:
+                now = time.time()
+                self.timeline.append(_snapshot(self.workloads))
+                if self.mode == 'manual' and now >= next_manual:
+                    next_manual = now + self.manual_interval
+                    self.executor.submit(source='manual', timeout=self.timeout, config=self.config)
+                elif self.mode == 'auto' and now >= next_check:
+                    # 与 core.daemon.HeadlessDaemon._tick 的定时检查一致
+                    decision = policy.check(history, now)
+                    sampler.request_resolution(decision.next_check, duration=decision.next_check * 2)
+                    next_check = now + decision.next_check
+                    if decision.trigger and not self.executor.is_busy():
+                        self.executor.submit(source='auto', timeout=self.timeout, config=self.config)
+                        policy.commit(decision)
+                time.sleep(TICK_SECONDS)
+            # 等最后一次清理结束，结果才完整
+            current = self.executor.current()
+            if current is not None:
+                current.result(timeout=self.timeout)
+            self.timeline.append(_snapshot(self.workloads))
+        finally:
+            sampler.unsubscribe(history.record)
+            history.close()
+            self.executor.shutdown()
+        return started
+
+    def cleanups(self, window):
+        """每次清理的释放量、耗时，以及清理前后同样长的窗口内的缺页和吞吐量变化。"""
+        records = []
+        names = self.workloads.names
+        for handle in self.handles:
+            if not handle.done():
+                continue
+            success, result = handle.result()
+            record = {
+                'source': handle.source,
+                'outcome': handle.outcome(),
+                'latency_ms': round((handle.finished_at - handle.submitted_at) * 1000, 1),
+                'freed_mb': round(result.get('freed_mb', 0), 1) if success else 0,
+            }
+            if not success:
+                record['error'] = str(result)
+            before = _window(self.timeline, handle.submitted_at - window, handle.submitted_at)
+            after = _window(self.timeline, handle.finished_at, handle.finished_at + window)
+            if before and after:
+                before, after = _rates(*before), _rates(*after)
+                record['majflt_before'] = before['majflt']
+                record['majflt_after'] = after['majflt']
+                record['refaults_before'] = before['refaults']
+                record['refaults_after'] = after['refaults']
+                record['throughput_drop_percent'] = {
+                    name: round((1 - a / b) * 100, 1) if b > 0 else None
+                    for name, b, a in zip(names, before['ops'], after['ops'])
+                }
+            records.append(record)
+        return records
+
+    def summary(self, window):
+        cleanups = self.cleanups(window)
+        succeeded = [c for c in cleanups if c['outcome'] == 'success']
+        latencies = sorted(c['latency_ms'] for c in cleanups)
+        first, last = self.timeline[0], self.timeline[-1]
+        seconds = last.ts - first.ts
+        totals = _rates(first, last)
+        return {
+            'config': {key: self.config[key] for key in STRATEGIES.get(self.name, (None, {}))[1]},
+            'seconds': round(seconds, 1),
+            'cleanups': len(cleanups),
+            'failures': len(cleanups) - len(succeeded),
+            'reclaimed_mb': round(sum(c['freed_mb'] for c in succeeded), 1),
+            'median_freed_mb': round(statistics.median(c['freed_mb'] for c in succeeded), 1) if succeeded else None,
+            'p50_latency_ms': latencies[len(latencies) // 2] if latencies else None,
+            'p95_latency_ms': latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] if latencies else None,
+            'majflt_per_sec': round(totals['majflt'] / seconds, 2),
+            'refaults_per_sec': round(totals['refaults'] / seconds, 2),
+            'throughput_mb_per_sec': {name: round(rate, 1) for name, rate in zip(self.workloads.names, totals['ops'])},
+            'mean_used_mb': round(statistics.mean(s.used_mb for s in self.timeline), 1),
+            'mean_cached_mb': round(statistics.mean(s.cached_mb for s in self.timeline), 1),
+            'events': cleanups,
+        }
+
+
+# --- 报告 ---
+def print_report(report):
+    strategies = report['strategies']
+    names = [name for name, _ in WORKLOADS]
+    control = strategies.get('none')
+    print(f"\nHost {report['host']} (kernel {report['kernel']}, {report['total_mb']} MB), "
+          f"workloads: " + ", ".join(f"{k}={v}MB" for k, v in report['workloads'].items()))
+    header = (f"{'strategy':<10}{'cleanups':>9}{'failed':>7}{'reclaimed':>11}{'p50 ms':>9}{'p95 ms':>9}"
+              f"{'majflt/s':>10}{'refault/s':>11}")
+    if control:
+        header += "".join(f"{name:>11}" for name in names)
+    print(header)
+    for name, s in strategies.items():
+        line = (f"{name:<10}{s['cleanups']:>9}{s['failures']:>7}{s['reclaimed_mb']:>9.0f}MB"
+                f"{s['p50_latency_ms'] if s['p50_latency_ms'] is not None else '-':>9}"
+                f"{s['p95_latency_ms'] if s['p95_latency_ms'] is not None else '-':>9}"
+                f"{s['majflt_per_sec']:>10}{s['refaults_per_sec']:>11}")
+        if control:
+            # 吞吐量以对照组为 100%
+            for workload in names:
+                base = control['throughput_mb_per_sec'][workload]
+                value = s['throughput_mb_per_sec'][workload]
+                line += f"{value / base * 100:>10.1f}%" if base > 0 else f"{'-':>11}"
+        print(line)
+
+
+def parse_overrides(items):
+    overrides = {}
+    for item in items:
+        key, _, value = item.partition('=')
+        try:
+            overrides[key] = json.loads(value)
+        except ValueError:
+            overrides[key] = value
+    return overrides
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MemClean 内存压力浸泡测试 (Linux)")
+    parser.add_argument("--strategies", default="none,manual,tiered,auto",
+                        help=f"逗号分隔，可选 {', '.join(STRATEGIES)}")
+    parser.add_argument("--duration", type=float, default=120, help="每个策略运行的秒数")
+    parser.add_argument("--warmup", type=float, default=15, help="负载启动后等待工作集建立的秒数")
+    parser.add_argument("--scale", type=float, default=1.0, help="负载占用内存的缩放系数")
+    parser.add_argument("--manual-interval", type=float, default=30, help="manual/tiered 策略的清理间隔 (秒)")
+    parser.add_argument("--window", type=float, default=5, help="比较清理前后缺页和吞吐量的窗口 (秒)")
+    parser.add_argument("--timeout", type=float, default=30, help="单次清理的超时 (秒)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="覆盖所有策略使用的配置项，例如 --set linux_reclaim_backend=cgroup_reclaim")
+    parser.add_argument("--dir", default=None, help="页缓存负载读取的文件所在目录，默认使用临时目录")
+    parser.add_argument("--output", default=None, help="把完整结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    if sys.platform != 'linux':
+        print("The soak harness only runs on Linux.")
+        return 1
+    strategies = [name.strip() for name in args.strategies.split(',') if name.strip()]
+    unknown = [name for name in strategies if name not in STRATEGIES]
+    if unknown:
+        parser.error(f"unknown strategies: {', '.join(unknown)}")
+    overrides = parse_overrides(args.set)
+    if os.geteuid() != 0 and overrides.get('linux_reclaim_backend', 'drop_caches') == 'drop_caches':
+        print("Warning: not running as root, drop_caches cleanups will fail.")
+
+    from core.config_manager import validate_config
+
+    directory = args.dir or tempfile.mkdtemp(prefix="memclean-soak-")
+    workloads = Workloads(args.scale, directory)
+    report = {
+        'host': platform.node(),
+        'kernel': platform.release(),
+        'total_mb': psutil.virtual_memory().total // MB,
+        'duration': args.duration,
+        'overrides': overrides,
+        'strategies': {},
+    }
+    try:
+        for name in strategies:
+            mode, strategy_config = STRATEGIES[name]
+            config = validate_config({**overrides, **strategy_config})
+            # 每个策略都从新启动的负载开始，互不影响
+            workloads.start()
+            report['workloads'] = dict(workloads.sizes)
+            print(f"[{name}] warming up for {args.warmup:.0f}s ...")
+            time.sleep(args.warmup)
+            print(f"[{name}] running for {args.duration:.0f}s ...")
+            run = StrategyRun(name, mode, config, workloads, args.manual_interval, args.timeout)
+            try:
+                run.run(args.duration)
+            finally:
+                workloads.stop()
+            report['strategies'][name] = run.summary(args.window)
+    finally:
+        if args.dir is None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nFull results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+"""
+自动清理策略模块
+- 对最近一段时间的内存占用做平滑 (EWMA) 和线性趋势拟合，预测未来 N 秒内是否会越过阈值，提前触发清理。
+- 使用高/低两条水位线实现迟滞：触发一次后，必须回落到低水位以下才会再次触发，避免在阈值附近反复清理。
+- 根据内存变化的快慢给出下一次检查的时间：增长越快检查越频繁，平稳时放慢。
+- 两次自动清理之间至少间隔 min_clean_gap 秒。
+- 评估 (check / evaluate / on_pressure) 只给出决定，调用方真正提交清理后再调用 commit()，
+  清理器正忙而没有提交时策略保持启用，下一次检查会再次触发。
+- 只依赖标准库，图形界面和无界面模式共用。
+"""
+
+import time
+
+# 没有设置低水位时，低水位取阈值减去这个值
+DEFAULT_HYSTERESIS = 10
+# 低水位至少比阈值低这么多，否则迟滞不起作用
+MIN_HYSTERESIS = 5
+
+
+class Decision:
+    """一次评估的结果。"""
+    __slots__ = ('trigger', 'reason', 'level', 'slope', 'forecast', 'next_check', 'timestamp')
+
+    def __init__(self, trigger, reason, level, slope, forecast, next_check, timestamp=None):
+        self.trigger = trigger
+        self.reason = reason
+        self.level = level
+        self.slope = slope
+        self.forecast = forecast
+        self.next_check = next_check
+        self.timestamp = timestamp
+
+    def __repr__(self):
+        return (f"Decision(trigger={self.trigger}, reason={self.reason!r}, level={self.level:.1f}, "
+                f"slope={self.slope:.3f}/s, forecast={self.forecast:.1f}, next_check={self.next_check:.1f}s)")
+
+
+def _linear_slope(points):
+    """最小二乘拟合的斜率 (每秒变化的百分点)。"""
+    n = len(points)
+    if n < 2:
+        return 0.0
+    t0 = points[0][0]
+    mean_t = sum(t - t0 for t, _ in points) / n
+    mean_v = sum(v for _, v in points) / n
+    cov = var = 0.0
+    for t, v in points:
+        dt = t - t0 - mean_t
+        cov += dt * (v - mean_v)
+        var += dt * dt
+    return cov / var if var > 0 else 0.0
+
+
+class AutoCleanPolicy:
+    """
+    预测式自动清理策略。
+    :param high_watermark: 高水位 (百分比)，当前值或预测值达到它时触发清理
+    :param low_watermark: 低水位 (百分比)，触发后需回落到它以下才重新启用，至少比高水位低 MIN_HYSTERESIS
+    :param horizon_seconds: 预测的时间范围
+    :param window_seconds: 用于拟合趋势的历史窗口
+    :param ewma_alpha: 平滑系数，越大越跟随最新值
+    :param min_interval: 最短检查间隔 (秒)
+    :param max_interval: 最长检查间隔 (秒)
+    :param min_clean_gap: 两次自动清理之间的最短间隔 (秒)
+    """
+
+    def __init__(self, high_watermark=80, low_watermark=70, horizon_seconds=60, window_seconds=60,
+                 ewma_alpha=0.3, min_interval=1.0, max_interval=30.0, min_clean_gap=300.0):
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self.horizon_seconds = horizon_seconds
+        self.window_seconds = window_seconds
+        self.ewma_alpha = ewma_alpha
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.min_clean_gap = min_clean_gap
+        self.armed = True
+        self.last_trigger_time = None
+        self.last_decision = None
+
+    @classmethod
+    def from_config(cls, config):
+        policy = cls()
+        policy.update_config(config)
+        return policy
+
+    def update_config(self, config):
+        self.high_watermark = config.get("mem_threshold_percent", 80)
+        # 0 表示未设置，随阈值变化
+        low = config.get("mem_low_watermark_percent", 0) or self.high_watermark - DEFAULT_HYSTERESIS
+        self.low_watermark = max(min(low, self.high_watermark - MIN_HYSTERESIS), 0)
+        self.horizon_seconds = config.get("forecast_horizon_seconds", 60)
+        # 原来的固定检查间隔现在作为两次自动清理之间的最短间隔
+        self.min_clean_gap = config.get("clean_interval_minutes", 5) * 60
+
+    def check(self, history, now=None):
+        """从历史数据中取最近的窗口并评估。history 为 core.history.HistoryStore。"""
+        now = time.time() if now is None else now
+        rows = history.query(now - self.window_seconds, now, 'second')
+        # 字段顺序见 core.history.FIELDS，逐秒数据取 mem_mean
+        return self.evaluate([(row[0], row[6]) for row in rows])
+
+    def evaluate(self, points):
+        """
+        评估是否需要清理。只给出决定，提交清理后需调用 commit()。
+        :param points: [(时间戳, 内存占用百分比), ...]，按时间升序
+        """
+        if not points:
+            decision = Decision(False, "no-data", 0.0, 0.0, 0.0, self.min_interval)
+            self.last_decision = decision
+            return decision
+
+        level = points[0][1]
+        for _, value in points[1:]:
+            level += self.ewma_alpha * (value - level)
+        slope = _linear_slope(points)
+        forecast = level + max(slope, 0.0) * self.horizon_seconds
+
+        # 迟滞：回落到低水位以下后才重新启用
+        if not self.armed and level <= self.low_watermark:
+            self.armed = True
+
+        trigger, reason = False, "idle"
+        if self.armed:
+            if level >= self.high_watermark:
+                trigger, reason = True, "threshold"
+            elif forecast >= self.high_watermark:
+                trigger, reason = True, "forecast"
+        elif level > self.low_watermark:
+            reason = "hysteresis"
+
+        now = points[-1][0]
+        if trigger and self.last_trigger_time is not None and now - self.last_trigger_time < self.min_clean_gap:
+            trigger, reason = False, "cooldown"
+
+        decision = Decision(trigger, reason, level, slope, forecast, self._next_interval(level, slope), now)
+        self.last_decision = decision
+        return decision
+
+    def on_pressure(self, now=None):
+        """
+        收到真实的内存压力事件 (如 PSI 触发) 时调用。
+        压力事件说明系统已经在为内存停顿，不受水位迟滞限制，只遵守最短清理间隔。
+        与 evaluate() 一样只给出决定，提交清理后需调用 commit()。
+        """
+        now = time.time() if now is None else now
+        level = self.last_decision.level if self.last_decision is not None else 0.0
+        if self.last_trigger_time is not None and now - self.last_trigger_time < self.min_clean_gap:
+            decision = Decision(False, "cooldown", level, 0.0, level, self.max_interval, now)
+        else:
+            decision = Decision(True, "pressure", level, 0.0, level, self.max_interval, now)
+        self.last_decision = decision
+        return decision
+
+    def commit(self, decision):
+        """已按 decision 提交了清理：停用到回落至低水位以下，并从现在开始计算最短清理间隔。"""
+        self.armed = False
+        self.last_trigger_time = decision.timestamp if decision.timestamp is not None else time.time()
+
+    def _next_interval(self, level, slope):
+        """距离越过高水位的预计时间越短，检查越频繁。"""
+        headroom = self.high_watermark - level
+        if headroom <= 0:
+            interval = self.min_interval
+        elif slope > 0:
+            # 在预计越线之前至少检查几次
+            interval = headroom / slope / 4
+        else:
+            interval = self.max_interval
+        return min(max(interval, self.min_interval), self.max_interval)
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+
+"""
+异步清理执行器
+- 在后台工作线程中执行 clean_memory()，调用方立即拿到一个句柄，UI线程不会被阻塞。
+- 同一时间只运行一次清理：清理进行中再次提交时，直接返回正在运行的句柄。
+- 支持进度回调、取消和超时，结果仍然是 clean_memory() 的 (success, result) 元组。
+- 监听器 (add_listener) 可以观察每一次清理的提交和结束，用于统计和导出指标；
+  句柄上的 memory_before 是提交时、清理开始之前读取的内存状态。
+- 不依赖 Qt，UI 组件请通过 core.qt_bridge.CleanupBridge 以信号的方式使用。
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+
+import psutil
+
+from core.system_monitor import clean_memory, get_sampler
+
+CANCELLED_RESULT = (False, "清理已取消。")
+TIMEOUT_RESULT = (False, "清理超时，已中止。")
+
+
+class CleanupHandle:
+    """一次清理任务的句柄，类似 Future，但结果永远是 (success, result) 元组。"""
+
+    def __init__(self, source):
+        self.source = source
+        self.submitted_at = time.time()
+        self.finished_at = None
+        # psutil.virtual_memory() 的结果，由执行器在清理开始之前填写
+        self.memory_before = None
+        self.cancel_event = threading.Event()
+        self.timed_out = False
+        self.future = None
+        self._timer = None
+        self._lock = threading.Lock()
+        self._progress_callbacks = []
+        self._done_callbacks = []
+        self._last_progress = None
+
+    # --- 查询与等待 ---
+    def done(self):
+        return self.future.done()
+
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def result(self, timeout=None):
+        """阻塞等待结果。请不要在UI线程中调用，UI请使用 add_done_callback。"""
+        try:
+            return self.future.result(timeout)
+        except CancelledError:
+            return TIMEOUT_RESULT if self.timed_out else CANCELLED_RESULT
+
+    # --- 控制 ---
+    def cancel(self):
+        """请求取消。尚未开始的任务直接取消，正在执行的任务会在下一个阶段开始前中止。"""
+        self.cancel_event.set()
+        self.future.cancel()
+
+    def _expire(self):
+        if not self.done():
+            self.timed_out = True
+            self.cancel()
+
+    # --- 回调 ---
+    def add_progress_callback(self, callback):
+        """callback(percent, message)，在工作线程中调用；注册时会立即补发最近一次进度。"""
+        with self._lock:
+            self._progress_callbacks.append(callback)
+            last = self._last_progress
+        if last is not None:
+            callback(*last)
+
+    def add_done_callback(self, callback):
+        """
+        callback(success, result)，在工作线程中调用；任务已结束时立即调用。
+        回调中 finished_at 总是已经设置：future 已完成但 _on_done 还没有执行时，回调同样排队等待。
+        """
+        with self._lock:
+            if self.finished_at is None:
+                self._done_callbacks.append(callback)
+                return
+        callback(*self.result())
+
+    def _on_progress(self, percent, message):
+        with self._lock:
+            self._last_progress = (percent, message)
+            callbacks = list(self._progress_callbacks)
+        for callback in callbacks:
+            try:
+                callback(percent, message)
+            except Exception as e:
+                print(f"Cleanup progress callback error: {e}")
+
+    def outcome(self):
+        """结束状态：'success' / 'failure' / 'cancelled' / 'timeout'，尚未结束时为 None。"""
+        if not self.done():
+            return None
+        if self.result()[0]:
+            return 'success'
+        if self.timed_out:
+            return 'timeout'
+        return 'cancelled' if self.cancelled() else 'failure'
+
+    def _on_done(self, _future):
+        if self._timer is not None:
+            self._timer.cancel()
+        success, result = self.result()
+        with self._lock:
+            self.finished_at = time.time()
+            callbacks, self._done_callbacks = self._done_callbacks, []
+        for callback in callbacks:
+            try:
+                callback(success, result)
+            except Exception as e:
+                print(f"Cleanup done callback error: {e}")
+
+
+class CleanupExecutor:
+    """
+    清理执行器，内部只有一个工作线程。
+    :param cleanup_func: 实际执行清理的函数，签名与 clean_memory 一致。
+    """
+
+    def __init__(self, cleanup_func=clean_memory):
+        self.cleanup_func = cleanup_func
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memclean-cleanup")
+        self._lock = threading.Lock()
+        self._current = None
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """
+        callback(event, handle)：event 为 'submitted' (在提交线程中调用) 或 'finished' (在工作线程中调用)。
+        single-flight 合并到已有任务的提交不会再次通知。
+        """
+        with self._lock:
+            if callback not in self._listeners:
+                self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def _notify(self, event, handle):
+        with self._lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(event, handle)
+            except Exception as e:
+                print(f"Cleanup listener error: {e}")
+
+    def submit(self, source="manual", timeout=None, join_running=True, **options):
+        """
+        提交一次清理。
+        :param source: 触发来源 ('manual' / 'hotkey' / 'auto' ...)，仅用于记录。
+        :param timeout: 超时秒数，超时后任务会被取消，结果为 TIMEOUT_RESULT。
+        :param join_running: 已有清理在进行时返回它的句柄；为 False 时返回 None，
+            调用方据此知道这次提交没有开始新的清理 (如自动清理策略只在真正提交后才进入冷却)。
+        :param options: 透传给清理函数的参数，如 target_mb、budget_ms。
+        :return: CleanupHandle，join_running=False 且正忙时为 None
+        """
+        with self._lock:
+            if self._current is not None and not self._current.done():
+                return self._current if join_running else None
+            handle = CleanupHandle(source)
+            # 在清理开始之前读取，采样器最近的样本可能已经过去好几秒
+            handle.memory_before = psutil.virtual_memory()
+            handle.future = self._pool.submit(self._run, handle, options)
+            self._current = handle
+        if timeout is not None:
+            handle._timer = threading.Timer(timeout, handle._expire)
+            handle._timer.daemon = True
+            handle._timer.start()
+        handle.future.add_done_callback(handle._on_done)
+        self._notify('submitted', handle)
+        handle.add_done_callback(lambda *_: self._notify('finished', handle))
+        return handle
+
+    def current(self):
+        """返回正在运行的清理句柄，没有则返回 None。"""
+        with self._lock:
+            if self._current is not None and not self._current.done():
+                return self._current
+            return None
+
+    def is_busy(self):
+        return self.current() is not None
+
+    def _run(self, handle, options):
+        if handle.cancel_event.is_set():
+            return TIMEOUT_RESULT if handle.timed_out else CANCELLED_RESULT
+        # 清理期间内存变化最快，让采样器以最高分辨率记录整个过程
+        lease = get_sampler().request_high_resolution()
+        try:
+            success, result = self.cleanup_func(progress=handle._on_progress, cancel_event=handle.cancel_event,
+                                                **options)
+        except Exception as e:
+            return (False, f"清理时发生未知错误。\n错误: {e}")
+        finally:
+            lease.release()
+        if not success and handle.timed_out:
+            return TIMEOUT_RESULT
+        return success, result
+
+    def shutdown(self, wait=False, timeout=None):
+        """
+        取消正在运行的清理并关闭线程池。
+        :param wait: 为 True 时等待被取消的清理结束 (最多 timeout 秒)；返回时 'finished' 已经通知给
+            所有监听器，清理日志等监听方可以在这之后关闭，不会丢掉最后一条记录。
+        """
+        current = self.current()
+        if current is not None:
+            current.cancel()
+            if wait:
+                # 排在 submit 注册的 'finished' 通知之后，回调按注册顺序执行
+                finished = threading.Event()
+                current.add_done_callback(lambda *_: finished.set())
+                finished.wait(timeout)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_executor = None
+
+
+def get_cleanup_executor():
+    """返回进程内唯一的清理执行器。"""
+    global _executor
+    if _executor is None:
+        _executor = CleanupExecutor()
+    return _executor
@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+
+"""
+清理日志 (journal) 模块
+- 每一次清理 (手动、热键、自动) 结束后追加一行 JSON 记录：时间、触发来源、清理前后的内存、
+  释放量、耗时，以及清理后端和各阶段的详细信息。
+- 记录由后台线程批量写入，提交方 (清理执行器的回调) 只是把记录放进队列，不会阻塞UI线程。
+- 文件超过设定大小后轮转为 .1、.2 …，只保留指定数量的旧文件。
+- configure_journal() 按配置创建、调整或关闭日志，启动和配置重新加载时都调用它。
+- 命令行汇总工具逐行流式读取，不会把整个文件读入内存；中位数和 p99 由固定大小的均匀抽样估计，
+  记录数不超过 RESERVOIR_SIZE 时结果是精确的，内存占用与日志长度无关：
+    python -m core.cleanup_journal [日志路径] [--json]
+"""
+
+import argparse
+import json
+import os
+import queue
+import random
+import statistics
+import sys
+import threading
+import time
+from array import array
+
+import psutil
+
+from core.config_manager import resolve_config_path, load_config
+
+JOURNAL_FILE = 'cleanup_journal.jsonl'
+DEFAULT_MAX_BYTES = 1024 * 1024
+DEFAULT_BACKUPS = 3
+# 汇总时为估计分位数保留的样本数上限
+RESERVOIR_SIZE = 10000
+
+_STOP = object()
+
+
+def configure_journal(journal, config, executor):
+    """
+    按配置 (journal_enabled / journal_max_kb / journal_backups) 创建、调整或关闭清理日志。
+    :param journal: 当前的 CleanupJournal，没有时为 None
+    :param executor: 新建的日志挂到这个清理执行器上
+    :return: 调整后的日志，未启用时为 None
+    """
+    if not config.get("journal_enabled", True):
+        if journal is not None:
+            journal.close()
+        return None
+    max_bytes = config.get("journal_max_kb", 1024) * 1024
+    backups = config.get("journal_backups", 3)
+    if journal is None:
+        journal = CleanupJournal(max_bytes=max_bytes, backups=backups)
+        journal.attach(executor)
+    else:
+        # 写入线程每次写入时读取这两个属性，直接替换即可，下一次写入时生效
+        journal.max_bytes, journal.backups = max_bytes, backups
+    return journal
+
+
+def default_journal_path():
+    """日志与配置文件放在同一个目录。"""
+    return os.path.join(os.path.dirname(resolve_config_path()), JOURNAL_FILE)
+
+
+def _backend_name(config):
+    if sys.platform == 'win32':
+        return 'working_set'
+    if sys.platform == 'linux':
+        return config.get('linux_reclaim_backend', 'drop_caches')
+    return sys.platform
+
+
+def _memory_snapshot():
+    mem = psutil.virtual_memory()
+    return mem.used / (1024 * 1024), mem.percent
+
+
+class CleanupJournal:
+    """
+    追加写入的清理日志。
+    :param path: 日志文件路径
+    :param max_bytes: 单个文件的最大字节数，超过后轮转
+    :param backups: 保留的旧文件数量
+    """
+
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES, backups=DEFAULT_BACKUPS):
+        self.path = path or default_journal_path()
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._queue = queue.Queue()
+        self._executor = None
+        self._file = None
+        self._thread = threading.Thread(target=self._writer, name="memclean-journal", daemon=True)
+        self._thread.start()
+
+    # --- 与清理执行器连接 ---
+    def attach(self, executor):
+        """作为监听器挂到 core.cleanup_executor.CleanupExecutor 上。"""
+        self._executor = executor
+        executor.add_listener(self._on_cleanup)
+
+    def _on_cleanup(self, event, handle):
+        if event != 'finished':
+            return
+        # 'finished' 在清理工作线程中调用；清理前的内存由执行器在提交时、清理开始之前读取
+        mem = handle.memory_before
+        before = (mem.used / (1024 * 1024), mem.percent) if mem is not None else None
+        after_mb, after_percent = _memory_snapshot()
+        success, result = handle.result()
+        record = {
+            'ts': round(handle.submitted_at, 3),
+            'source': handle.source,
+            'outcome': handle.outcome(),
+            'duration_ms': round((handle.finished_at - handle.submitted_at) * 1000, 1),
+            'mem_before_mb': round(before[0], 1) if before else None,
+            'mem_before_percent': before[1] if before else None,
+            'mem_after_mb': round(after_mb, 1),
+            'mem_after_percent': after_percent,
+            'backend': result.get('backend') if isinstance(result, dict) and 'backend' in result
+            else _backend_name(load_config()),
+        }
+        if success and isinstance(result, dict):
+            record['freed_mb'] = round(result.get('freed_mb', 0), 2)
+            for key in ('cleaned_count', 'settle_ms', 'target_met', 'budget_exhausted', 'stages', 'cgroups'):
+                if key in result:
+                    record[key] = result[key]
+        else:
+            record['freed_mb'] = 0
+            record['error'] = str(result)
+        self.append(record)
+
+    # --- 写入 ---
+    def append(self, record):
+        """把一条记录放入写入队列，立即返回。"""
+        self._queue.put(json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str) + '\n')
+
+    def close(self):
+        """写完队列中剩余的记录后关闭文件。"""
+        if self._executor is not None:
+            self._executor.remove_listener(self._on_cleanup)
+            self._executor = None
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout=5)
+
+    def _writer(self):
+        while True:
+            item = self._queue.get()
+            lines = []
+            # 一次取走队列中已有的所有记录，批量写入后再 flush
+            while item is not _STOP:
+                lines.append(item)
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if lines:
+                try:
+                    self._write(lines)
+                except OSError as e:
+                    print(f"Cleanup journal write error: {e}")
+            if item is _STOP:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                return
+
+    def _write(self, lines):
+        for line in lines:
+            data = line.encode('utf-8')
+            if self._file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._file = open(self.path, 'ab')
+            if self._file.tell() and self._file.tell() + len(data) > self.max_bytes:
+                self._rotate()
+            self._file.write(data)
+        self._file.flush()
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        if self.backups > 0:
+            for index in range(self.backups - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, 'ab')
+
+
+# --- 读取与汇总 ---
+def journal_files(path):
+    """按从旧到新的顺序返回日志文件 (轮转出的旧文件在前)。"""
+    backups = []
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        backups.append(f"{path}.{index}")
+        index += 1
+    files = list(reversed(backups))
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def iter_records(path):
+    """逐行读取所有日志文件中的记录，跳过无法解析的行。"""
+    for filename in journal_files(path):
+        with open(filename, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+class _Reservoir:
+    """固定大小的均匀抽样 (Algorithm R)，每个值被保留的概率相同。"""
+
+    def __init__(self, size=RESERVOIR_SIZE, seed=0):
+        self.size = size
+        self.count = 0
+        self.values = array('d')
+        # 固定种子，同一份日志每次汇总的结果相同
+        self._random = random.Random(seed)
+
+    def add(self, value):
+        self.count += 1
+        if len(self.values) < self.size:
+            self.values.append(value)
+            return
+        index = self._random.randrange(self.count)
+        if index < self.size:
+            self.values[index] = value
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def summarize(records):
+    """
+    流式汇总，内存占用有上限：释放量和耗时各最多保留 RESERVOIR_SIZE 个样本。
+    :return: dict，包括每小时的清理次数、释放量中位数和 p99 耗时
+    """
+    count = failures = 0
+    first_ts = last_ts = None
+    total_freed = 0.0
+    freed = _Reservoir()
+    durations = _Reservoir()
+    by_source = {}
+    for record in records:
+        count += 1
+        ts = record.get('ts')
+        if ts is not None:
+            first_ts = ts if first_ts is None else min(first_ts, ts)
+            last_ts = ts if last_ts is None else max(last_ts, ts)
+        source = record.get('source', 'unknown')
+        by_source[source] = by_source.get(source, 0) + 1
+        if record.get('outcome') != 'success':
+            failures += 1
+            continue
+        total_freed += record.get('freed_mb', 0)
+        freed.add(record.get('freed_mb', 0))
+        durations.add(record.get('duration_ms', 0))
+
+    hours = (last_ts - first_ts) / 3600 if count > 1 else 0
+    return {
+        'cleanups': count,
+        'failures': failures,
+        'by_source': by_source,
+        'first': first_ts,
+        'last': last_ts,
+        'frees_per_hour': round(freed.count / hours, 2) if hours > 0 else None,
+        'total_freed_mb': round(total_freed, 1),
+        'median_freed_mb': round(statistics.median(freed.values), 1) if freed.values else None,
+        'p99_duration_ms': round(_percentile(durations.values, 0.99), 1) if durations.values else None,
+    }
+
+
+def _format_time(ts):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts)) if ts is not None else '-'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.cleanup_journal", description="汇总 MemClean 的清理日志")
+    parser.add_argument("path", nargs="?", default=None, help="日志文件路径，默认与配置文件位于同一目录")
+    parser.add_argument("--json", action="store_true", help="以 JSON 格式输出")
+    args = parser.parse_args(argv)
+
+    path = args.path or default_journal_path()
+    if not journal_files(path):
+        print(f"No journal found at {path}")
+        return 1
+    summary = summarize(iter_records(path))
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return 0
+
+    print(f"Journal:          {path}")
+    print(f"Period:           {_format_time(summary['first'])} .. {_format_time(summary['last'])}")
+    print(f"Cleanups:         {summary['cleanups']} ({summary['failures']} failed)")
+    print("By source:        " + ", ".join(f"{k}={v}" for k, v in sorted(summary['by_source'].items())))
+    print(f"Frees per hour:   {summary['frees_per_hour'] if summary['frees_per_hour'] is not None else '-'}")
+    print(f"Total freed:      {summary['total_freed_mb']} MB")
+    print(f"Median yield:     {summary['median_freed_mb'] if summary['median_freed_mb'] is not None else '-'} MB")
+    print(f"p99 duration:     {summary['p99_duration_ms'] if summary['p99_duration_ms'] is not None else '-'} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
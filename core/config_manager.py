@@ -3,46 +3,345 @@
 """
 配置管理模块
 - 负责读取和保存 config.json 文件。
+- 进程内只有一个 ConfigStore：启动时加载一次，之后 load_config() 直接返回内存中的副本。
+- 每个配置项都有类型和取值范围 (CONFIG_SCHEMA)，类型不符的值使用默认值，超出范围的数值被限制到范围内。
+- 写入时先写临时文件再 os.replace，程序崩溃也不会留下写了一半的配置文件。
+- 可以按修改时间监视配置文件，外部修改后自动重新加载并通知订阅者。
+- 配置文件的位置与当前工作目录无关：优先使用环境变量 MEMCLEAN_CONFIG，
+  打包后的 Windows 程序使用 %LOCALAPPDATA%\\memclean，开发环境使用项目目录。
 """
 
 import json
 import os
+import sys
+import tempfile
+import threading
 
 CONFIG_FILE = 'config.json'
+CONFIG_ENV = 'MEMCLEAN_CONFIG'
 
-DEFAULT_CONFIG = {
-    "auto_clean_enabled": False,
-    "clean_interval_minutes": 5,
-    "mem_threshold_percent": 80,
-    "display_metric": "mem",
-    "start_on_boot": False  # 新增：开机自启选项
+# 监视配置文件时检查修改时间的间隔 (秒)
+WATCH_INTERVAL = 2.0
+
+
+class Field:
+    """
+    一个配置项的定义。
+    :param kind: 值的类型，int 也接受整数值的浮点数，float 也接受整数；list/dict 的元素都是字符串
+    :param choices: 可选值列表
+    :param minimum / maximum: 数值的取值范围
+    """
+    __slots__ = ('kind', 'default', 'choices', 'minimum', 'maximum')
+
+    def __init__(self, kind, default, choices=None, minimum=None, maximum=None):
+        self.kind = kind
+        self.default = default
+        self.choices = choices
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def validate(self, value):
+        """返回校验后的值；无法使用时抛出 ValueError。"""
+        if self.kind is bool:
+            if not isinstance(value, bool):
+                raise ValueError(f"expected a boolean, got {value!r}")
+        elif self.kind in (int, float):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"expected a number, got {value!r}")
+            if self.kind is int:
+                if value != int(value):
+                    raise ValueError(f"expected an integer, got {value!r}")
+                value = int(value)
+            if self.minimum is not None:
+                value = max(value, self.minimum)
+            if self.maximum is not None:
+                value = min(value, self.maximum)
+        elif self.kind is list:
+            if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+                raise ValueError(f"expected a list of strings, got {value!r}")
+            value = list(value)
+        elif self.kind is dict:
+            if not isinstance(value, dict) or not all(isinstance(k, str) and isinstance(v, str)
+                                                      for k, v in value.items()):
+                raise ValueError(f"expected an object of strings, got {value!r}")
+            value = dict(value)
+        elif not isinstance(value, self.kind):
+            raise ValueError(f"expected {self.kind.__name__}, got {value!r}")
+        if self.choices is not None and value not in self.choices:
+            raise ValueError(f"expected one of {self.choices}, got {value!r}")
+        return value
+
+
+CONFIG_SCHEMA = {
+    "auto_clean_enabled": Field(bool, False),
+    "clean_interval_minutes": Field(int, 5, minimum=1, maximum=1440),
+    "mem_threshold_percent": Field(int, 80, minimum=1, maximum=100),
+    "display_metric": Field(str, "mem", choices=("mem", "cpu")),
+    "start_on_boot": Field(bool, False),  # 新增：开机自启选项
+    # Linux 清理后端："drop_caches" 清空整机缓存，"cgroup_reclaim" 只回收指定 cgroup
+    "linux_reclaim_backend": Field(str, "drop_caches", choices=("drop_caches", "cgroup_reclaim")),
+    "reclaim_cgroups": Field(list, []),
+    "reclaim_target_mb": Field(float, 512, minimum=0),
+    "cgroup_root": Field(str, "/sys/fs/cgroup"),
+    # Windows 工作集整理：最多整理多少个进程、累计达到多少MB后停止 (0 表示不限制)
+    "trim_max_processes": Field(int, 64, minimum=0),
+    "trim_target_mb": Field(float, 0, minimum=0),
+    # Linux 分级清理：释放达到目标后停止升级，超过时间预算后不再开始新阶段 (0 表示不设置)
+    "clean_target_mb": Field(float, 0, minimum=0),
+    "clean_budget_ms": Field(float, 0, minimum=0),
+    # 预测式自动清理：低水位用于迟滞 (0 表示取阈值减 10)，预测未来多少秒内是否越过阈值
+    "mem_low_watermark_percent": Field(int, 0, minimum=0, maximum=100),
+    "forecast_horizon_seconds": Field(float, 60, minimum=0),
+    # Linux PSI 内存压力触发：可用时以事件驱动为主，阈值检查退为低频后备
+    "psi_enabled": Field(bool, True),
+    "psi_path": Field(str, "/proc/pressure/memory"),
+    "psi_trigger": Field(str, "some 150000 1000000"),
+    # 本机 Prometheus/OpenMetrics 指标导出 (只监听 127.0.0.1)
+    "metrics_enabled": Field(bool, False),
+    "metrics_port": Field(int, 9477, minimum=1, maximum=65535),
+    # 清理日志：每次清理追加一条记录，单个文件超过大小后轮转
+    "journal_enabled": Field(bool, True),
+    "journal_max_kb": Field(int, 1024, minimum=16),
+    "journal_backups": Field(int, 3, minimum=0, maximum=50),
+    # 全局热键：{热键定义: 动作}，写法见 core.hotkey_engine
+    "hotkeys": Field(dict, {"alt alt": "clean", "ctrl+alt+c": "clean"}),
+    # 多主机汇总：无界面模式下向这个地址 ("host:port" 或 "unix:/path") 报告状态，留空表示不启用
+    "fleet_aggregator": Field(str, ""),
+    "fleet_token": Field(str, ""),
 }
 
+DEFAULT_CONFIG = {key: field.default for key, field in CONFIG_SCHEMA.items()}
 
-def load_config():
-    """加载配置文件。如果文件不存在或损坏，则创建并使用默认值。"""
-    if not os.path.exists(CONFIG_FILE):
-        save_config(DEFAULT_CONFIG)
-        return DEFAULT_CONFIG
-
-    try:
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            # 确保旧的配置文件也能获得新键值
-            for key, value in DEFAULT_CONFIG.items():
-                if key not in config:
-                    config[key] = value
+
+def resolve_config_path():
+    """返回配置文件的绝对路径。"""
+    override = os.environ.get(CONFIG_ENV)
+    if override:
+        return os.path.abspath(os.path.expanduser(override))
+    if getattr(sys, 'frozen', False):
+        # 安装目录通常不可写，与安装程序卸载时清理的位置保持一致
+        base = os.environ.get('LOCALAPPDATA')
+        directory = os.path.join(base, 'memclean') if base else os.path.dirname(sys.executable)
+    else:
+        directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(directory, CONFIG_FILE)
+
+
+def validate_config(data):
+    """按 CONFIG_SCHEMA 校验配置，缺失或无效的项使用默认值，未知的项原样保留。"""
+    config = dict(data)
+    for key, field in CONFIG_SCHEMA.items():
+        if key not in config:
+            config[key] = _copy(field.default)
+            continue
+        try:
+            config[key] = field.validate(config[key])
+        except ValueError as e:
+            print(f"Invalid config value for '{key}' ({e}), using default.")
+            config[key] = _copy(field.default)
+    return config
+
+
+def _copy(value):
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+class ConfigStore:
+    """
+    进程内共享的配置。
+    订阅者 callback(config, changed_keys) 在修改配置的线程 (或监视线程) 中调用，
+    UI 组件请通过 core.qt_bridge.ConfigBridge 以信号的方式接收。
+    :param path: 配置文件路径，默认由 resolve_config_path() 决定
+    """
+
+    def __init__(self, path=None):
+        self.path = path or resolve_config_path()
+        self._lock = threading.RLock()
+        self._config = None
+        self._signature = None
+        self._listeners = []
+        self._watch_stop = threading.Event()
+        self._watch_thread = None
+
+    # --- 读取 ---
+    def get(self, key, default=None):
+        with self._lock:
+            self._ensure_loaded()
+            return _copy(self._config.get(key, default))
+
+    def snapshot(self):
+        """返回当前配置的副本，调用方可以随意修改。"""
+        with self._lock:
+            self._ensure_loaded()
+            return {key: _copy(value) for key, value in self._config.items()}
+
+    def _ensure_loaded(self):
+        if self._config is None:
+            config = self._read()
+            self._config = dict(DEFAULT_CONFIG) if config is None else config
+
+    def _read(self):
+        """读取并校验配置文件；文件不存在时以默认值创建，文件损坏时返回 None。"""
+        if not os.path.exists(self.path):
+            config = dict(DEFAULT_CONFIG)
+            self._write(config)
             return config
-    except (json.JSONDecodeError, IOError):
-        save_config(DEFAULT_CONFIG)
-        return DEFAULT_CONFIG
+        signature = self._file_signature()
+        # 不论是否读取成功都记录文件状态，损坏的文件在修正之前不会被反复读取
+        self._signature = signature
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError("top level must be an object")
+        except (OSError, ValueError) as e:
+            # 保留损坏的文件，修正后监视器会重新加载
+            print(f"Error loading config file {self.path}: {e}")
+            return None
+        return validate_config(data)
+
+    # --- 写入 ---
+    def update(self, changes):
+        """合并修改并保存，返回实际发生变化的键。"""
+        with self._lock:
+            self._ensure_loaded()
+            changed = self._apply(validate_config({**self._config, **changes}), write=True)
+        self._notify(changed)
+        return changed
+
+    def save(self, config_data):
+        """用完整的配置替换当前配置并保存。"""
+        with self._lock:
+            self._ensure_loaded()
+            changed = self._apply(validate_config(config_data), write=True)
+        self._notify(changed)
+        return changed
+
+    def reload(self, force=False):
+        """配置文件被外部修改 (或 force=True) 时重新加载，返回变化的键。"""
+        with self._lock:
+            if self._config is None:
+                self._ensure_loaded()
+                return set()
+            if not force and self._file_signature() == self._signature:
+                return set()
+            config = self._read()
+            if config is None:
+                # 文件暂时无法解析 (例如正在编辑)，继续使用当前配置
+                return set()
+            changed = self._apply(config, write=False)
+        self._notify(changed)
+        return changed
+
+    def _apply(self, config, write):
+        # 调用方已持有 self._lock
+        old = self._config
+        changed = {key for key in set(old) | set(config) if old.get(key) != config.get(key)}
+        if write and (changed or not os.path.exists(self.path)):
+            self._write(config)
+        self._config = config
+        return changed
+
+    def _write(self, config):
+        directory = os.path.dirname(self.path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix='.config-', suffix='.tmp', dir=directory)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(config, f, indent=4, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            print(f"Error saving config file: {e}")
+            return
+        # 记录自己写入后的文件状态，监视器不会把它当作外部修改
+        self._signature = self._file_signature()
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    # --- 变更通知 ---
+    def subscribe(self, callback):
+        """callback(config, changed_keys)，config 为修改后配置的副本。"""
+        with self._lock:
+            if callback not in self._listeners:
+                self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def _notify(self, changed):
+        # 在锁外调用，订阅者可以安全地读取或修改配置
+        if not changed:
+            return
+        with self._lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(self.snapshot(), set(changed))
+            except Exception as e:
+                print(f"Config listener error: {e}")
+
+    # --- 文件监视 ---
+    def start_watching(self, interval=WATCH_INTERVAL):
+        """启动后台线程，按修改时间检测外部编辑。"""
+        with self._lock:
+            if self._watch_thread is not None:
+                return
+            self._ensure_loaded()
+            self._watch_stop.clear()
+            self._watch_thread = threading.Thread(target=self._watch, args=(interval,),
+                                                  name="memclean-config", daemon=True)
+            self._watch_thread.start()
+
+    def stop_watching(self):
+        thread = self._watch_thread
+        if thread is None:
+            return
+        self._watch_stop.set()
+        if thread is not threading.current_thread():
+            thread.join(timeout=2)
+        self._watch_thread = None
+
+    def _watch(self, interval):
+        while not self._watch_stop.wait(interval):
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"Config reload error: {e}")
+
+
+_store = None
+
+
+def get_config_store():
+    """返回进程内唯一的配置。"""
+    global _store
+    if _store is None:
+        _store = ConfigStore()
+    return _store
+
+
+def load_config():
+    """返回当前配置的副本。首次调用时从文件加载，文件不存在时以默认值创建。"""
+    return get_config_store().snapshot()
 
 
 def save_config(config_data):
     """将配置数据保存到文件。"""
-    try:
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config_data, f, indent=4)
-    except IOError as e:
-        print(f"Error saving config file: {e}")
-
+    get_config_store().save(config_data)
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+
+"""
+无界面 (headless) 守护进程模式
+- 供服务器使用：只运行共享采样器、自动清理策略和配置加载，只依赖标准库和 psutil，不导入 PySide6/pynput。
+- 日志输出到标准输出或文件，适合作为 systemd 服务运行。
+- 配置了 fleet_aggregator 时作为 agent 向多主机汇总端报告状态，并接受远程清理 (见 core.fleet)。
+- 以 MEMCLEAN_TRACE=1 启动时，SIGUSR1 导出性能追踪 (Chrome trace-event JSON)。
+- SIGTERM/SIGINT 退出，SIGHUP 重新加载配置 (并重新打开日志文件，方便 logrotate)；配置文件被修改后也会自动重新加载。
+- 用法: python main.py --headless [--log-file PATH] [--log-level INFO]
+"""
+
+import argparse
+import logging
+import logging.handlers
+import select
+import signal
+import socket
+import sys
+
+from core.config_manager import load_config, get_config_store
+from core.system_monitor import get_sampler
+from core.history import HistoryStore, default_history_path
+from core.auto_clean_policy import AutoCleanPolicy
+from core.cleanup_executor import get_cleanup_executor
+from core.pressure_watcher import PressureWatcher, PSI_MEMORY_PATH, DEFAULT_TRIGGER
+from core.metrics_exporter import MetricsExporter, DEFAULT_PORT
+from core.cleanup_journal import configure_journal
+from core.fleet import FleetAgent
+from core import tracing
+
+logger = logging.getLogger("memclean")
+
+# 单次清理的最长时间，超时后后台任务会被中止
+CLEANUP_TIMEOUT_SECONDS = 30
+# 退出时等待被取消的清理结束的最长时间，之后才关闭清理日志
+SHUTDOWN_TIMEOUT_SECONDS = 5
+
+
+class _Wakeup:
+    """
+    唤醒主循环的自连接 socket (self-pipe)。
+    set() 不获取任何锁，可以在其他线程中调用；信号由 signal.set_wakeup_fd 直接写入，
+    信号处理函数本身只修改标记。threading.Event 的 set() 要获取条件锁，
+    信号恰好在主线程持有该锁时到达会造成死锁。
+    """
+
+    def __init__(self):
+        self._reader, self._writer = socket.socketpair()
+        self._reader.setblocking(False)
+        self._writer.setblocking(False)
+
+    def signal_fileno(self):
+        return self._writer.fileno()
+
+    def set(self):
+        try:
+            self._writer.send(b'\0')
+        except OSError:
+            # 缓冲区已满说明已经有未处理的唤醒
+            pass
+
+    def wait(self, timeout=None):
+        """等待唤醒或超时，并清除所有未处理的唤醒。"""
+        select.select([self._reader], [], [], timeout)
+        try:
+            while self._reader.recv(4096):
+                pass
+        except OSError:
+            pass
+
+    def close(self):
+        self._reader.close()
+        self._writer.close()
+
+
+class HeadlessDaemon:
+    """
+    无界面的自动清理服务，逻辑与图形界面中的 check_and_auto_clean 一致。
+    :param history_path: 历史数据文件，为 None 时只保存在内存中
+    """
+
+    def __init__(self, history_path=None):
+        self.config = load_config()
+        self.history = HistoryStore(history_path)
+        self.policy = AutoCleanPolicy.from_config(self.config)
+        self.sampler = get_sampler()
+        self.executor = get_cleanup_executor()
+        self.pressure_watcher = None
+        self.metrics_exporter = MetricsExporter()
+        self.fleet_agent = None
+        self.journal = None
+        self._configure_journal()
+
+        self._wakeup = _Wakeup()
+        self._stop_requested = False
+        self._reload_requested = False
+        self._reread_config = False
+        self._dump_requested = False
+        self._pressure_event = None
+        self._signal_wakeup = False
+
+    # --- 信号处理 (在主线程中调用，只修改标记，由 set_wakeup_fd 唤醒主循环) ---
+    def request_stop(self, *_):
+        self._stop_requested = True
+
+    def request_reload(self, *_):
+        self._reload_requested = True
+        self._reread_config = True
+
+    def _on_config_changed(self, config, changed):
+        # 在配置监视线程中调用，只唤醒主循环
+        self._reload_requested = True
+        self._wakeup.set()
+
+    def request_trace_dump(self, *_):
+        self._dump_requested = True
+
+    def install_signal_handlers(self):
+        signal.set_wakeup_fd(self._wakeup.signal_fileno(), warn_on_full_buffer=False)
+        self._signal_wakeup = True
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        if hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, self.request_reload)
+        if hasattr(signal, 'SIGUSR1') and tracing.is_enabled():
+            signal.signal(signal.SIGUSR1, self.request_trace_dump)
+
+    # --- 配置 ---
+    def reload(self):
+        if self._reread_config:
+            # SIGHUP：不论修改时间是否变化都重新读取配置文件
+            self._reread_config = False
+            get_config_store().reload(force=True)
+            # 上面的重新读取会再次通知变化，这里已经处理，不必再来一轮
+            self._reload_requested = False
+        self.config = load_config()
+        self.policy.update_config(self.config)
+        self._start_pressure_watcher()
+        self._configure_metrics()
+        self._configure_fleet()
+        self._configure_journal()
+        logger.info("Configuration reloaded: auto_clean_enabled=%s threshold=%s%%",
+                    self.config.get("auto_clean_enabled"), self.config.get("mem_threshold_percent"))
+
+    def _configure_metrics(self):
+        enabled = self.config.get("metrics_enabled", False)
+        port = self.config.get("metrics_port", DEFAULT_PORT)
+        was_running = self.metrics_exporter.is_running()
+        self.metrics_exporter.configure(enabled, port)
+        if self.metrics_exporter.is_running() and not was_running:
+            logger.info("Metrics exporter listening on http://127.0.0.1:%d/metrics", port)
+
+    def _configure_journal(self):
+        self.journal = configure_journal(self.journal, self.config, self.executor)
+
+    def _configure_fleet(self):
+        address = self.config.get("fleet_aggregator", "")
+        token = self.config.get("fleet_token", "")
+        agent = self.fleet_agent
+        if agent is not None and (agent.address, agent.token) == (address, token):
+            return
+        if agent is not None:
+            agent.stop()
+            self.fleet_agent = None
+        if address:
+            self.fleet_agent = FleetAgent(address, token=token)
+            self.fleet_agent.start()
+            logger.info("Reporting to fleet aggregator %s", address)
+
+    def _start_pressure_watcher(self):
+        if self.pressure_watcher is not None:
+            self.pressure_watcher.stop()
+            self.pressure_watcher = None
+        if not self.config.get("psi_enabled", True):
+            return
+        watcher = PressureWatcher(self._on_pressure,
+                                  path=self.config.get("psi_path", PSI_MEMORY_PATH),
+                                  trigger=self.config.get("psi_trigger", DEFAULT_TRIGGER))
+        if watcher.start():
+            self.pressure_watcher = watcher
+            logger.info("PSI trigger registered on %s", watcher.path)
+        else:
+            logger.info("PSI unavailable, falling back to timer polling")
+
+    def _on_pressure(self, event):
+        # 在 PSI 监听线程中调用，只记录事件并唤醒主循环
+        self._pressure_event = event
+        self._wakeup.set()
+
+    # --- 主循环 ---
+    def run(self):
+        self.sampler.subscribe(self.history.record)
+        self._start_pressure_watcher()
+        self._configure_metrics()
+        self._configure_fleet()
+        store = get_config_store()
+        store.subscribe(self._on_config_changed)
+        store.start_watching()
+        logger.info("memclean headless mode started")
+        try:
+            while not self._stop_requested:
+                timeout = self._tick()
+                self._wakeup.wait(timeout)
+                if self._dump_requested:
+                    self._dump_requested = False
+                    self._dump_trace()
+                if self._reload_requested:
+                    self._reload_requested = False
+                    _reopen_log_files()
+                    self.reload()
+        finally:
+            self.shutdown()
+        return 0
+
+    def _tick(self):
+        """执行一次检查，返回距离下一次检查的秒数 (None 表示未启用自动清理，只等待事件)。"""
+        if not self.config.get("auto_clean_enabled", False):
+            return None
+
+        event, self._pressure_event = self._pressure_event, None
+        if event is not None:
+            decision = self.policy.on_pressure(event['timestamp'])
+            source = "psi"
+        else:
+            decision = self.policy.check(self.history)
+            source = "auto"
+            if self.pressure_watcher is not None:
+                # PSI 可用时主要由压力事件驱动，阈值检查只作为后备，以最长间隔运行
+                decision.next_check = self.policy.max_interval
+            # 下一次检查之前，历史数据至少要有同样细的分辨率
+            self.sampler.request_resolution(decision.next_check, duration=decision.next_check * 2)
+
+        if decision.trigger:
+            self._submit_cleanup(source, decision)
+        return decision.next_check
+
+    def _submit_cleanup(self, source, decision):
+        handle = self.executor.submit(source=source, timeout=CLEANUP_TIMEOUT_SECONDS, join_running=False)
+        if handle is None:
+            # 远程清理等其他任务正在进行，策略保持启用
+            return
+        logger.info("Auto clean triggered (%s): %r", decision.reason, decision)
+        self.policy.commit(decision)
+        handle.add_done_callback(_log_cleanup_result)
+
+    def _dump_trace(self):
+        try:
+            logger.info("Trace written to %s", tracing.dump_chrome_trace())
+        except OSError as e:
+            logger.warning("Trace dump failed: %s", e)
+
+    def shutdown(self):
+        logger.info("memclean headless mode stopping")
+        store = get_config_store()
+        store.stop_watching()
+        store.unsubscribe(self._on_config_changed)
+        if self.pressure_watcher is not None:
+            self.pressure_watcher.stop()
+            self.pressure_watcher = None
+        self.metrics_exporter.stop()
+        if self.fleet_agent is not None:
+            self.fleet_agent.stop()
+            self.fleet_agent = None
+        self.sampler.unsubscribe(self.history.record)
+        self.sampler.stop()
+        # 等被取消的清理发出 'finished'，清理日志才能写下最后一条记录
+        self.executor.shutdown(wait=True, timeout=SHUTDOWN_TIMEOUT_SECONDS)
+        if self.journal is not None:
+            self.journal.close()
+        self.history.close()
+        if tracing.is_enabled():
+            self._dump_trace()
+        if self._signal_wakeup:
+            signal.set_wakeup_fd(-1)
+        self._wakeup.close()
+
+
+def _log_cleanup_result(success, result):
+    if success:
+        logger.info("Cleanup finished: freed %.1f MB", result.get('freed_mb', 0))
+    else:
+        logger.warning("Cleanup failed: %s", result)
+
+
+def _reopen_log_files():
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.handlers.WatchedFileHandler):
+            handler.reopenIfNeeded()
+
+
+def setup_logging(log_file=None, level="INFO"):
+    if log_file:
+        # WatchedFileHandler 会在文件被 logrotate 移走后自动重新打开
+        handler = logging.handlers.WatchedFileHandler(log_file, encoding='utf-8')
+    else:
+        handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="memclean --headless", description="MemClean 无界面自动清理服务")
+    parser.add_argument("--log-file", help="日志文件路径，默认输出到标准输出")
+    parser.add_argument("--log-level", default="INFO", help="日志级别 (DEBUG/INFO/WARNING/ERROR)")
+    parser.add_argument("--no-history-file", action="store_true", help="历史数据只保存在内存中")
+    args = parser.parse_args(argv)
+
+    setup_logging(args.log_file, args.log_level)
+    daemon = HeadlessDaemon(history_path=None if args.no_history_file else default_history_path())
+    daemon.install_signal_handlers()
+    return daemon.run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,528 @@
+# -*- coding: utf-8 -*-
+
+"""
+多主机汇总 (fleet) 模块
+- agent：随无界面模式运行 (配置 fleet_aggregator)，或单独运行 `python -m core.fleet agent ADDRESS`。
+  订阅共享采样器，把样本和清理结果打包成紧凑的二进制帧，每隔几秒批量发送一次；
+  收到汇总端的命令后通过清理执行器 (即 clean_memory) 执行远程清理。
+- aggregator：`python -m core.fleet serve ADDRESS`，单个 asyncio 事件循环处理所有 agent 的连接，
+  每台主机的样本和清理记录放在固定长度的环形缓冲区中。
+- 查询：`python -m core.fleet summary ADDRESS` 按内存压力列出主机、最近的清理和失联的 agent；
+  `python -m core.fleet clean HOST --server ADDRESS` 触发远程清理。
+- 地址写作 "host:port" (TCP) 或 "unix:/path/to/socket"。设置了令牌 (--token / fleet_token) 时，
+  agent 和查询客户端都必须提供相同的令牌。
+- 只依赖标准库。
+
+帧格式：6 字节头 (类型 u8, 保留 u8, 负载长度 u32，网络字节序) + 负载。
+样本和清理事件是定长的 struct 记录，一帧可以包含任意多条；握手、命令和查询结果使用 JSON。
+"""
+
+import argparse
+import asyncio
+import hmac
+import json
+import socket
+import struct
+import sys
+import threading
+import time
+from collections import deque
+
+DEFAULT_PORT = 9478
+# agent 批量发送的间隔和采样分辨率 (秒)
+BATCH_SECONDS = 5.0
+SAMPLE_RESOLUTION = 2.0
+# 每台主机保留的样本和清理记录数量
+HOST_SAMPLES = 720
+HOST_CLEANUPS = 50
+# 超过这么久没有收到数据的 agent 视为失联 (秒)
+STALE_SECONDS = 30.0
+# 单帧负载的上限，超过时断开连接
+MAX_PAYLOAD = 1024 * 1024
+# 远程清理的超时 (秒)
+CLEANUP_TIMEOUT_SECONDS = 30
+# 断线重连的最长等待 (秒)
+MAX_BACKOFF = 60.0
+# agent 发送握手后等待汇总端答复的时间 (秒)
+HANDSHAKE_TIMEOUT = 10.0
+
+PROTOCOL_VERSION = 1
+
+# 帧类型
+HELLO = 1       # agent -> aggregator, JSON {host, total_mb, version, token}
+SAMPLES = 2     # agent -> aggregator, SAMPLE 记录
+CLEANUPS = 3    # agent -> aggregator, CLEANUP 记录
+COMMAND = 4     # aggregator -> agent, JSON {action}
+QUERY = 5       # 客户端 -> aggregator, JSON {token}
+REQUEST = 6     # 客户端 -> aggregator, JSON {action, host, token}
+REPLY = 7       # aggregator -> 客户端/agent, JSON {ok, error}，agent 的握手也会收到答复
+
+HEADER = struct.Struct('!BBI')
+# 时间戳, CPU 百分比 x100, 内存百分比 x100, 已用内存 (MB)
+SAMPLE = struct.Struct('!dHHI')
+# 提交时间, 来源编号, 结果编号, 释放量 (MB), 耗时 (秒)
+CLEANUP = struct.Struct('!dBBff')
+
+SOURCES = ('other', 'manual', 'hotkey', 'tray', 'auto', 'psi', 'remote')
+OUTCOMES = ('failure', 'success', 'timeout', 'cancelled')
+
+
+def encode_frame(kind, payload=b''):
+    return HEADER.pack(kind, 0, len(payload)) + payload
+
+
+def _json_frame(kind, data):
+    return encode_frame(kind, json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+async def read_frame(reader):
+    """读取一帧，返回 (类型, 负载)。连接关闭时抛出 asyncio.IncompleteReadError。"""
+    kind, _, length = HEADER.unpack(await reader.readexactly(HEADER.size))
+    if length > MAX_PAYLOAD:
+        raise ValueError(f"frame too large ({length} bytes)")
+    return kind, await reader.readexactly(length)
+
+
+def parse_address(address):
+    """"unix:/path" -> ('unix', path)；"host:port" 或 "host" -> ('tcp', (host, port))"""
+    if address.startswith('unix:'):
+        return 'unix', address[5:]
+    host, _, port = address.rpartition(':')
+    if not host:
+        host, port = port, ''
+    return 'tcp', (host.strip('[]') or '127.0.0.1', int(port) if port else DEFAULT_PORT)
+
+
+async def open_connection(address):
+    kind, target = parse_address(address)
+    if kind == 'unix':
+        return await asyncio.open_unix_connection(target)
+    return await asyncio.open_connection(*target)
+
+
+def _check_token(expected, data):
+    return not expected or hmac.compare_digest(str(data.get('token', '')), expected)
+
+
+# --- agent ---
+def _pack_sample(sample):
+    mem = sample['mem_info']
+    return SAMPLE.pack(sample['timestamp'], int(sample['cpu_percent'] * 100), int(mem.percent * 100),
+                       int(mem.used // (1024 * 1024)))
+
+
+def _pack_cleanup(handle):
+    success, result = handle.result()
+    freed = result.get('freed_mb', 0) if success and isinstance(result, dict) else 0
+    source = SOURCES.index(handle.source) if handle.source in SOURCES else 0
+    outcome = handle.outcome()
+    return CLEANUP.pack(handle.submitted_at, source, OUTCOMES.index(outcome) if outcome in OUTCOMES else 0,
+                        max(freed, 0), handle.finished_at - handle.submitted_at)
+
+
+class FleetAgent:
+    """
+    向汇总端报告本机状态的 agent，在自己的线程中运行一个事件循环。
+    :param address: 汇总端地址
+    :param hostname: 上报的主机名，默认为本机名
+    :param sampler / executor: 默认为进程内共享的采样器和清理执行器
+    """
+
+    def __init__(self, address, hostname=None, token='', batch_seconds=BATCH_SECONDS,
+                 sampler=None, executor=None):
+        self.address = address
+        self.hostname = hostname or socket.gethostname()
+        self.token = token
+        self.batch_seconds = batch_seconds
+        self.sampler = sampler
+        self.executor = executor
+        self.connected = False
+        # 由采样线程和清理工作线程追加，事件循环批量取走；deque 的两端操作是线程安全的
+        self._samples = deque(maxlen=HOST_SAMPLES)
+        self._cleanups = deque(maxlen=HOST_CLEANUPS)
+        self._loop = None
+        self._stop_event = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        if self.sampler is None:
+            from core.system_monitor import get_sampler
+            self.sampler = get_sampler()
+        if self.executor is None:
+            from core.cleanup_executor import get_cleanup_executor
+            self.executor = get_cleanup_executor()
+        self.sampler.subscribe(self._on_sample, resolution=SAMPLE_RESOLUTION)
+        self.executor.add_listener(self._on_cleanup)
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._thread_main, args=(ready,), name="memclean-fleet", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def stop(self):
+        thread = self._thread
+        if thread is None:
+            return
+        self._thread = None
+        self.sampler.unsubscribe(self._on_sample)
+        self.executor.remove_listener(self._on_cleanup)
+        self._loop.call_soon_threadsafe(self._stop_event.set)
+        thread.join(timeout=5)
+
+    def _on_sample(self, sample):
+        self._samples.append(_pack_sample(sample))
+
+    def _on_cleanup(self, event, handle):
+        if event == 'finished':
+            self._cleanups.append(_pack_cleanup(handle))
+
+    def _thread_main(self, ready):
+        self._loop = asyncio.new_event_loop()
+        self._stop_event = asyncio.Event()
+        ready.set()
+        try:
+            self._loop.run_until_complete(self._run())
+        finally:
+            self._loop.close()
+
+    async def _run(self):
+        backoff = 1.0
+        while not self._stop_event.is_set():
+            try:
+                reader, writer = await open_connection(self.address)
+            except OSError as e:
+                print(f"Fleet aggregator {self.address} unreachable: {e}")
+                await self._sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+                continue
+            error = await self._handshake(reader, writer)
+            if error is not None:
+                # 令牌错误等配置问题重连也无济于事，按退避间隔重试并每次打印原因
+                print(f"Fleet aggregator {self.address} rejected this agent: {error}")
+                writer.close()
+                await self._sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+                continue
+            backoff = 1.0
+            self.connected = True
+            tasks = [asyncio.ensure_future(self._send_loop(writer)),
+                     asyncio.ensure_future(self._receive_loop(reader)),
+                     asyncio.ensure_future(self._stop_event.wait())]
+            try:
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                self.connected = False
+                writer.close()
+            if not self._stop_event.is_set():
+                await self._sleep(backoff)
+
+    async def _sleep(self, seconds):
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _handshake(self, reader, writer):
+        """发送 HELLO 并等待答复，成功时返回 None，否则返回错误说明。"""
+        from core.system_monitor import get_system_stats
+        total_mb = get_system_stats()['mem_info'].total // (1024 * 1024)
+        writer.write(_json_frame(HELLO, {'host': self.hostname, 'total_mb': total_mb,
+                                         'version': PROTOCOL_VERSION, 'token': self.token}))
+        try:
+            await writer.drain()
+            kind, payload = await asyncio.wait_for(read_frame(reader), HANDSHAKE_TIMEOUT)
+            reply = json.loads(payload) if kind == REPLY else {}
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError, ValueError) as e:
+            return f"no handshake reply ({type(e).__name__})"
+        if not reply.get('ok'):
+            return reply.get('error') or "unexpected handshake reply"
+        return None
+
+    async def _send_loop(self, writer):
+        while True:
+            self._flush(writer)
+            await writer.drain()
+            await asyncio.sleep(self.batch_seconds)
+
+    def _flush(self, writer):
+        sent = False
+        for kind, queue in ((SAMPLES, self._samples), (CLEANUPS, self._cleanups)):
+            records = []
+            while queue:
+                records.append(queue.popleft())
+            if records:
+                writer.write(encode_frame(kind, b''.join(records)))
+                sent = True
+        if not sent:
+            # 没有新数据时发送空帧作为心跳，汇总端据此判断 agent 是否失联
+            writer.write(encode_frame(SAMPLES))
+
+    async def _receive_loop(self, reader):
+        while True:
+            try:
+                kind, payload = await read_frame(reader)
+            except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+                return
+            if kind == COMMAND:
+                self._on_command(json.loads(payload))
+
+    def _on_command(self, command):
+        if command.get('action') == 'clean':
+            print("Remote cleanup requested by fleet aggregator")
+            self.executor.submit(source='remote', timeout=CLEANUP_TIMEOUT_SECONDS)
+
+
+# --- aggregator ---
+class HostState:
+    """汇总端保存的一台主机的状态。"""
+    __slots__ = ('name', 'total_mb', 'samples', 'cleanups', 'last_seen', 'writer', 'peer')
+
+    def __init__(self, name):
+        self.name = name
+        self.total_mb = 0
+        self.samples = deque(maxlen=HOST_SAMPLES)     # (时间戳, cpu%, mem%, 已用MB)
+        self.cleanups = deque(maxlen=HOST_CLEANUPS)   # (时间戳, 来源, 结果, 释放MB, 耗时秒)
+        self.last_seen = 0.0
+        self.writer = None
+        self.peer = None
+
+
+class FleetAggregator:
+    """
+    汇总所有 agent 的数据。
+    :param address: 监听地址，默认只监听本机
+    """
+
+    def __init__(self, address=f'127.0.0.1:{DEFAULT_PORT}', token='', stale_seconds=STALE_SECONDS):
+        self.address = address
+        self.token = token
+        self.stale_seconds = stale_seconds
+        self.hosts = {}
+        self._server = None
+
+    async def start(self):
+        kind, target = parse_address(self.address)
+        if kind == 'unix':
+            self._server = await asyncio.start_unix_server(self._handle, target)
+        else:
+            self._server = await asyncio.start_server(self._handle, *target)
+        return self._server
+
+    async def serve_forever(self):
+        server = self._server or await self.start()
+        async with server:
+            await server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        try:
+            kind, payload = await read_frame(reader)
+            if kind == HELLO:
+                await self._serve_agent(json.loads(payload), reader, writer)
+            elif kind in (QUERY, REQUEST):
+                writer.write(_json_frame(REPLY, self._answer(kind, json.loads(payload))))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _serve_agent(self, hello, reader, writer):
+        if not _check_token(self.token, hello):
+            # 答复原因再断开，agent 才能提示配置错误
+            writer.write(_json_frame(REPLY, {'ok': False, 'error': 'invalid token'}))
+            await writer.drain()
+            return
+        writer.write(_json_frame(REPLY, {'ok': True}))
+        name = str(hello.get('host', '?'))
+        host = self.hosts.get(name)
+        if host is None:
+            host = self.hosts[name] = HostState(name)
+        if host.writer is not None:
+            # 同名主机重新连接，旧连接作废
+            host.writer.close()
+        host.total_mb = hello.get('total_mb', 0)
+        host.writer = writer
+        host.peer = str(writer.get_extra_info('peername') or 'unix')
+        host.last_seen = time.time()
+        try:
+            while True:
+                kind, payload = await read_frame(reader)
+                host.last_seen = time.time()
+                record = SAMPLE if kind == SAMPLES else CLEANUP if kind == CLEANUPS else None
+                if record is not None and len(payload) % record.size:
+                    # 长度不是记录大小的整数倍说明帧已损坏，按协议错误断开 (由 _handle 处理)
+                    raise ValueError(f"malformed frame from {name} ({len(payload)} bytes)")
+                if kind == SAMPLES:
+                    host.samples.extend((ts, cpu / 100, mem / 100, used)
+                                        for ts, cpu, mem, used in SAMPLE.iter_unpack(payload))
+                elif kind == CLEANUPS:
+                    host.cleanups.extend((ts, SOURCES[source] if source < len(SOURCES) else 'other',
+                                          OUTCOMES[outcome] if outcome < len(OUTCOMES) else 'failure', freed, duration)
+                                         for ts, source, outcome, freed, duration in CLEANUP.iter_unpack(payload))
+        finally:
+            if host.writer is writer:
+                host.writer = None
+
+    def _answer(self, kind, request):
+        if not _check_token(self.token, request):
+            return {'ok': False, 'error': 'invalid token'}
+        if kind == QUERY:
+            return {'ok': True, 'summary': self.summary(request.get('limit', 10))}
+        if request.get('action') == 'clean':
+            return self.request_cleanup(request.get('host', ''))
+        return {'ok': False, 'error': f"unknown action {request.get('action')!r}"}
+
+    def request_cleanup(self, name):
+        """让指定主机执行一次清理 (经由它的清理执行器)。"""
+        host = self.hosts.get(name)
+        if host is None or host.writer is None:
+            return {'ok': False, 'error': f"host {name!r} is not connected"}
+        host.writer.write(_json_frame(COMMAND, {'action': 'clean'}))
+        return {'ok': True}
+
+    def summary(self, limit=10, now=None):
+        """
+        :return: {'hosts': 主机数, 'connected': 在线数,
+                  'top_pressure': 按内存占用从高到低的主机, 'recent_cleanups': 最近的清理, 'stale': 失联的主机}
+        """
+        now = time.time() if now is None else now
+        live, stale = [], []
+        cleanups = []
+        for host in self.hosts.values():
+            age = now - host.last_seen
+            if host.writer is None or age > self.stale_seconds:
+                stale.append({'host': host.name, 'last_seen': round(host.last_seen, 3), 'age_s': round(age, 1),
+                              'connected': host.writer is not None})
+            elif host.samples:
+                ts, cpu, mem, used = host.samples[-1]
+                # 最近一分钟的平均值，比单个样本更能代表持续的压力
+                recent = [s[2] for s in host.samples if s[0] >= ts - 60]
+                live.append({'host': host.name, 'mem_percent': mem, 'mem_avg_1m': round(sum(recent) / len(recent), 2),
+                             'cpu_percent': cpu, 'used_mb': used, 'total_mb': host.total_mb,
+                             'age_s': round(age, 1)})
+            cleanups += [{'host': host.name, 'ts': round(ts, 3), 'source': source, 'outcome': outcome,
+                          'freed_mb': round(freed, 1), 'duration_s': round(duration, 3)}
+                         for ts, source, outcome, freed, duration in host.cleanups]
+        live.sort(key=lambda h: (h['mem_avg_1m'], h['mem_percent']), reverse=True)
+        cleanups.sort(key=lambda c: c['ts'], reverse=True)
+        stale.sort(key=lambda h: h['last_seen'])
+        return {
+            'hosts': len(self.hosts),
+            'connected': sum(1 for h in self.hosts.values() if h.writer is not None),
+            'top_pressure': live[:limit],
+            'recent_cleanups': cleanups[:limit],
+            'stale': stale,
+        }
+
+
+# --- 查询客户端 ---
+async def request(address, kind, data):
+    reader, writer = await open_connection(address)
+    try:
+        writer.write(_json_frame(kind, data))
+        await writer.drain()
+        reply_kind, payload = await read_frame(reader)
+        return json.loads(payload)
+    finally:
+        writer.close()
+
+
+def query_summary(address, token='', limit=10):
+    return asyncio.run(request(address, QUERY, {'token': token, 'limit': limit}))
+
+
+def request_remote_cleanup(address, host, token=''):
+    return asyncio.run(request(address, REQUEST, {'action': 'clean', 'host': host, 'token': token}))
+
+
+def _format_time(ts):
+    return time.strftime('%H:%M:%S', time.localtime(ts))
+
+
+def print_summary(summary):
+    print(f"Hosts: {summary['hosts']} ({summary['connected']} connected)")
+    print("\nTop memory pressure:")
+    print(f"  {'host':<24}{'mem%':>7}{'avg 1m':>8}{'cpu%':>7}{'used MB':>10}{'total MB':>10}{'age s':>7}")
+    for h in summary['top_pressure']:
+        print(f"  {h['host']:<24}{h['mem_percent']:>7.1f}{h['mem_avg_1m']:>8.1f}{h['cpu_percent']:>7.1f}"
+              f"{h['used_mb']:>10}{h['total_mb']:>10}{h['age_s']:>7}")
+    print("\nRecent cleanups:")
+    for c in summary['recent_cleanups']:
+        print(f"  {_format_time(c['ts'])}  {c['host']:<24}{c['source']:<8}{c['outcome']:<10}"
+              f"{c['freed_mb']:>8.1f} MB{c['duration_s']:>8.2f} s")
+    if summary['stale']:
+        print("\nStale agents:")
+        for h in summary['stale']:
+            state = "connected, silent" if h['connected'] else "disconnected"
+            print(f"  {h['host']:<24}last seen {_format_time(h['last_seen'])} ({h['age_s']} s ago, {state})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.fleet", description="MemClean 多主机汇总")
+    parser.add_argument("--token", default='', help="共享令牌")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="运行汇总端")
+    serve.add_argument("address", nargs="?", default=f"127.0.0.1:{DEFAULT_PORT}")
+    agent = commands.add_parser("agent", help="运行 agent，向汇总端报告本机状态")
+    agent.add_argument("address")
+    agent.add_argument("--hostname", default=None)
+    agent.add_argument("--batch-seconds", type=float, default=BATCH_SECONDS)
+    summary = commands.add_parser("summary", help="查看汇总")
+    summary.add_argument("address", nargs="?", default=f"127.0.0.1:{DEFAULT_PORT}")
+    summary.add_argument("--limit", type=int, default=10)
+    summary.add_argument("--json", action="store_true", help="以 JSON 格式输出")
+    clean = commands.add_parser("clean", help="触发远程清理")
+    clean.add_argument("host")
+    clean.add_argument("--server", default=f"127.0.0.1:{DEFAULT_PORT}")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        aggregator = FleetAggregator(args.address, token=args.token)
+        print(f"Fleet aggregator listening on {args.address}")
+        try:
+            asyncio.run(aggregator.serve_forever())
+        except KeyboardInterrupt:
+            pass
+        return 0
+    if args.command == "agent":
+        fleet_agent = FleetAgent(args.address, hostname=args.hostname, token=args.token,
+                                 batch_seconds=args.batch_seconds)
+        fleet_agent.start()
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            fleet_agent.stop()
+        return 0
+    try:
+        if args.command == "summary":
+            reply = query_summary(args.address, args.token, args.limit)
+        else:
+            reply = request_remote_cleanup(args.server, args.host, args.token)
+    except OSError as e:
+        print(f"Fleet aggregator unreachable: {e}")
+        return 1
+    if not reply.get('ok'):
+        print(f"Error: {reply.get('error')}")
+        return 1
+    if args.command == "summary":
+        if args.json:
+            print(json.dumps(reply['summary'], ensure_ascii=False, indent=2))
+        else:
+            print_summary(reply['summary'])
+    else:
+        print(f"Cleanup requested on {args.host}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+
+"""
+CPU/内存历史数据模块
+- 三级分辨率的环形缓冲区：最近一小时逐秒数据，最近一天逐分钟汇总，最近一个月逐小时汇总。
+- 分钟和小时汇总 (最小/最大/平均) 在样本到达时增量更新，无需回扫原始数据。
+- 所有数据存放在一块固定大小的连续内存中，进程运行多久占用都不变。
+- 可选地映射到磁盘文件 (mmap)，重启后直接恢复，无需任何解析；
+  文件默认与配置文件放在同一个目录 (default_history_path)，与当前工作目录无关。
+- 重启后第一个样本落在文件中最后一个分钟/小时桶内时，从已保存的汇总继续累加，不会覆盖重启前的部分。
+"""
+
+import mmap
+import os
+import threading
+import time
+
+HISTORY_FILE = 'history.dat'
+
+_MAGIC = b'MCHIST\x00\x01'
+_HEADER_SIZE = 64
+
+# 每个槽位的字段：时间戳, cpu_min, cpu_max, cpu_mean, mem_min, mem_max, mem_mean
+FIELDS = ('timestamp', 'cpu_min', 'cpu_max', 'cpu_mean', 'mem_min', 'mem_max', 'mem_mean')
+_COLS = len(FIELDS)
+
+# (名称, 每个槽位覆盖的秒数, 槽位数量)
+TIERS = (
+    ('second', 1, 3600),
+    ('minute', 60, 1440),
+    ('hour', 3600, 720),
+)
+
+
+def _file_size():
+    return _HEADER_SIZE + sum(capacity for _, _, capacity in TIERS) * _COLS * 8
+
+
+def default_history_path():
+    """历史数据文件与配置文件放在同一个目录。"""
+    from core.config_manager import resolve_config_path
+    return os.path.join(os.path.dirname(resolve_config_path()), HISTORY_FILE)
+
+
+class _Tier:
+    """单个分辨率的环形缓冲区，数据直接读写底层 buffer。"""
+
+    def __init__(self, name, step, capacity, data, state, state_index):
+        self.name = name
+        self.step = step
+        self.capacity = capacity
+        self._data = data          # memoryview('d')，长度 capacity * _COLS
+        self._state = state        # memoryview('q')，保存每级的 head 和 count
+        self._si = state_index * 2
+
+    @property
+    def head(self):
+        return self._state[self._si]
+
+    @property
+    def count(self):
+        return self._state[self._si + 1]
+
+    def _slot(self, logical):
+        """第 logical 个 (从最旧开始) 样本所在的物理槽位。"""
+        return (self.head - self.count + logical) % self.capacity
+
+    def timestamp_at(self, logical):
+        return self._data[self._slot(logical) * _COLS]
+
+    def last_timestamp(self):
+        if self.count == 0:
+            return None
+        return self.timestamp_at(self.count - 1)
+
+    def append(self, row):
+        last = self.last_timestamp()
+        if last is not None and row[0] < last:
+            # 时钟回拨，丢弃乱序数据以保证时间戳单调
+            return
+        if last is not None and row[0] == last:
+            slot = self._slot(self.count - 1)
+        else:
+            slot = self.head
+            self._state[self._si] = (slot + 1) % self.capacity
+            if self.count < self.capacity:
+                self._state[self._si + 1] = self.count + 1
+        base = slot * _COLS
+        data = self._data
+        for i in range(_COLS):
+            data[base + i] = row[i]
+
+    def _bisect(self, ts):
+        """返回第一个时间戳 >= ts 的逻辑位置。"""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamp_at(mid) < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def query(self, start, end):
+        """
+        返回与 [start, end] 区间有重叠的所有行 (汇总行的时间戳为时间桶的起点)。
+        定位为 O(log n)，读取为 O(窗口大小)。
+        """
+        data = self._data
+        rows = []
+        for logical in range(self._bisect(start - self.step + 1), self.count):
+            base = self._slot(logical) * _COLS
+            if data[base] > end:
+                break
+            rows.append(tuple(data[base:base + _COLS]))
+        return rows
+
+    def clear(self):
+        self._state[self._si] = 0
+        self._state[self._si + 1] = 0
+
+
+class _Rollup:
+    """分钟/小时汇总的增量累加器。"""
+    __slots__ = ('step', 'bucket', 'count', 'cpu_min', 'cpu_max', 'cpu_sum', 'mem_min', 'mem_max', 'mem_sum')
+
+    def __init__(self, step):
+        self.step = step
+        self.bucket = None
+
+    def seed(self, row, count):
+        """从已保存的汇总行继续累加，count 为该行大约汇总了多少个样本。"""
+        self.bucket = int(row[0])
+        self.count = count
+        _, self.cpu_min, self.cpu_max, cpu_mean, self.mem_min, self.mem_max, mem_mean = row
+        self.cpu_sum = cpu_mean * count
+        self.mem_sum = mem_mean * count
+
+    def add(self, bucket, cpu, mem):
+        if self.bucket != bucket:
+            self.bucket = bucket
+            self.count = 0
+            self.cpu_min = self.cpu_max = cpu
+            self.mem_min = self.mem_max = mem
+            self.cpu_sum = self.mem_sum = 0.0
+        self.count += 1
+        self.cpu_sum += cpu
+        self.mem_sum += mem
+        if cpu < self.cpu_min: self.cpu_min = cpu
+        if cpu > self.cpu_max: self.cpu_max = cpu
+        if mem < self.mem_min: self.mem_min = mem
+        if mem > self.mem_max: self.mem_max = mem
+
+    def row(self):
+        return (float(self.bucket), self.cpu_min, self.cpu_max, self.cpu_sum / self.count,
+                self.mem_min, self.mem_max, self.mem_sum / self.count)
+
+
+class HistoryStore:
+    """
+    多分辨率历史数据存储。
+    :param path: 持久化文件路径；为 None 时只保存在内存中。
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        self._map = None
+        size = _file_size()
+
+        if path:
+            try:
+                self._map = self._open_mapping(path, size)
+            except (OSError, ValueError) as e:
+                print(f"History file unavailable, keeping history in memory only: {e}")
+                self._map = None
+        buf = self._map if self._map is not None else bytearray(size)
+        if self._map is None:
+            buf[:len(_MAGIC)] = _MAGIC
+
+        view = memoryview(buf)
+        state = view[len(_MAGIC):len(_MAGIC) + len(TIERS) * 16].cast('q')
+        self._views = [view, state]
+        self.tiers = {}
+        offset = _HEADER_SIZE
+        for index, (name, step, capacity) in enumerate(TIERS):
+            length = capacity * _COLS * 8
+            data = view[offset:offset + length].cast('d')
+            self._views.append(data)
+            self.tiers[name] = _Tier(name, step, capacity, data, state, index)
+            offset += length
+
+        # 采样间隔可能短于 1 秒，逐秒数据也按时间桶汇总
+        self._rollups = {name: _Rollup(step) for name, step, _ in TIERS}
+
+    def _open_mapping(self, path, size):
+        exists = os.path.exists(path) and os.path.getsize(path) == size
+        self._file = open(path, 'r+b' if exists else 'w+b')
+        if not exists:
+            self._file.truncate(size)
+        mapping = mmap.mmap(self._file.fileno(), size)
+        if mapping[:len(_MAGIC)] != _MAGIC:
+            # 新文件或格式不兼容：清空并重新初始化
+            mapping[:_HEADER_SIZE] = bytes(_HEADER_SIZE)
+            mapping[:len(_MAGIC)] = _MAGIC
+        return mapping
+
+    def record(self, sample):
+        """写入一个样本，可以直接作为共享采样器的订阅回调。"""
+        self.add(sample.get('timestamp', time.time()), sample['cpu_percent'], sample['mem_info'].percent)
+
+    def add(self, timestamp, cpu, mem):
+        cpu, mem = float(cpu), float(mem)
+        second = int(timestamp)
+        with self._lock:
+            for name, rollup in self._rollups.items():
+                if rollup.bucket is None:
+                    # 重启后的第一个样本：接着文件中这个桶已有的汇总累加
+                    self._seed(rollup, self.tiers[name], second - second % rollup.step)
+            for name, rollup in self._rollups.items():
+                # 当前时间桶的汇总结果会覆盖同一槽位，桶结束时该槽位即为最终值，
+                # 因此查询时也能看到正在进行中的这一秒/分钟/小时
+                rollup.add(second - second % rollup.step, cpu, mem)
+                self.tiers[name].append(rollup.row())
+
+    def _seed(self, rollup, tier, bucket):
+        if tier.last_timestamp() != bucket:
+            return
+        # 已保存的桶汇总了多少个样本没有记录，以逐秒数据中落在桶内的行数近似
+        # (逐秒数据保存一小时，足以覆盖一个小时桶)
+        count = len(self.tiers['second'].query(bucket, bucket + rollup.step - 1)) if rollup.step > 1 else 1
+        rollup.seed(tier.query(bucket, bucket)[-1], max(count, 1))
+
+    def query(self, start, end=None, resolution=None):
+        """
+        查询 [start, end] 时间范围内的数据。
+        :param resolution: 'second' / 'minute' / 'hour'；为 None 时选择能覆盖整个区间的最细分辨率。
+        :return: 行元组列表，字段顺序见 FIELDS。
+        """
+        if end is None:
+            end = time.time()
+        with self._lock:
+            tier = self.tiers[resolution] if resolution else self._pick_tier(end - start)
+            return tier.query(start, end)
+
+    def recent(self, seconds, resolution=None):
+        """查询最近 seconds 秒的数据。"""
+        now = time.time()
+        return self.query(now - seconds, now, resolution)
+
+    def _pick_tier(self, span):
+        """选择保存时长足以覆盖 span 秒的最细分辨率。"""
+        for name, step, capacity in TIERS:
+            if step * capacity >= span:
+                return self.tiers[name]
+        return self.tiers[TIERS[-1][0]]
+
+    def clear(self):
+        with self._lock:
+            for tier in self.tiers.values():
+                tier.clear()
+            for rollup in self._rollups.values():
+                rollup.bucket = None
+
+    def flush(self):
+        if self._map is not None:
+            self._map.flush()
+
+    def close(self):
+        with self._lock:
+            for view in reversed(self._views):
+                view.release()
+            self._views = []
+            if self._map is not None:
+                self._map.flush()
+                self._map.close()
+                self._map = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+
+"""
+热键状态机
+- 由配置中的热键定义 (如 {"alt alt": "clean", "ctrl+alt+c": "clean"}) 编译一次，之后每个按键事件
+  只做几次整数位运算和一次字典查找，不创建列表或集合。
+- 按键名在编译时映射为整数编号，按住的键用一个整数位掩码表示，组合键按掩码完全匹配。
+- 写法：
+    * 组合键用 "+" 连接："ctrl+alt+c"，最后一个键按下时其余键必须都按住，且没有按住其他键；
+    * 连击/序列用空格分隔，每一步都可以是组合键："alt alt"、"shift shift shift"、"ctrl+k ctrl+c"；
+    * 结尾的 "@毫秒" 指定相邻两步之间的最长间隔，默认 DEFAULT_WINDOW_MS："alt alt@250"。
+- 只依赖标准库，与具体的键盘监听库 (pynput) 无关；键名的转换见 core.hotkey_manager。
+- describe_action() 把绑定到某个动作的热键转换为显示用的文字，供托盘菜单和主窗口使用。
+"""
+
+DEFAULT_WINDOW_MS = 300
+# 已按住的键超过这么久 (秒) 没有任何按下或自动重复事件后又被按下，说明之前的松开事件丢失了
+# (如 Ctrl+Alt+Del、锁屏)。比各平台自动重复的最长初始延迟 (约 1 秒) 稍长。
+STUCK_SECONDS = 1.5
+
+# 键名的别名，统一为 pynput 的写法 (去掉左右之分)
+ALIASES = {
+    'control': 'ctrl',
+    'option': 'alt',
+    'win': 'cmd',
+    'super': 'cmd',
+    'meta': 'cmd',
+    'command': 'cmd',
+    'return': 'enter',
+    'escape': 'esc',
+    'del': 'delete',
+}
+
+
+def normalize_key_name(name):
+    name = name.strip().lower()
+    return ALIASES.get(name, name)
+
+
+def parse_binding(spec):
+    """
+    解析一个热键定义。
+    :return: (steps, window_seconds)，steps 为每一步按键名的 frozenset 组成的元组
+    :raises ValueError: 定义为空或格式错误
+    """
+    text, _, window = spec.partition('@')
+    if window:
+        try:
+            window_ms = float(window)
+        except ValueError:
+            raise ValueError(f"invalid timing window in {spec!r}")
+        if window_ms <= 0:
+            raise ValueError(f"timing window must be positive in {spec!r}")
+    else:
+        window_ms = DEFAULT_WINDOW_MS
+    steps = []
+    for step in text.split():
+        keys = [normalize_key_name(key) for key in step.split('+')]
+        if not all(keys):
+            raise ValueError(f"empty key name in {spec!r}")
+        steps.append(frozenset(keys))
+    if not steps:
+        raise ValueError("empty hotkey")
+    return tuple(steps), window_ms / 1000
+
+
+def format_binding(spec):
+    """热键定义的显示文字："ctrl+alt+c" -> "Ctrl+Alt+C"，"alt alt@250" -> "Alt Alt"。"""
+    text = spec.partition('@')[0]
+    return ' '.join('+'.join(_display_name(normalize_key_name(key)) for key in step.split('+'))
+                    for step in text.split())
+
+
+def _display_name(name):
+    return name.upper() if len(name) == 1 else name.capitalize()
+
+
+def describe_action(bindings, action):
+    """
+    列出绑定到 action 的热键，如 "Alt Alt / Ctrl+Alt+C"。
+    :param bindings: {热键定义: 动作名}，即配置项 "hotkeys"；无法解析的定义不列出
+    :return: 没有绑定时为空字符串
+    """
+    labels = []
+    for spec, bound in bindings.items():
+        if bound != action:
+            continue
+        try:
+            parse_binding(spec)
+        except ValueError:
+            continue
+        labels.append(format_binding(spec))
+    return ' / '.join(labels)
+
+
+class _Node:
+    """序列前缀树的节点，children 以下一步的按键掩码为键。"""
+    __slots__ = ('children', 'action', 'window')
+
+    def __init__(self):
+        self.children = {}
+        self.action = None
+        self.window = 0.0
+
+
+class HotkeyEngine:
+    """
+    编译后的热键状态机。不是线程安全的，只应在键盘监听线程中调用。
+    :param bindings: {热键定义: 动作名}，无法解析的定义会被跳过并打印警告
+    """
+
+    def __init__(self, bindings):
+        self.bindings = {}
+        parsed = []
+        for spec, action in bindings.items():
+            try:
+                steps, window = parse_binding(spec)
+            except ValueError as e:
+                print(f"Ignoring hotkey {spec!r}: {e}")
+                continue
+            self.bindings[spec] = action
+            parsed.append((steps, window, action))
+
+        # 只给热键中出现的键分配编号，其余所有键共用最后一个编号 OTHER
+        names = sorted({key for steps, _, _ in parsed for step in steps for key in step})
+        self._codes = {name: index for index, name in enumerate(names)}
+        self.OTHER = len(names)
+        self._bits = tuple(1 << index for index in range(len(names) + 1))
+
+        self._root = _Node()
+        partials = set()
+        for steps, window, action in parsed:
+            node = self._root
+            for step in steps:
+                mask = 0
+                for key in step:
+                    mask |= self._bits[self._codes[key]]
+                # 组合键的真子集：依次按下修饰键的过程中不打断正在进行的序列
+                submask = (mask - 1) & mask
+                while submask:
+                    partials.add(submask)
+                    submask = (submask - 1) & mask
+                child = node.children.get(mask)
+                if child is None:
+                    child = node.children[mask] = _Node()
+                child.window = max(child.window, window)
+                node = child
+            if node.action is not None and node.action != action:
+                print(f"Hotkey conflict: {' '.join('+'.join(sorted(s)) for s in steps)} "
+                      f"is bound to both {node.action!r} and {action!r}")
+            node.action = action
+        self._partials = frozenset(partials - set(self._root.children))
+
+        self._held = 0
+        self._node = self._root
+        self._last_step = 0.0
+        # 每个键最近一次按下 (含自动重复) 的时间
+        self._seen = [0.0] * len(self._bits)
+
+    def code(self, name):
+        """键名对应的编号，热键中没有用到的键返回 OTHER。"""
+        return self._codes.get(normalize_key_name(name), self.OTHER)
+
+    def press(self, code, now):
+        """
+        处理按键按下。
+        :param now: 单调时钟的秒数，由调用方提供
+        :return: 触发的动作名，没有触发时返回 None
+        """
+        bit = self._bits[code]
+        self._seen[code] = now
+        held = self._held
+        if held & bit:
+            # 按住不放产生的自动重复，不算作新的一次按键
+            return None
+        held |= bit
+        self._held = held
+
+        node = self._node
+        child = node.children.get(held)
+        if child is not None and node is not self._root and now - self._last_step > child.window:
+            child = None
+        if child is None:
+            if held in self._partials:
+                return None
+            # 序列被打断或超时，从头匹配这一步
+            child = self._root.children.get(held)
+            if child is None:
+                self._node = self._root
+                return None
+        self._last_step = now
+        # 还有更长的序列以此为前缀时停在这里，否则回到起点
+        self._node = child if child.children else self._root
+        return child.action
+
+    def release(self, code):
+        # OTHER 由多个键共用，任意一个松开都清除，最多让一个组合键在按住无关键时被误判为可以匹配
+        self._held &= ~self._bits[code]
+
+    def is_stuck(self, code, now):
+        """code 记录为按住，但超过 STUCK_SECONDS 没有收到它的按下事件，松开事件应该是丢失了。"""
+        return (code != self.OTHER and self._held & self._bits[code] != 0
+                and now - self._seen[code] > STUCK_SECONDS)
+
+    def reset(self):
+        """清除按键状态，例如监听器重新启动或失去按键释放事件时 (由 core.hotkey_manager 调用)。"""
+        self._held = 0
+        self._node = self._root
@@ -3,86 +3,93 @@
 """
 全局热键管理模块 (高级版)
 - 使用 pynput 库实现全局键盘监听，更稳定可靠。
-- 支持 "Alt"+"Alt" 双击和 "Ctrl+Alt+C" 组合键。
-- 在独立的线程中运行，不影响UI主线程。
+- 热键由配置项 "hotkeys" 定义，编译为 core.hotkey_engine.HotkeyEngine 状态机，
+  支持任意组合键 (如 "ctrl+alt+c") 和连击序列 (如 "alt alt")。
+- pynput 在自己的监听线程中回调，每个按键只做一次字典查找和状态机的一步；
+  触发后通过一个信号 action_triggered(动作名) 排队交给UI主线程。
+- 松开事件可能丢失 (Ctrl+Alt+Del、锁屏)：再次按下一个长时间"按住"的键时清除状态机的按键状态；
+  监听器重新启动和重新加载热键时换上一个新的状态机，避免某个键一直被当作按住。
+- 状态机只在监听线程中修改，其他线程从不调用它的方法，只整体替换 _compiled。
 """
 
 import time
-from pynput import keyboard
-from PySide6.QtCore import QObject, Signal, QThread
-
-
-class HotkeyWorker(QObject):
-    """在工作线程中运行的键盘监听器"""
-    alt_alt_triggered = Signal()
-    ctrl_alt_c_triggered = Signal()
 
-    def __init__(self):
-        super().__init__()
-        self.last_alt_press_time = 0
-        self.double_press_interval = 0.3  # 300毫秒内算双击
-
-        # 定义 Ctrl+Alt+C 组合键
-        self.combo = {keyboard.Key.ctrl, keyboard.Key.alt, keyboard.KeyCode.from_char('c')}
-        self.current_keys = set()
-
-    def on_press(self, key):
-        """按键按下事件处理"""
-        # 处理 Alt+Alt
-        if key in [keyboard.Key.alt_l, keyboard.Key.alt_r]:
-            current_time = time.time()
-            if current_time - self.last_alt_press_time < self.double_press_interval:
-                print("Alt+Alt detected!")
-                self.alt_alt_triggered.emit()
-            self.last_alt_press_time = current_time
+from pynput import keyboard
+from PySide6.QtCore import QObject, Signal
 
-        # 处理组合键
-        if key in self.combo:
-            self.current_keys.add(key)
-            if self.current_keys == self.combo:
-                print("Ctrl+Alt+C detected!")
-                self.ctrl_alt_c_triggered.emit()
+from core.hotkey_engine import HotkeyEngine
 
-    def on_release(self, key):
-        """按键释放事件处理"""
-        try:
-            self.current_keys.remove(key)
-        except KeyError:
-            pass
 
-    def run(self):
-        """启动键盘监听器"""
-        with keyboard.Listener(on_press=self.on_press, on_release=self.on_release) as listener:
-            listener.join()
+def key_name(key):
+    """把 pynput 的按键转换为热键定义中使用的键名。"""
+    if isinstance(key, keyboard.Key):
+        name = key.name
+        # 不区分左右修饰键
+        return name[:-2] if name.endswith(('_l', '_r')) else name
+    char = getattr(key, 'char', None)
+    if char and char.isprintable():
+        return char.lower()
+    vk = getattr(key, 'vk', None)
+    # 按住 Ctrl 时部分平台给出的是控制字符，退回按虚拟键码识别字母和数字
+    if vk is not None and (0x30 <= vk <= 0x39 or 0x41 <= vk <= 0x5A):
+        return chr(vk).lower()
+    return f"vk{vk}"
 
 
 class HotkeyManager(QObject):
-    """主线程中的热键管理器，负责创建和管理工作线程"""
-    alt_alt_triggered = Signal()
-    ctrl_alt_c_triggered = Signal()
+    """
+    全局热键监听。
+    :param bindings: {热键定义: 动作名}，即配置项 "hotkeys"
+    """
+    action_triggered = Signal(str)
 
-    def __init__(self, parent=None):
+    def __init__(self, bindings, parent=None):
         super().__init__(parent)
-        self.thread = QThread()
-        self.worker = HotkeyWorker()
-
-        # 将worker移动到新线程
-        self.worker.moveToThread(self.thread)
-
-        # 连接信号
-        self.worker.alt_alt_triggered.connect(self.alt_alt_triggered)
-        self.worker.ctrl_alt_c_triggered.connect(self.ctrl_alt_c_triggered)
-
-        # 线程启动时，运行worker的run方法
-        self.thread.started.connect(self.worker.run)
-
-        # 启动线程
-        self.thread.start()
+        # (状态机, pynput 按键对象 -> 状态机中的编号)，每个键只转换一次；两者总是一起替换
+        self._compiled = (HotkeyEngine(bindings), {})
+        self._listener = None
+        self._start_listener()
+
+    def _start_listener(self):
+        self._listener = keyboard.Listener(on_press=self._on_press, on_release=self._on_release)
+        self._listener.start()
+
+    def set_bindings(self, bindings):
+        """
+        配置修改后重新编译。即使热键没有变化也换上新的状态机，清除可能卡住的按键状态；
+        UI线程不直接修改监听线程正在使用的状态机，替换是一次赋值，监听线程从下一个按键起使用新的。
+        监听线程已经意外退出时重新启动。
+        """
+        self._compiled = (HotkeyEngine(bindings), {})
+        if not self._listener.is_alive():
+            print("Hotkey listener was not running, restarting it.")
+            self._start_listener()
+
+    @staticmethod
+    def _code(engine, codes, key):
+        code = codes.get(key)
+        if code is None:
+            code = codes[key] = engine.code(key_name(key))
+        return code
+
+    def _on_press(self, key):
+        # 在 pynput 的监听线程中调用
+        engine, codes = self._compiled
+        code = self._code(engine, codes, key)
+        now = time.monotonic()
+        if engine.is_stuck(code, now):
+            # 这个键的松开事件丢失了，其他键的状态同样不可信，全部清除后把这次当作新的按下
+            engine.reset()
+        action = engine.press(code, now)
+        if action is not None:
+            # 接收者在UI线程，跨线程发射的信号会自动排队
+            self.action_triggered.emit(action)
+
+    def _on_release(self, key):
+        engine, codes = self._compiled
+        engine.release(self._code(engine, codes, key))
 
     def stop(self):
         """停止监听线程"""
-        if self.thread.isRunning():
-            self.thread.quit()
-            self.thread.wait()
+        self._listener.stop()
         print("Hotkey listener stopped.")
-
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+"""
+Prometheus/OpenMetrics 指标导出模块
+- 可选功能 (配置 metrics_enabled / metrics_port)，在后台线程中只监听 127.0.0.1。
+- 导出当前 CPU/内存、清理次数、释放内存和清理耗时的直方图、自动清理的触发次数。
+- 响应内容在每次采样或清理结束时序列化一次，抓取请求只返回预先生成的字节串，
+  不论抓取多频繁，开销都是固定的。
+- 只依赖标准库，图形界面和无界面模式共用。
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.system_monitor import get_sampler
+from core.cleanup_executor import get_cleanup_executor
+
+DEFAULT_PORT = 9477
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# 直方图的桶上限
+FREED_MB_BUCKETS = (16, 64, 128, 256, 512, 1024, 2048, 4096)
+DURATION_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# 由自动清理策略发起的清理来源
+AUTO_SOURCES = ('auto', 'psi')
+
+
+class _Histogram:
+    __slots__ = ('bounds', 'counts', 'total', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+    def lines(self, name):
+        lines = [f'{name}_bucket{{le="{float(bound)}"}} {count}' for bound, count in zip(self.bounds, self.counts)]
+        lines.append(f'{name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum {self.total}')
+        lines.append(f'{name}_count {self.count}')
+        return lines
+
+
+class MetricsExporter:
+    """
+    本机指标导出服务。
+    :param port: 监听端口，只绑定 127.0.0.1
+    """
+
+    def __init__(self, port=DEFAULT_PORT, host='127.0.0.1'):
+        self.port = port
+        self.host = host
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+        self._sample = None
+        self._cleanups = {}       # (source, outcome) -> 次数
+        self._triggers = {}       # source -> 自动清理触发次数
+        self._freed = _Histogram(FREED_MB_BUCKETS)
+        self._duration = _Histogram(DURATION_BUCKETS)
+        self._payload = self._serialize()
+
+    # --- 生命周期 ---
+    def is_running(self):
+        return self._server is not None
+
+    def start(self):
+        """开始监听。端口被占用等原因无法监听时返回 False。"""
+        if self._server is not None:
+            return True
+        try:
+            server = ThreadingHTTPServer((self.host, self.port), _MetricsHandler)
+        except OSError as e:
+            print(f"Metrics exporter unavailable on {self.host}:{self.port}: {e}")
+            return False
+        server.daemon_threads = True
+        server.exporter = self
+        self._server = server
+        get_sampler().subscribe(self._on_sample)
+        get_cleanup_executor().add_listener(self._on_cleanup)
+        self._thread = threading.Thread(target=server.serve_forever, name="memclean-metrics", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        server = self._server
+        if server is None:
+            return
+        self._server = None
+        get_sampler().unsubscribe(self._on_sample)
+        get_cleanup_executor().remove_listener(self._on_cleanup)
+        server.shutdown()
+        server.server_close()
+        self._thread = None
+
+    def configure(self, enabled, port):
+        """按配置启动、停止，或在端口变化时重新监听。"""
+        if self._server is not None and (not enabled or port != self.port):
+            self.stop()
+        self.port = port
+        if enabled:
+            self.start()
+
+    # --- 数据来源 ---
+    def _on_sample(self, sample):
+        # 在采样线程中调用
+        with self._lock:
+            self._sample = sample
+            self._payload = self._serialize()
+
+    def _on_cleanup(self, event, handle):
+        with self._lock:
+            if event == 'submitted':
+                if handle.source in AUTO_SOURCES:
+                    self._triggers[handle.source] = self._triggers.get(handle.source, 0) + 1
+            else:
+                key = (handle.source, handle.outcome())
+                self._cleanups[key] = self._cleanups.get(key, 0) + 1
+                success, result = handle.result()
+                if success and isinstance(result, dict) and 'freed_mb' in result:
+                    self._freed.observe(max(result['freed_mb'], 0))
+                self._duration.observe(handle.finished_at - handle.submitted_at)
+            self._payload = self._serialize()
+
+    def payload(self):
+        return self._payload
+
+    def _serialize(self):
+        # 调用方已持有 self._lock (或在构造函数中)
+        lines = []
+        sample = self._sample
+        if sample is not None:
+            mem = sample['mem_info']
+            lines += [
+                '# TYPE memclean_cpu_usage_percent gauge',
+                '# HELP memclean_cpu_usage_percent System-wide CPU usage.',
+                f"memclean_cpu_usage_percent {float(sample['cpu_percent'])}",
+                '# TYPE memclean_memory_usage_percent gauge',
+                '# HELP memclean_memory_usage_percent Physical memory in use.',
+                f'memclean_memory_usage_percent {float(mem.percent)}',
+                '# TYPE memclean_memory_total_bytes gauge',
+                f'memclean_memory_total_bytes {mem.total}',
+                '# TYPE memclean_memory_available_bytes gauge',
+                f'memclean_memory_available_bytes {mem.available}',
+                '# TYPE memclean_sample_timestamp_seconds gauge',
+                f"memclean_sample_timestamp_seconds {sample['timestamp']}",
+            ]
+
+        lines.append('# TYPE memclean_cleanups counter')
+        lines.append('# HELP memclean_cleanups Finished cleanups by trigger source and outcome.')
+        for (source, outcome), count in sorted(self._cleanups.items()):
+            lines.append(f'memclean_cleanups_total{{source="{source}",result="{outcome}"}} {count}')
+
+        lines.append('# TYPE memclean_auto_clean_triggers counter')
+        lines.append('# HELP memclean_auto_clean_triggers Cleanups started by the auto-clean policy.')
+        for source, count in sorted(self._triggers.items()):
+            lines.append(f'memclean_auto_clean_triggers_total{{source="{source}"}} {count}')
+
+        lines.append('# TYPE memclean_cleanup_freed_megabytes histogram')
+        lines.append('# UNIT memclean_cleanup_freed_megabytes megabytes')
+        lines += self._freed.lines('memclean_cleanup_freed_megabytes')
+        lines.append('# TYPE memclean_cleanup_duration_seconds histogram')
+        lines.append('# UNIT memclean_cleanup_duration_seconds seconds')
+        lines += self._duration.lines('memclean_cleanup_duration_seconds')
+
+        lines.append('# EOF')
+        return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.exporter.payload()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 抓取请求很频繁，不写访问日志
+        pass
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+"""
+Linux 内存压力 (PSI) 监听模块
+- 向 /proc/pressure/memory 注册 PSI 触发器 (如 "some 150000 1000000"：每 1 秒内累计停顿超过 150 毫秒)。
+- 后台线程用 poll 阻塞等待内核通知，没有压力时不产生任何唤醒。
+- PSI 不可用 (非 Linux、内核未开启、权限不足) 时 start() 返回 False，调用方退回定时轮询；
+  可用时调用方仍以较长间隔检查阈值，作为压力事件之外的后备。
+- 压力文件路径可注入：如果路径是一个 FIFO，每写入一行就视为一次压力事件 (一次写入多行即多个事件，
+  不完整的一行等到换行符到达)，便于测试。
+"""
+
+import os
+import select
+import stat
+import threading
+import time
+
+PSI_MEMORY_PATH = '/proc/pressure/memory'
+DEFAULT_TRIGGER = 'some 150000 1000000'
+
+
+def parse_pressure(text):
+    """
+    解析 PSI 文本，例如:
+        some avg10=0.00 avg60=0.00 avg300=0.00 total=0
+        full avg10=0.00 avg60=0.00 avg300=0.00 total=0
+    :return: {'some': {'avg10': 0.0, ...}, 'full': {...}}
+    """
+    result = {}
+    for line in text.splitlines():
+        parts = line.split()
+        if not parts or parts[0] not in ('some', 'full'):
+            continue
+        values = {}
+        for item in parts[1:]:
+            key, _, value = item.partition('=')
+            try:
+                values[key] = float(value)
+            except ValueError:
+                continue
+        result[parts[0]] = values
+    return result
+
+
+def read_pressure(path=PSI_MEMORY_PATH):
+    """读取当前的压力统计，读取失败时返回 None。"""
+    try:
+        with open(path, 'r') as f:
+            return parse_pressure(f.read())
+    except OSError:
+        return None
+
+
+class PressureWatcher:
+    """
+    PSI 压力事件监听器。
+    :param callback: callback(event)，在监听线程中调用，event 为 {'timestamp', 'pressure'}
+    :param path: 压力文件路径，可替换为 FIFO
+    :param trigger: PSI 触发器定义 "<some|full> <停顿微秒> <窗口微秒>"
+    """
+
+    def __init__(self, callback, path=PSI_MEMORY_PATH, trigger=DEFAULT_TRIGGER):
+        self.callback = callback
+        self.path = path
+        self.trigger = trigger
+        self._fd = None
+        self._is_fifo = False
+        self._partial = b''
+        self._thread = None
+        self._wake_r = self._wake_w = None
+
+    @staticmethod
+    def is_supported(path=PSI_MEMORY_PATH):
+        return hasattr(select, 'poll') and os.path.exists(path)
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """注册触发器并启动监听线程。返回 False 表示 PSI 不可用。"""
+        if self.is_running():
+            return True
+        if not self.is_supported(self.path):
+            return False
+        try:
+            self._is_fifo = stat.S_ISFIFO(os.stat(self.path).st_mode)
+            # FIFO 以读写方式打开，自己也算一个写端，没有外部写入者时不会一直收到 POLLHUP
+            self._fd = os.open(self.path, os.O_RDWR | os.O_NONBLOCK)
+            if not self._is_fifo:
+                os.write(self._fd, self.trigger.encode() + b'\0')
+        except OSError as e:
+            print(f"PSI trigger unavailable ({self.path}): {e}")
+            self._close_fd()
+            return False
+
+        self._partial = b''
+        self._wake_r, self._wake_w = os.pipe()
+        self._thread = threading.Thread(target=self._run, name="memclean-psi", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        thread = self._thread
+        if thread is None:
+            return
+        os.write(self._wake_w, b'x')
+        if thread is not threading.current_thread():
+            thread.join(timeout=2)
+        self._thread = None
+        for fd in (self._wake_r, self._wake_w):
+            os.close(fd)
+        self._wake_r = self._wake_w = None
+        self._close_fd()
+
+    def _close_fd(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _run(self):
+        poller = select.poll()
+        # 内核的 PSI 文件总是可读，只有 POLLPRI 表示触发；FIFO 则以 POLLIN 表示有事件
+        events = select.POLLIN if self._is_fifo else select.POLLPRI
+        poller.register(self._fd, events)
+        poller.register(self._wake_r, select.POLLIN)
+        while True:
+            for fd, revents in poller.poll():
+                if fd == self._wake_r:
+                    return
+                if revents & select.POLLERR:
+                    print("PSI trigger was removed by the kernel, watcher stopped.")
+                    return
+                self._dispatch()
+
+    def _dispatch(self):
+        if not self._is_fifo:
+            self._emit(read_pressure(self.path))
+            return
+        try:
+            data = os.read(self._fd, 4096)
+        except BlockingIOError:
+            return
+        # 一次读取可能包含多行，也可能以半行结尾；每个完整的行是一次事件
+        *lines, self._partial = (self._partial + data).split(b'\n')
+        for line in lines:
+            self._emit(parse_pressure(line.decode(errors='replace')))
+
+    def _emit(self, pressure):
+        try:
+            self.callback({'timestamp': time.time(), 'pressure': pressure})
+        except Exception as e:
+            print(f"Pressure callback error: {e}")
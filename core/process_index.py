@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+"""
+增量维护的进程索引
+- 以 (pid, create_time) 为键，每次刷新只对比新增和退出的 PID，已知进程不再重复查询。
+- PID 可能在两次刷新之间被新进程复用：使用方在真正处理某个进程之前调用 revalidate()，
+  create_time 不同时重新加载，避免沿用旧进程的名称和白名单标记。只检查实际要处理的进程。
+- 进程名、可执行文件路径、命令行等静态属性只在进程首次出现时读取一次并缓存。
+- 白名单判断在进程加入索引时预先算好，清理时无需再逐个转换小写、比较字符串。
+- 清理器和进程视图共享同一个索引 (get_process_index)。
+"""
+
+import os
+import threading
+
+import psutil
+
+# 这些系统关键进程不参与工作集整理
+DEFAULT_WHITELIST = frozenset({
+    'system', 'smss.exe', 'csrss.exe', 'wininit.exe', 'winlogon.exe',
+    'services.exe', 'lsass.exe'
+})
+
+
+class ProcessEntry:
+    """索引中的一个进程，只保存静态属性和预计算的标记。"""
+    __slots__ = ('pid', 'create_time', 'name', 'name_lower', 'exe', 'cmdline', 'whitelisted')
+
+    def __init__(self, pid, create_time, name, exe, cmdline):
+        self.pid = pid
+        self.create_time = create_time
+        self.name = name or ''
+        self.name_lower = self.name.lower()
+        self.exe = exe
+        self.cmdline = cmdline
+        self.whitelisted = False
+
+    @property
+    def key(self):
+        return (self.pid, self.create_time)
+
+    def __repr__(self):
+        return f"ProcessEntry(pid={self.pid}, name={self.name!r})"
+
+
+class ProcessIndex:
+    """
+    进程索引。
+    :param whitelist: 不参与清理的进程名 (小写)
+    """
+
+    def __init__(self, whitelist=DEFAULT_WHITELIST):
+        self.whitelist = frozenset(name.lower() for name in whitelist)
+        self.own_pid = os.getpid()
+        self._lock = threading.RLock()
+        self._entries = {}   # (pid, create_time) -> ProcessEntry
+        self._by_pid = {}    # pid -> (pid, create_time)
+        self.generation = 0
+
+    def refresh(self):
+        """
+        与系统当前的 PID 列表对比，只处理新增和已退出的进程。
+        :return: (新增数量, 退出数量)
+        """
+        pids = set(psutil.pids())
+        with self._lock:
+            known = self._by_pid.keys()
+            exited = known - pids
+            added = pids - known
+            for pid in exited:
+                del self._entries[self._by_pid.pop(pid)]
+            added_count = 0
+            for pid in added:
+                entry = self._load(pid)
+                if entry is None:
+                    continue
+                self._entries[entry.key] = entry
+                self._by_pid[pid] = entry.key
+                added_count += 1
+            self.generation += 1
+        return added_count, len(exited)
+
+    def revalidate(self, entry, create_time=None):
+        """
+        确认 entry 仍然是同一个进程。
+        :param create_time: 调用方已经读取到的 create_time，为 None 时在这里读取
+        :return: 原条目；PID 已被新进程复用时返回重新加载的条目；进程已退出时返回 None
+        """
+        if create_time is None:
+            create_time = _create_time(entry.pid)
+            if create_time is None:
+                return entry if psutil.pid_exists(entry.pid) else None
+        if not entry.create_time or create_time == entry.create_time:
+            # 创建时间未知 (当初无权读取) 时无从比较，沿用原条目
+            return entry
+        with self._lock:
+            if self._by_pid.get(entry.pid) == entry.key:
+                del self._entries[self._by_pid.pop(entry.pid)]
+            fresh = self._load(entry.pid)
+            if fresh is not None:
+                self._entries[fresh.key] = fresh
+                self._by_pid[fresh.pid] = fresh.key
+            return fresh
+
+    def _load(self, pid):
+        """读取新进程的静态属性。进程已退出时返回 None，权限不足的属性单独记为 None，其余属性照常保留。"""
+        try:
+            proc = psutil.Process(pid)
+            with proc.oneshot():
+                create_time = _safe(proc.create_time) or 0.0
+                name = _safe(proc.name)
+                exe = _safe(proc.exe)
+                cmdline = _safe(proc.cmdline)
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            return None
+        except psutil.AccessDenied:
+            create_time, name, exe, cmdline = 0.0, '', None, None
+        entry = ProcessEntry(pid, create_time, name, exe, cmdline)
+        entry.whitelisted = self._is_whitelisted(entry)
+        return entry
+
+    def _is_whitelisted(self, entry):
+        return entry.pid == self.own_pid or entry.name_lower in self.whitelist
+
+    def set_whitelist(self, whitelist):
+        """更新白名单并重新计算所有进程的标记。"""
+        with self._lock:
+            self.whitelist = frozenset(name.lower() for name in whitelist)
+            for entry in self._entries.values():
+                entry.whitelisted = self._is_whitelisted(entry)
+
+    def get(self, pid):
+        with self._lock:
+            key = self._by_pid.get(pid)
+            return self._entries.get(key) if key is not None else None
+
+    def entries(self):
+        """返回当前所有进程的快照列表。"""
+        with self._lock:
+            return list(self._entries.values())
+
+    def trim_candidates(self):
+        """返回不在白名单中的进程。"""
+        with self._lock:
+            return [entry for entry in self._entries.values() if not entry.whitelisted]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _create_time(pid):
+    """读取进程的 create_time，进程已退出或无权读取时返回 None。"""
+    try:
+        return psutil.Process(pid).create_time()
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        return None
+
+
+def _safe(getter):
+    try:
+        return getter()
+    except (psutil.AccessDenied, psutil.ZombieProcess, OSError):
+        return None
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_process_index():
+    """返回进程内共享的进程索引。"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ProcessIndex()
+        return _index
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+
+"""
+进程内存排行榜
+- 按 RSS / USS / 交换分区占用列出前 K 个进程，供主窗口的进程面板显示。
+- 分层刷新：当前排在前面的进程 (前 K 个再加少量余量) 每次刷新都重新读取；
+  其余进程最多每 COLD_INTERVAL 秒读取一次，由一个轮转队列记住上次扫描到的位置，
+  每次刷新只扫描到 CPU 预算 (按线程 CPU 时间计) 用完为止，进程再多单次刷新的开销也是固定的。
+- 每个进程只在 psutil.Process.oneshot() 中读取需要的属性：按 RSS 排序时只读 memory_info；
+  USS 需要读取代价高得多的 memory_full_info，但 USS 不会超过 RSS，所以只对可能进入前 K 的进程读取
+  (未读取过的进程以 RSS 作为上限参与排序，下一次刷新时再读取准确值)；按交换分区排序时才对所有进程读取。
+- 进程名只对进入排行榜的进程读取一次。前 K 个由堆选出 (heapq.nlargest)，复杂度 O(n log k)。
+- psutil 的 memory_info()/name() 不检查 PID 是否被新进程复用，每次读取前用 is_running()
+  (比较 create_time) 确认；PID 被复用时丢弃旧记录，下一次刷新作为新进程重新加入。
+- 刷新在后台线程中进行，回调在该线程中执行，UI 组件请通过 core.qt_bridge.LeaderboardBridge 接收。
+"""
+
+import heapq
+import threading
+import time
+from collections import deque, namedtuple
+
+import psutil
+
+from core.process_index import get_process_index
+
+SORT_KEYS = ('rss', 'uss', 'swap')
+DEFAULT_TOP_K = 15
+# 排在前 K 之后仍然每次刷新的进程数量，避免边界附近的进程忽进忽出
+HOT_MARGIN = 5
+REFRESH_INTERVAL = 2.0
+# 排行榜之外的进程最长多久重新读取一次 (秒)
+COLD_INTERVAL = 10.0
+# 每次刷新扫描冷进程的 CPU 时间预算 (毫秒)
+CPU_BUDGET_MS = 20.0
+
+LeaderboardRow = namedtuple('LeaderboardRow', 'pid name rss uss swap')
+# scanned: 本次读取的进程数；pending: 超过 COLD_INTERVAL 仍未读取的进程数
+RefreshStats = namedtuple('RefreshStats', 'processes scanned pending cpu_ms')
+
+
+class _Usage:
+    """一个进程最近一次读取到的内存占用。psutil.Process 在第一次读取时才创建。"""
+    __slots__ = ('pid', 'proc', 'name', 'rss', 'uss', 'swap', 'updated', 'full_denied')
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.proc = None
+        self.name = None
+        self.rss = 0
+        self.uss = None
+        self.swap = None
+        self.updated = 0.0
+        self.full_denied = False
+
+
+class ProcessLeaderboard:
+    """
+    增量维护的进程内存排行榜。
+    :param top_k: 显示的进程数量
+    :param sort_key: 'rss' / 'uss' / 'swap'
+    :param budget_ms: 每次刷新扫描冷进程的 CPU 时间预算
+    """
+
+    def __init__(self, top_k=DEFAULT_TOP_K, sort_key='rss', budget_ms=CPU_BUDGET_MS,
+                 cold_interval=COLD_INTERVAL, interval=REFRESH_INTERVAL):
+        self.top_k = top_k
+        self.sort_key = sort_key
+        self.budget_ms = budget_ms
+        self.cold_interval = cold_interval
+        self.interval = interval
+        self.rows = []
+        self.last_stats = None
+        self._usage = {}        # pid -> _Usage
+        self._cold = deque()    # 轮转队列，队首是下一个要扫描的 PID
+        self._hot = []
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    # --- 配置 ---
+    def set_sort_key(self, sort_key):
+        if sort_key not in SORT_KEYS:
+            raise ValueError(f"unknown sort key {sort_key!r}")
+        with self._lock:
+            self.sort_key = sort_key
+        self._wakeup.set()
+
+    # --- 刷新 ---
+    def refresh(self, now=None):
+        """执行一次刷新，返回前 K 行。"""
+        now = time.monotonic() if now is None else now
+        started = time.thread_time()
+        with self._lock:
+            self._sync_pids()
+            full = self.sort_key != 'rss'
+            scanned = 0
+            # 热进程：每次都读取
+            for usage in self._hot:
+                if self._read(usage, full, now):
+                    scanned += 1
+            # 冷进程：从上次停下的位置继续，直到预算用完或转完一圈
+            budget = started + self.budget_ms / 1000
+            cold_full = self.sort_key == 'swap'
+            for _ in range(len(self._cold)):
+                if time.thread_time() >= budget:
+                    break
+                pid = self._cold[0]
+                self._cold.rotate(-1)
+                usage = self._usage.get(pid)
+                if usage is None or now - usage.updated < self.cold_interval:
+                    continue
+                if self._read(usage, cold_full, now):
+                    scanned += 1
+            self._rank()
+            pending = sum(1 for usage in self._usage.values() if now - usage.updated >= self.cold_interval)
+            self.last_stats = RefreshStats(len(self._usage), scanned, pending,
+                                           round((time.thread_time() - started) * 1000, 2))
+            return self.rows
+
+    def _sync_pids(self):
+        """与系统当前的 PID 列表对比：新进程排到冷队列最前面，尽快读取一次。"""
+        pids = set(psutil.pids())
+        usage = self._usage
+        for pid in usage.keys() - pids:
+            del usage[pid]
+        for pid in pids - usage.keys():
+            usage[pid] = _Usage(pid)
+            self._cold.appendleft(pid)
+        if len(self._cold) > 2 * len(usage):
+            # 已退出进程的 PID 在轮转时跳过，积累过多时一次清理
+            self._cold = deque(pid for pid in self._cold if pid in usage)
+
+    def _read(self, usage, full, now):
+        try:
+            proc = usage.proc
+            if proc is None:
+                proc = usage.proc = psutil.Process(usage.pid)
+            elif not proc.is_running():
+                # 进程已退出，或 PID 已被新进程复用：旧的名称和读数都不再适用
+                raise psutil.NoSuchProcess(usage.pid)
+            with proc.oneshot():
+                if full and not usage.full_denied:
+                    try:
+                        info = proc.memory_full_info()
+                        usage.uss = info.uss
+                        usage.swap = getattr(info, 'swap', None)
+                    except psutil.AccessDenied:
+                        # 没有权限读取其他用户进程的 USS，之后只读 RSS
+                        usage.full_denied = True
+                        info = proc.memory_info()
+                else:
+                    info = proc.memory_info()
+                    if info.rss != usage.rss:
+                        # 只读了 RSS：之前的 USS/交换分区已经过时，重新以 RSS 为上限参与排序
+                        usage.uss = usage.swap = None
+                usage.rss = info.rss
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            # 热进程列表中可能还留着 PID 被复用之前的旧记录，不要误删同一 PID 的新记录
+            if self._usage.get(usage.pid) is usage:
+                del self._usage[usage.pid]
+            return False
+        except psutil.AccessDenied:
+            # 连 RSS 都无权读取，同样按 cold_interval 重试，不占用每次刷新的预算
+            usage.full_denied = True
+            usage.updated = now
+            return False
+        usage.updated = now
+        return True
+
+    def _value(self, usage):
+        key = self.sort_key
+        if key == 'rss':
+            return usage.rss
+        if usage.full_denied:
+            return (-1, usage.rss)
+        value = usage.uss if key == 'uss' else usage.swap
+        if value is None:
+            # 还没有读取过：USS 以 RSS 为上限参与排序，交换分区按 0 处理
+            value = usage.rss if key == 'uss' else 0
+        # 数值相同 (例如都没有使用交换分区) 时按 RSS 排序
+        return (value, usage.rss)
+
+    def _rank(self):
+        ranked = heapq.nlargest(self.top_k + HOT_MARGIN, self._usage.values(), key=self._value)
+        self._hot = ranked
+        rows = []
+        index = get_process_index()
+        for usage in ranked[:self.top_k]:
+            if usage.name is None:
+                entry = index.get(usage.pid)
+                if entry is not None and entry.name and usage.proc is not None \
+                        and entry.create_time == usage.proc.create_time():
+                    usage.name = entry.name
+                else:
+                    usage.name = _process_name(usage)
+            rows.append(LeaderboardRow(usage.pid, usage.name, usage.rss, usage.uss, usage.swap))
+        self.rows = rows
+
+    # --- 订阅 ---
+    def subscribe(self, callback):
+        """callback(rows, stats)，在刷新线程中调用。第一个订阅者出现时启动刷新线程。"""
+        with self._lock:
+            if callback not in self._listeners:
+                self._listeners.append(callback)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="memclean-leaderboard", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def unsubscribe(self, callback):
+        """最后一个订阅者退订后刷新线程退出。"""
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._listeners:
+                    self._thread = None
+                    return
+                listeners = list(self._listeners)
+            try:
+                rows = self.refresh()
+            except Exception as e:
+                print(f"Process leaderboard refresh error: {e}")
+                rows = self.rows
+            for callback in listeners:
+                try:
+                    callback(rows, self.last_stats)
+                except Exception as e:
+                    print(f"Leaderboard listener error: {e}")
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+
+def _process_name(usage):
+    try:
+        return (usage.proc or psutil.Process(usage.pid)).name()
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        return f"[{usage.pid}]"
+
+
+_leaderboard = None
+
+
+def get_process_leaderboard():
+    """返回进程内共享的排行榜。"""
+    global _leaderboard
+    if _leaderboard is None:
+        _leaderboard = ProcessLeaderboard()
+    return _leaderboard
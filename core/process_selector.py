@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+"""
+清理目标选择模块
+- 在整理工作集之前，按“预期回收收益 - 预期回填代价”给进程打分，只处理最划算的一部分。
+- 收益：进程的常驻内存 (RSS)，按距离上次占用CPU的时间加权，越久不活跃越可能真正省下内存。
+- 代价：上次整理后该进程的缺页 (major fault) 速率，整理后马上缺页回填的进程会被降权甚至跳过。
+- 用堆选出前 K 个，进程表很大时复杂度为 O(n log k)。
+"""
+
+import heapq
+import math
+import sys
+import time
+import threading
+
+import psutil
+
+from core.process_index import get_process_index
+
+PAGE_SIZE = 4096
+
+
+class Candidate:
+    """一个候选进程及其评分。"""
+    __slots__ = ('entry', 'rss', 'idle_seconds', 'fault_rate', 'score')
+
+    def __init__(self, entry, rss, idle_seconds, fault_rate, score):
+        self.entry = entry
+        self.rss = rss
+        self.idle_seconds = idle_seconds
+        self.fault_rate = fault_rate
+        self.score = score
+
+    @property
+    def pid(self):
+        return self.entry.pid
+
+    def __lt__(self, other):
+        return self.score < other.score
+
+    def __repr__(self):
+        return f"Candidate(pid={self.entry.pid}, name={self.entry.name!r}, score={self.score:.0f})"
+
+
+class _ProcStats:
+    """每个进程的动态观测值，用于计算空闲时长和整理后的缺页速率。"""
+    __slots__ = ('cpu_time', 'first_seen', 'last_active', 'trim_time', 'trim_faults', 'fault_rate')
+
+    def __init__(self, cpu_time, now):
+        self.cpu_time = cpu_time
+        self.first_seen = now
+        self.last_active = None
+        self.trim_time = None
+        self.trim_faults = None
+        self.fault_rate = 0.0
+
+
+def _read_fault_count(proc, meminfo):
+    """读取进程累计的缺页次数；Windows 来自 memory_info，Linux 读取 /proc/<pid>/stat 的 majflt。"""
+    faults = getattr(meminfo, 'num_page_faults', None)
+    if faults is not None:
+        return faults
+    if sys.platform == 'linux':
+        try:
+            with open(f'/proc/{proc.pid}/stat', 'rb') as f:
+                fields = f.read().rsplit(b')', 1)[1].split()
+            return int(fields[9])  # 第 12 个字段 majflt，跳过 pid 和 comm 后下标为 9
+        except (OSError, IndexError, ValueError):
+            return None
+    return None
+
+
+class TrimSelector:
+    """
+    清理目标选择器。
+    :param idle_tau: 空闲时长的半饱和常数 (秒)，空闲 idle_tau 秒的进程收益权重为 0.5
+    :param refault_horizon: 估算回填代价的时间窗口 (秒)
+    :param refault_weight: 回填代价相对于收益的权重
+    """
+
+    def __init__(self, index=None, idle_tau=60.0, refault_horizon=30.0, refault_weight=2.0):
+        self.index = index or get_process_index()
+        self.idle_tau = idle_tau
+        self.refault_horizon = refault_horizon
+        self.refault_weight = refault_weight
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def score(self, rss, idle_seconds, fault_rate):
+        """收益 = RSS × 空闲权重；代价 = 预计在 refault_horizon 内缺页回填的字节数。"""
+        idle_weight = 1.0 - math.exp(-idle_seconds * math.log(2) / self.idle_tau)
+        benefit = rss * idle_weight
+        refault_bytes = min(rss, fault_rate * PAGE_SIZE * self.refault_horizon)
+        return benefit - self.refault_weight * refault_bytes
+
+    def _observe(self, entry, now):
+        """读取进程的 RSS、CPU 时间和缺页计数，更新动态观测值并返回候选对象。"""
+        try:
+            proc = psutil.Process(entry.pid)
+            # 进程索引不在每次刷新时检查 PID 复用，这里对实际要处理的进程确认一次
+            try:
+                create_time = proc.create_time()
+            except psutil.AccessDenied:
+                create_time = None
+            if create_time is not None:
+                entry = self.index.revalidate(entry, create_time)
+                if entry is None or entry.whitelisted:
+                    return None
+            with proc.oneshot():
+                meminfo = proc.memory_info()
+                cpu = proc.cpu_times()
+                faults = _read_fault_count(proc, meminfo)
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return None
+
+        cpu_time = cpu.user + cpu.system
+        stats = self._stats.get(entry.key)
+        if stats is None:
+            stats = self._stats[entry.key] = _ProcStats(cpu_time, now)
+        elif cpu_time > stats.cpu_time:
+            stats.cpu_time = cpu_time
+            stats.last_active = now
+        if stats.last_active is None:
+            # 观测以来从未占用CPU，但不知道此前空闲了多久，至少按半饱和处理
+            idle_seconds = max(now - stats.first_seen, self.idle_tau)
+        else:
+            idle_seconds = now - stats.last_active
+
+        if stats.trim_time is not None and faults is not None and now > stats.trim_time:
+            stats.fault_rate = max(faults - stats.trim_faults, 0) / (now - stats.trim_time)
+        score = self.score(meminfo.rss, idle_seconds, stats.fault_rate)
+        return Candidate(entry, meminfo.rss, idle_seconds, stats.fault_rate, score)
+
+    def select(self, top_n=None, target_bytes=None):
+        """
+        返回按评分从高到低排列的候选进程，只包含评分为正的进程。
+        :param top_n: 最多选择多少个进程
+        :param target_bytes: 累计 RSS 达到该值后停止选择
+        """
+        now = time.monotonic()
+        with self._lock:
+            entries = self.index.trim_candidates()
+            live_keys = set()
+            candidates = []
+            for entry in entries:
+                live_keys.add(entry.key)
+                candidate = self._observe(entry, now)
+                if candidate is not None and candidate.score > 0:
+                    candidates.append(candidate)
+            # 清除已退出进程的观测值，保持内存有界
+            for key in self._stats.keys() - live_keys:
+                del self._stats[key]
+
+        if target_bytes is None:
+            if top_n is None:
+                return sorted(candidates, reverse=True)
+            return heapq.nlargest(top_n, candidates)
+
+        # 按目标字节数选择：建堆 O(n)，每取出一个 O(log n)
+        heap = [(-c.score, i, c) for i, c in enumerate(candidates)]
+        heapq.heapify(heap)
+        selected, total = [], 0
+        while heap and total < target_bytes and (top_n is None or len(selected) < top_n):
+            candidate = heapq.heappop(heap)[2]
+            selected.append(candidate)
+            total += candidate.rss
+        return selected
+
+    def record_trim(self, candidates):
+        """记录整理时刻的缺页计数，下次选择时据此计算整理后的缺页速率。"""
+        now = time.monotonic()
+        with self._lock:
+            for candidate in candidates:
+                stats = self._stats.get(candidate.entry.key)
+                if stats is None:
+                    continue
+                try:
+                    proc = psutil.Process(candidate.pid)
+                    faults = _read_fault_count(proc, proc.memory_info())
+                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                    continue
+                if faults is not None:
+                    stats.trim_time = now
+                    stats.trim_faults = faults
+
+
+_selector = None
+
+
+def get_trim_selector():
+    """返回进程内共享的选择器，观测值需要跨多次清理保留。"""
+    global _selector
+    if _selector is None:
+        _selector = TrimSelector()
+    return _selector
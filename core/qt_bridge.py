@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+"""
+核心服务与 Qt 之间的桥接模块
+- core 中的服务只依赖标准库和 psutil，通过普通回调发布数据。
+- 这里把回调转换为 Qt 信号，跨线程时自动排队到接收者所在的线程（通常是UI主线程）。
+"""
+
+from PySide6.QtCore import QObject, Signal
+
+from core.system_monitor import get_sampler, MAX_INTERVAL
+from core.cleanup_executor import get_cleanup_executor
+from core.pressure_watcher import PressureWatcher, PSI_MEMORY_PATH, DEFAULT_TRIGGER
+from core.config_manager import get_config_store
+from core.process_leaderboard import get_process_leaderboard
+
+
+class SamplerBridge(QObject):
+    """
+    共享采样器的 Qt 适配器。
+    每个需要数据的组件持有一个实例，start() 订阅，stop() 退订。
+    :param resolution: 组件能接受的最长采样间隔 (秒)，见 SystemSampler.subscribe
+    """
+    # 参数与 get_system_stats() 的返回值结构一致
+    sample_ready = Signal(object)
+    # 便于直接连接到只关心百分比的槽函数
+    stats_updated = Signal(float, float)
+
+    def __init__(self, parent=None, resolution=MAX_INTERVAL):
+        super().__init__(parent)
+        self.sampler = get_sampler()
+        self.resolution = resolution
+        self._active = False
+        # 对象被销毁时确保退订，避免采样线程向已删除的对象发信号
+        sampler, publish = self.sampler, self._publish
+        self.destroyed.connect(lambda *_: sampler.unsubscribe(publish))
+
+    def start(self):
+        if not self._active:
+            self._active = True
+            self.sampler.subscribe(self._publish, self.resolution)
+
+    def stop(self):
+        if self._active:
+            self._active = False
+            self.sampler.unsubscribe(self._publish)
+
+    def is_active(self):
+        return self._active
+
+    def _publish(self, sample):
+        # 在采样线程中执行，信号会被排队投递到UI线程
+        self.sample_ready.emit(sample)
+        self.stats_updated.emit(float(sample['cpu_percent']), float(sample['mem_info'].percent))
+
+
+class CleanupBridge(QObject):
+    """
+    异步清理执行器的 Qt 适配器。
+    submit() 立即返回，进度和结果通过信号投递回UI线程。
+    """
+    started = Signal()
+    progress = Signal(int, str)
+    # (success, result)，与 clean_memory() 的返回值一致
+    finished = Signal(bool, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.executor = get_cleanup_executor()
+        # 最近一次提交的清理句柄
+        self.handle = None
+
+    def submit(self, source="manual", timeout=None, **options):
+        handle = self.executor.submit(source=source, timeout=timeout, **options)
+        if handle is not None and handle is not self.handle:
+            self.handle = handle
+            self.started.emit()
+            handle.add_progress_callback(self.progress.emit)
+            handle.add_done_callback(self.finished.emit)
+        return handle
+
+    def cancel(self):
+        if self.handle is not None:
+            self.handle.cancel()
+
+    def is_running(self):
+        return self.handle is not None and not self.handle.done()
+
+
+class PressureBridge(QObject):
+    """
+    PSI 压力监听器的 Qt 适配器。
+    start() 返回 False 时说明 PSI 不可用，调用方应退回定时轮询。
+    """
+    # {'timestamp', 'pressure'}
+    pressure_detected = Signal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.watcher = None
+
+    def start(self, path=PSI_MEMORY_PATH, trigger=DEFAULT_TRIGGER):
+        self.stop()
+        self.watcher = PressureWatcher(self.pressure_detected.emit, path=path, trigger=trigger)
+        if not self.watcher.start():
+            self.watcher = None
+            return False
+        return True
+
+    def stop(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+
+    def is_active(self):
+        return self.watcher is not None and self.watcher.is_running()
+
+
+class ConfigBridge(QObject):
+    """
+    共享配置的 Qt 适配器。
+    不论修改来自设置窗口还是外部编辑配置文件，都通过 changed 信号投递到UI线程。
+    """
+    # (config, changed_keys)
+    changed = Signal(object, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.store = get_config_store()
+        self.store.subscribe(self.changed.emit)
+        store, emit = self.store, self.changed.emit
+        self.destroyed.connect(lambda *_: store.unsubscribe(emit))
+
+
+class LeaderboardBridge(QObject):
+    """
+    进程内存排行榜的 Qt 适配器，start() 订阅，stop() 退订。
+    排序方式由共享的排行榜决定，见 ProcessLeaderboard.set_sort_key。
+    """
+    # (rows, stats)，见 core.process_leaderboard.LeaderboardRow / RefreshStats
+    updated = Signal(object, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.leaderboard = get_process_leaderboard()
+        self._active = False
+        leaderboard, publish = self.leaderboard, self._publish
+        self.destroyed.connect(lambda *_: leaderboard.unsubscribe(publish))
+
+    def start(self):
+        if not self._active:
+            self._active = True
+            self.leaderboard.subscribe(self._publish)
+
+    def stop(self):
+        if self._active:
+            self._active = False
+            self.leaderboard.unsubscribe(self._publish)
+
+    def _publish(self, rows, stats):
+        # 在刷新线程中执行，信号会被排队投递到UI线程
+        self.updated.emit(rows, stats)
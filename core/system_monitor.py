@@ -6,37 +6,351 @@
 - 【新】优化了CPU使用率的获取方式，使其与任务管理器的数据更一致。
 """
 
+import os
 import sys
 import psutil
 import ctypes
 import subprocess
-import os
 import time
+import threading
+
+from core import cgroup_reclaim
+from core.config_manager import load_config
+from core.process_index import get_process_index
+from core.process_selector import get_trim_selector
+from core.tracing import span, traced
 
 # --- 在模块加载时就初始化CPU使用率计算 ---
 # 第一次调用不返回有意义的值，但会设定一个时间点，用于后续计算。
 psutil.cpu_percent(interval=None)
 
+
 def get_system_stats():
-    """获取当前的CPU和内存使用率。"""
+    """
+    获取当前的CPU和内存使用率。
+    如果共享采样器正在运行，直接返回它最近一次的样本，避免重置 cpu_percent 的计算基准。
+    """
+    if _sampler is not None:
+        sample = _sampler.latest()
+        if sample is not None:
+            return sample
+    return _take_sample()
+
+
+@traced("sampler.take_sample")
+def _take_sample():
+    """采集一次样本。cpu_percent 返回自上次调用以来的使用率，interval=None使其不阻塞。"""
     return {
-        # 后续调用会返回自上次调用以来的CPU使用率，interval=None使其不阻塞
+        'timestamp': time.time(),
         'cpu_percent': psutil.cpu_percent(interval=None),
         'mem_info': psutil.virtual_memory()
     }
 
-def clean_memory_windows():
+
+# 自适应采样的间隔范围 (秒)
+MIN_INTERVAL = 0.1
+MAX_INTERVAL = 10.0
+
+# 波动以偏离 EWMA 基线的程度衡量，而不是与上一次读数相比；偏离还必须明显超出平常的噪声
+# (偏离量的 EWMA 乘以 NOISE_FACTOR)，读数一直抖动的指标不会被噪声拖到最短间隔
+BASELINE_ALPHA = 0.3
+NOISE_FACTOR = 3.0
+
+# 每个指标: (读取函数, 取出用于判断波动的数值, 视为快速变化的偏离量 (百分点), 阈值对应的采样间隔)
+# cpu_percent 是上次读取以来的平均值，窗口越短噪声越大 (约与间隔的平方根成反比)，
+# 间隔短于对应值时阈值按比例放大；None 表示读数与间隔无关
+METRICS = {
+    'cpu_percent': (lambda: psutil.cpu_percent(interval=None), float, 5.0, 1.0),
+    'mem_info': (lambda: psutil.virtual_memory(), lambda mem: mem.percent, 1.0, None),
+}
+
+
+class _MetricSchedule:
+    """单个指标的采样节奏。"""
+    __slots__ = ('interval', 'baseline', 'noise', 'reading', 'last_time', 'next_due')
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.baseline = None
+        self.noise = 0.0
+        self.reading = None
+        self.last_time = None
+        self.next_due = 0.0
+
+    def adapt(self, value, threshold, ceiling, reference=None):
+        """偏离基线大时间隔减半，平稳时放大 1.5 倍，并限制在 [MIN_INTERVAL, ceiling] 内。"""
+        baseline = self.baseline
+        if baseline is None:
+            self.baseline = value
+        else:
+            if reference is not None and self.interval < reference:
+                threshold *= (reference / self.interval) ** 0.5
+            delta = abs(value - baseline)
+            threshold = max(threshold, NOISE_FACTOR * self.noise)
+            if delta >= threshold:
+                self.interval /= 2
+            elif delta < threshold / 4:
+                self.interval *= 1.5
+            self.baseline = baseline + BASELINE_ALPHA * (value - baseline)
+            self.noise += BASELINE_ALPHA * (delta - self.noise)
+        self.interval = min(max(self.interval, MIN_INTERVAL), ceiling)
+
+
+class ResolutionLease:
+    """request_resolution() 返回的临时分辨率请求，release() 或超时后失效，可用作上下文管理器。"""
+
+    def __init__(self, sampler, interval, expires_at):
+        self.sampler = sampler
+        self.interval = interval
+        self.expires_at = expires_at
+
+    def release(self):
+        self.sampler._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class SystemSampler:
+    """
+    共享采样总线
+    - 每个周期只采集一次，然后把同一份样本分发给所有订阅者，各组件看到的数据完全一致。
+    - 只有一个地方调用 cpu_percent，不会再互相重置计算基准。
+    - 第一个订阅者出现时启动采样线程，最后一个订阅者退订后线程自动退出。
+    - 每个指标单独调整采样间隔：数值平稳时逐步放慢到 MAX_INTERVAL，变化快时收紧到 MIN_INTERVAL。
+      订阅者声明自己能接受的最粗分辨率，清理或策略可以临时请求更高的分辨率，采样器按其中最细的一个执行。
+    回调在采样线程中执行，UI 组件请通过 core.qt_bridge.SamplerBridge 以信号的方式接收。
+    """
+
+    def __init__(self, interval=1.0):
+        # 指标的初始采样间隔，之后按波动情况自动调整
+        self.interval = interval
+        self._subscribers = {}
+        self._leases = []
+        self._schedules = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._latest = None
+
+    def subscribe(self, callback, resolution=MAX_INTERVAL):
+        """
+        订阅样本。callback(sample) 的 sample 结构与 get_system_stats() 一致。
+        :param resolution: 该订阅者能接受的最长采样间隔 (秒)，如正在显示数据的窗口为 1 秒
+        """
+        with self._lock:
+            self._subscribers[callback] = resolution
+            self._ensure_running()
+            self._wakeup.set()
+
+    def unsubscribe(self, callback):
+        """取消订阅。没有订阅者时采样线程会在当前周期结束后退出。"""
+        with self._lock:
+            if self._subscribers.pop(callback, None) is None:
+                return
+            if not self._subscribers:
+                self._wakeup.set()
+
+    def has_subscribers(self):
+        with self._lock:
+            return bool(self._subscribers)
+
+    def request_resolution(self, interval, duration=None):
+        """
+        临时要求采样间隔不超过 interval 秒，例如自动清理策略在内存接近阈值时。
+        :param duration: 有效时长 (秒)，为 None 时直到 release() 为止
+        :return: ResolutionLease
+        """
+        expires_at = None if duration is None else time.monotonic() + duration
+        lease = ResolutionLease(self, max(interval, MIN_INTERVAL), expires_at)
+        with self._lock:
+            self._leases.append(lease)
+            self._wakeup.set()
+        return lease
+
+    def request_high_resolution(self, duration=None):
+        """以最高分辨率采样，例如清理进行期间。"""
+        return self.request_resolution(MIN_INTERVAL, duration)
+
+    def _release(self, lease):
+        with self._lock:
+            if lease in self._leases:
+                self._leases.remove(lease)
+
+    def current_intervals(self):
+        """返回每个指标当前的采样间隔 (秒)。"""
+        with self._lock:
+            return {name: schedule.interval for name, schedule in self._schedules.items()}
+
+    def latest(self):
+        """返回最近一次样本；采样器未运行时返回 None。"""
+        if self._thread is None:
+            return None
+        return self._latest
+
+    def stop(self):
+        """移除所有订阅者并等待采样线程退出。"""
+        with self._lock:
+            self._subscribers.clear()
+            thread = self._thread
+            self._wakeup.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=2)
+
+    def _ensure_running(self):
+        # 调用方已持有 self._lock
+        if self._thread is not None:
+            return
+        self._wakeup.clear()
+        self._schedules = {name: _MetricSchedule(self.interval) for name in METRICS}
+        self._thread = threading.Thread(target=self._run, name="memclean-sampler", daemon=True)
+        self._thread.start()
+
+    def _ceiling(self, now):
+        """当前允许的最长采样间隔：所有订阅者和未过期请求中最细的一个。调用方已持有 self._lock。"""
+        self._leases = [lease for lease in self._leases if lease.expires_at is None or lease.expires_at > now]
+        return min([MAX_INTERVAL, *self._subscribers.values(), *(lease.interval for lease in self._leases)])
+
+    def _run(self):
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    self._latest = None
+                    return
+                ceiling = self._ceiling(now)
+                schedules = self._schedules
+
+            # 分辨率要求变细时，已经排好的下一次采样立即提前
+            for schedule in schedules.values():
+                if schedule.interval > ceiling:
+                    schedule.interval = ceiling
+                    if schedule.last_time is not None:
+                        schedule.next_due = min(schedule.next_due, schedule.last_time + ceiling)
+
+            due = [name for name, schedule in schedules.items() if schedule.next_due <= now]
+            if due:
+                with span("sampler.read"):
+                    for name in due:
+                        read, value_of, threshold, reference = METRICS[name]
+                        schedule = schedules[name]
+                        schedule.reading = read()
+                        schedule.adapt(value_of(schedule.reading), threshold, ceiling, reference)
+                        schedule.last_time = now
+                        schedule.next_due = now + schedule.interval
+                sample = {'timestamp': time.time()}
+                for name, schedule in schedules.items():
+                    sample[name] = schedule.reading
+                with span("sampler.publish"):
+                    self._publish(sample)
+
+            timeout = min(schedule.next_due for schedule in schedules.values()) - time.monotonic()
+            self._wakeup.wait(max(timeout, 0))
+            with self._lock:
+                self._wakeup.clear()
+
+    def _publish(self, sample):
+        with self._lock:
+            self._latest = sample
+            subscribers = list(self._subscribers)
+
+        for callback in subscribers:
+            try:
+                callback(sample)
+            except Exception as e:
+                print(f"Sampler subscriber error: {e}")
+
+
+_sampler = None
+
+
+def get_sampler():
+    """返回进程内唯一的共享采样器。"""
+    global _sampler
+    if _sampler is None:
+        _sampler = SystemSampler()
+    return _sampler
+
+# --- 清理后的内存释放测量 ---
+SETTLE_INTERVAL = 0.015       # 采样间隔 (秒)
+SETTLE_WINDOW = 4             # 连续多少个采样点落在容差内算作稳定
+SETTLE_TOLERANCE_MB = 1.0     # 稳定判定的容差
+SETTLE_MAX_WAIT = 1.5         # 最长等待时间 (秒)
+
+
+@traced("cleanup.measure_release")
+def measure_release(freed_fn, interval=SETTLE_INTERVAL, window=SETTLE_WINDOW,
+                    tolerance_mb=SETTLE_TOLERANCE_MB, max_wait=SETTLE_MAX_WAIT):
+    """
+    以高频率采样清理后的内存变化，曲线稳定后立即返回，取代固定的等待时间。
+    :param freed_fn: 返回“到目前为止已释放的字节数”的函数
+    :return: {'freed_mb', 'settled', 'settle_ms', 'curve': [(毫秒, 已释放MB), ...]}
+    """
+    tolerance = tolerance_mb * 1024 * 1024
+    started = time.perf_counter()
+    curve = []
+    settled = False
+    while True:
+        freed = freed_fn()
+        elapsed = time.perf_counter() - started
+        curve.append((elapsed * 1000, freed / (1024 * 1024)))
+        if len(curve) >= window:
+            recent = [value for _, value in curve[-window:]]
+            if (max(recent) - min(recent)) * 1024 * 1024 <= tolerance:
+                settled = True
+                break
+        if elapsed >= max_wait:
+            break
+        time.sleep(interval)
+    return {
+        'freed_mb': max(curve[-1][1], 0),
+        'settled': settled,
+        'settle_ms': curve[-1][0],
+        'curve': curve,
+    }
+
+
+class CleanupCancelled(Exception):
+    """清理过程被取消或超时。"""
+
+
+def _report(progress, percent, message):
+    if progress is not None:
+        progress(percent, message)
+
+
+def _check_cancel(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise CleanupCancelled()
+
+
+@traced("cleanup.windows.select_targets")
+def select_trim_targets(config):
+    """
+    刷新进程索引，按收益/代价模型选出值得整理工作集的进程。
+    trim_max_processes 和 trim_target_mb 为 0 时表示不做对应的限制。
+    """
+    get_process_index().refresh()
+    top_n = config.get("trim_max_processes", 0) or None
+    target_mb = config.get("trim_target_mb", 0)
+    target_bytes = int(target_mb * 1024 * 1024) if target_mb else None
+    return get_trim_selector().select(top_n=top_n, target_bytes=target_bytes)
+
+
+@traced("cleanup.windows")
+def clean_memory_windows(progress=None, cancel_event=None, config=None):
     """
     为Windows系统执行专业级、三段式深度内存清理。
     """
+    if config is None:
+        config = load_config()
     # ... (此部分清理逻辑保持不变) ...
     PROCESS_QUERY_INFORMATION = 0x0400
     PROCESS_SET_QUOTA = 0x0100
-    system_whitelist = {
-        'system', 'smss.exe', 'csrss.exe', 'wininit.exe', 'winlogon.exe',
-        'services.exe', 'lsass.exe'
-    }
-    own_pid = os.getpid()
     kernel32 = ctypes.windll.kernel32
     psapi = ctypes.windll.psapi
     ntdll = ctypes.WinDLL('ntdll.dll')
@@ -46,55 +360,167 @@ def clean_memory_windows():
     except AttributeError:
         return (False, "无法访问 ntdll.dll 中的关键函数。")
     mem_before = psutil.virtual_memory().used
-    for proc in psutil.process_iter(['pid', 'name']):
-        try:
-            if proc.info['name'].lower() in system_whitelist or proc.pid == own_pid:
-                continue
-            handle = kernel32.OpenProcess(PROCESS_QUERY_INFORMATION | PROCESS_SET_QUOTA, False, proc.pid)
+    _report(progress, 5, "正在挑选需要整理的进程...")
+    # 只整理收益高于回填代价的进程，白名单 (含本进程) 已在进程索引中预先排除
+    targets = select_trim_targets(config)
+    _report(progress, 20, "正在整理进程工作集...")
+    trimmed = []
+    with span("cleanup.windows.trim_working_sets"):
+        for candidate in targets:
+            _check_cancel(cancel_event)
+            handle = kernel32.OpenProcess(PROCESS_QUERY_INFORMATION | PROCESS_SET_QUOTA, False, candidate.pid)
             if handle:
-                psapi.EmptyWorkingSet(handle)
+                if psapi.EmptyWorkingSet(handle):
+                    trimmed.append(candidate)
                 kernel32.CloseHandle(handle)
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            continue
+    get_trim_selector().record_trim(trimmed)
+    _check_cancel(cancel_event)
+    _report(progress, 60, "正在清理修改页列表...")
     system_memory_list_info = 80
     modified_page_list_class = ctypes.c_int(8)
-    ntdll.NtSetSystemInformation(system_memory_list_info, ctypes.byref(modified_page_list_class), ctypes.sizeof(modified_page_list_class))
+    with span("cleanup.windows.flush_modified_list"):
+        ntdll.NtSetSystemInformation(system_memory_list_info, ctypes.byref(modified_page_list_class), ctypes.sizeof(modified_page_list_class))
+    _check_cancel(cancel_event)
+    _report(progress, 75, "正在清理备用列表...")
     system_purge_standby_list = 3
-    ntdll.NtSetSystemInformation(system_purge_standby_list, None, 0)
-    time.sleep(0.5)
-    mem_after = psutil.virtual_memory().used
-    freed_mb = (mem_before - mem_after) / (1024 * 1024)
-    if freed_mb < 0: freed_mb = 0
-    return (True, {'freed_mb': freed_mb})
+    with span("cleanup.windows.purge_standby_list"):
+        ntdll.NtSetSystemInformation(system_purge_standby_list, None, 0)
+    _report(progress, 90, "正在统计释放的内存...")
+    release = measure_release(lambda: mem_before - psutil.virtual_memory().used)
+    return (True, {
+        'freed_mb': release['freed_mb'],
+        'cleaned_count': len(trimmed),
+        'settle_ms': release['settle_ms'],
+        'release_curve': release['curve'],
+    })
+
+
+@traced("cleanup.cgroup_reclaim")
+def clean_memory_cgroups(config, progress=None, cancel_event=None):
+    """通过 cgroup v2 的 memory.reclaim 只回收配置中指定的 cgroup。"""
+    _report(progress, 10, "正在回收指定 cgroup 的内存...")
+    target_bytes = int(config.get("reclaim_target_mb", 512) * 1024 * 1024)
+    return cgroup_reclaim.reclaim_cgroups(
+        config.get("reclaim_cgroups", []),
+        target_bytes,
+        root=config.get("cgroup_root", cgroup_reclaim.CGROUP_ROOT),
+        cancel_event=cancel_event,
+    )
+
+
+# --- Linux 分级清理 ---
+DROP_CACHES_PATH = '/proc/sys/vm/drop_caches'
+COMPACT_MEMORY_PATH = '/proc/sys/vm/compact_memory'
+
+# (阶段名称, 写入的文件, 写入的值, 进度提示)，按代价从低到高排列
+LINUX_STAGES = (
+    ('dentries_inodes', DROP_CACHES_PATH, '2', "正在释放目录项和inode缓存..."),
+    ('pagecache', DROP_CACHES_PATH, '1', "正在释放页缓存..."),
+    ('compact', COMPACT_MEMORY_PATH, '1', "正在整理内存碎片..."),
+    ('full', DROP_CACHES_PATH, '3', "正在释放全部缓存..."),
+)
+
+
+def _write_proc(path, value):
+    with open(path, 'w') as f:
+        f.write(f"{value}\n")
+
+
+@traced("cleanup.linux")
+def clean_memory_linux(progress=None, cancel_event=None, target_mb=None, budget_ms=None):
+    """
+    Linux 分级清理：按代价从低到高逐级执行，每一级之后重新测量空闲内存，
+    达到 target_mb 或用完 budget_ms 时立即停止。
+    target_mb 和 budget_ms 都未指定时保持原有行为，只执行最后的完全清理；
+    只指定 budget_ms 时逐级执行到预算用完为止。
+    内核不提供某一级的控制文件时 (例如没有启用 CONFIG_COMPACTION 的内核或容器中的 compact_memory)，
+    跳过这一级并在 stages 中记为 skipped。
+    """
+    started = time.perf_counter()
+    free_before = psutil.virtual_memory().free
+    _report(progress, 5, "正在同步文件系统...")
+    with span("cleanup.linux.sync"):
+        subprocess.run(['sync'], check=True, capture_output=True)
+
+    stages = LINUX_STAGES if target_mb or budget_ms else LINUX_STAGES[-1:]
+    target_bytes = (target_mb or 0) * 1024 * 1024
+    stage_results = []
+    target_met = budget_exhausted = False
+    free_last = free_before
+    for i, (name, path, value, message) in enumerate(stages):
+        _check_cancel(cancel_event)
+        if budget_ms is not None and (time.perf_counter() - started) * 1000 >= budget_ms:
+            budget_exhausted = True
+            break
+        if not os.path.exists(path):
+            stage_results.append({'name': name, 'skipped': True})
+            continue
+        _report(progress, 10 + int(80 * i / len(stages)), message)
+        t0 = time.perf_counter()
+        with span("cleanup.linux." + name):
+            _write_proc(path, value)
+        # 等这一级释放的内存稳定下来再判断是否达到目标
+        release = measure_release(lambda: psutil.virtual_memory().free - free_last)
+        stage_results.append({
+            'name': name,
+            'elapsed_ms': (time.perf_counter() - t0) * 1000,
+            'freed_mb': release['freed_mb'],
+        })
+        free_last = psutil.virtual_memory().free
+        if target_bytes and free_last - free_before >= target_bytes:
+            target_met = True
+            break
+
+    _report(progress, 90, "正在统计释放的内存...")
+    release = measure_release(lambda: psutil.virtual_memory().free - free_before)
+    return (True, {
+        'freed_mb': release['freed_mb'],
+        'cleaned_count': 'N/A',
+        'stages': stage_results,
+        'target_met': target_met,
+        'budget_exhausted': budget_exhausted,
+        'settle_ms': release['settle_ms'],
+        'release_curve': release['curve'],
+    })
 
 
-def clean_memory():
+@traced("cleanup.clean_memory")
+def clean_memory(progress=None, cancel_event=None, config=None, target_mb=None, budget_ms=None):
     """
     执行跨平台的内存清理操作。
+    :param progress: 可选的进度回调 progress(percent, message)，在执行清理的线程中调用。
+    :param cancel_event: 可选的 threading.Event，置位后清理会在下一个阶段开始前中止。
+    :param config: 清理相关的配置，为 None 时读取 config.json。
+    :param target_mb: Linux 分级清理的目标释放量，达到后不再升级到更重的阶段。
+    :param budget_ms: Linux 分级清理的时间预算，用完后不再开始新的阶段。
     """
     # ... (此部分清理逻辑保持不变) ...
     platform = sys.platform
+    if config is None:
+        config = load_config()
+    if target_mb is None:
+        target_mb = config.get("clean_target_mb", 0) or None
+    if budget_ms is None:
+        budget_ms = config.get("clean_budget_ms", 0) or None
+    if platform == "linux" and config.get("linux_reclaim_backend") == "cgroup_reclaim":
+        return clean_memory_cgroups(config, progress, cancel_event)
     if platform == "win32":
         try:
-            success, result = clean_memory_windows()
+            success, result = clean_memory_windows(progress, cancel_event, config)
             if success:
                 result['cleaned_count'] = result.get('cleaned_count', 'N/A')
                 return True, result
             else:
                 return False, result
+        except CleanupCancelled:
+            return (False, "清理已取消。")
         except Exception as e:
             return (False, f"Windows 内存清理时发生未知错误。\n错误: {e}")
     elif platform == "linux":
         try:
-            mem_before = psutil.virtual_memory().used
-            subprocess.run(['sync'], check=True, capture_output=True)
-            with open('/proc/sys/vm/drop_caches', 'w') as f:
-                f.write('3\n')
-            time.sleep(0.5)
-            mem_after = psutil.virtual_memory().used
-            freed_mb = (mem_before - mem_after) / (1024 * 1024)
-            if freed_mb < 0: freed_mb = 0
-            return (True, {'freed_mb': freed_mb, 'cleaned_count': 'N/A'})
+            return clean_memory_linux(progress, cancel_event, target_mb, budget_ms)
+        except CleanupCancelled:
+            return (False, "清理已取消。")
         except (PermissionError, subprocess.CalledProcessError) as e:
             return (False, f"Linux 缓存清理失败，请使用 sudo 运行程序。\n错误: {e}")
     elif platform == "darwin":
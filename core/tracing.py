@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+"""
+热点路径追踪模块
+- 用 perf_counter_ns 记录采样、绘制和清理各阶段的耗时，帮助发现程序自身开销的回归。
+- 设置环境变量 MEMCLEAN_TRACE=1 启动程序时启用；未启用时：
+    * @traced 装饰器直接返回原函数，没有任何额外开销；
+    * span() 返回一个共享的空上下文管理器，几乎没有开销。
+- 内存中按名称聚合次数、总耗时、最大值和以 2 为底的对数直方图，并保留最近的事件。
+- dump_chrome_trace() 导出 Chrome trace-event JSON，可在 chrome://tracing 或 Perfetto 中打开。
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+TRACE_ENV = 'MEMCLEAN_TRACE'
+TRACE_FILE = 'memclean_trace.json'
+# 为导出保留的最近事件数量
+MAX_EVENTS = 20000
+
+_enabled = os.environ.get(TRACE_ENV, '') not in ('', '0')
+_lock = threading.Lock()
+_stats = {}
+_events = deque(maxlen=MAX_EVENTS)
+_thread_names = {}
+_origin_ns = time.perf_counter_ns()
+
+
+def is_enabled():
+    return _enabled
+
+
+def enable(enabled=True):
+    """在运行时开关 span()。注意 @traced 只在导入模块时决定是否生效。"""
+    global _enabled
+    _enabled = enabled
+
+
+class _SpanStats:
+    """单个名称的聚合统计，直方图第 i 个桶统计耗时在 [2^(i-1), 2^i) 微秒内的次数。"""
+    __slots__ = ('count', 'total_ns', 'max_ns', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * 32
+
+    def add(self, duration_ns):
+        self.count += 1
+        self.total_ns += duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+        self.buckets[min((duration_ns // 1000).bit_length(), 31)] += 1
+
+    def quantile_us(self, fraction):
+        """按直方图估计分位数，返回所在桶的上限 (微秒)，不超过实际最大值。"""
+        rank = fraction * self.count
+        seen = 0
+        max_us = self.max_ns / 1000
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return min(float(1 << index), max_us)
+        return max_us
+
+
+def record(name, start_ns, duration_ns):
+    """记录一次已经完成的区间。"""
+    thread = threading.current_thread()
+    tid = thread.ident
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = _SpanStats()
+        stats.add(duration_ns)
+        _events.append((name, start_ns, duration_ns, tid))
+        if tid not in _thread_names:
+            _thread_names[tid] = thread.name
+
+
+class _Span:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        record(self.name, self.start, end - self.start)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name):
+    """with span("cleanup.pagecache"): ... 记录代码块的耗时；未启用时为空操作。"""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def traced(name):
+    """函数装饰器。导入时未启用追踪则原样返回函数。"""
+    def decorator(func):
+        if not _enabled:
+            return func
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, start, time.perf_counter_ns() - start)
+
+        wrapper.__name__ = func.__name__
+        wrapper.__qualname__ = func.__qualname__
+        wrapper.__doc__ = func.__doc__
+        wrapper.__wrapped__ = func
+        return wrapper
+    return decorator
+
+
+def summary():
+    """返回每个名称的统计：{name: {'count', 'total_ms', 'mean_us', 'p50_us', 'p99_us', 'max_us'}}。"""
+    with _lock:
+        items = list(_stats.items())
+    result = {}
+    for name, stats in sorted(items):
+        result[name] = {
+            'count': stats.count,
+            'total_ms': round(stats.total_ns / 1e6, 3),
+            'mean_us': round(stats.total_ns / stats.count / 1000, 2),
+            'p50_us': stats.quantile_us(0.5),
+            'p99_us': stats.quantile_us(0.99),
+            'max_us': round(stats.max_ns / 1000, 2),
+        }
+    return result
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+        _events.clear()
+
+
+def dump_chrome_trace(path=None):
+    """把最近的事件和聚合统计写成 Chrome trace-event JSON，返回文件路径。"""
+    if path is None:
+        from core.config_manager import resolve_config_path
+        path = os.path.join(os.path.dirname(resolve_config_path()), TRACE_FILE)
+    pid = os.getpid()
+    with _lock:
+        events = list(_events)
+        thread_names = dict(_thread_names)
+    trace = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+             for tid, name in thread_names.items()]
+    trace += [{'name': name, 'cat': name.split('.', 1)[0], 'ph': 'X', 'pid': pid, 'tid': tid,
+               'ts': (start - _origin_ns) / 1000, 'dur': duration / 1000}
+              for name, start, duration, tid in events]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms', 'otherData': {'summary': summary()}}, f)
+    return path
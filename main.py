@@ -10,19 +10,39 @@
 import sys
 import ctypes
 import os
-import psutil
 import time  # 导入time模块
+
+if __name__ == "__main__" and "--headless" in sys.argv[1:]:
+    # 无界面模式：在导入 PySide6/pynput 之前分流，只加载 core 中的模块
+    from core.daemon import main as headless_main
+    sys.exit(headless_main([arg for arg in sys.argv[1:] if arg != "--headless"]))
+
 from PySide6.QtWidgets import QApplication, QSystemTrayIcon
 from PySide6.QtCore import QTimer
 
-# --- 导入所有需要的模块 ---
-from ui.main_window import MainWindow
-from ui.settings_window import SettingsWindow
+# --- 导入托盘启动所需的模块，窗口和热键模块在首次使用时才导入 ---
 from ui.tray_manager import TrayManager
-from core.config_manager import load_config
-from core.system_monitor import clean_memory
-from core.hotkey_manager import HotkeyManager
-from core.startup_manager import set_startup
+from core.config_manager import load_config, get_config_store
+from core.system_monitor import get_sampler
+from core.cleanup_executor import get_cleanup_executor
+from core.qt_bridge import CleanupBridge, PressureBridge, ConfigBridge
+from core.history import HistoryStore, default_history_path
+from core.auto_clean_policy import AutoCleanPolicy
+from core.metrics_exporter import MetricsExporter
+from core.cleanup_journal import configure_journal
+from core import tracing
+
+
+# 单次清理的最长时间，超时后后台任务会被中止
+CLEANUP_TIMEOUT_SECONDS = 30
+# 退出时等待被取消的清理结束的最长时间，之后才关闭清理日志
+SHUTDOWN_TIMEOUT_SECONDS = 5
+
+# 窗口隐藏超过这个时间后释放，下次打开时重新创建
+IDLE_WINDOW_RELEASE_SECONDS = 300
+
+# 设置后在托盘显示并空闲指定秒数后，输出启动耗时和常驻内存并退出 (benchmarks/measure_startup.py 使用)
+STARTUP_PROBE_ENV = "MEMCLEAN_STARTUP_PROBE"
 
 
 def is_admin():
@@ -50,26 +70,132 @@ class MainApplication(QApplication):
         self.cleanup_cooldown_seconds = 15  # 15秒的智能判断期
 
         self.config = load_config()
-        self.main_window = MainWindow()
-        self.settings_window = SettingsWindow()
+        # 设置窗口保存或外部编辑配置文件后，通过信号重新应用配置
+        self.config_bridge = ConfigBridge(self)
+        self.config_bridge.changed.connect(self.reload_config_and_timer)
+        get_config_store().start_watching()
+
+        # 历史数据：订阅共享采样器，映射到磁盘文件以便重启后保留
+        self.history = HistoryStore(default_history_path())
+        get_sampler().subscribe(self.history.record)
+
+        # 主窗口和设置窗口在第一次打开时才创建，长时间隐藏后释放
+        self.main_window = None
+        self.settings_window = None
+        self.hotkey_manager = None
+        self.window_release_timers = {}
         self.tray_manager = TrayManager(self)
-        self.hotkey_manager = HotkeyManager(self)
 
         # --- 连接信号 ---
-        self.tray_manager.show_main_window_requested.connect(self.main_window.show_and_raise)
+        self.tray_manager.show_main_window_requested.connect(self.show_main_window)
         self.tray_manager.show_settings_requested.connect(self.show_settings)
-        self.tray_manager.cleanup_requested.connect(self.perform_cleanup_action)
-        self.hotkey_manager.alt_alt_triggered.connect(self.perform_cleanup_action)
-        self.hotkey_manager.ctrl_alt_c_triggered.connect(self.perform_cleanup_action)
-        self.main_window.clean_button.clicked.connect(self.perform_cleanup_action)
-        self.settings_window.settings_saved.connect(self.reload_config_and_timer)
+        self.tray_manager.cleanup_requested.connect(lambda: self.perform_cleanup_action("tray"))
+
+        # 清理在后台线程执行，结果通过信号回到UI线程
+        self.cleanup_bridge = CleanupBridge(self)
+        self.cleanup_bridge.finished.connect(self.on_cleanup_finished)
 
+        # 自动清理：预测式策略决定是否清理以及下一次检查的时间
+        self.auto_clean_policy = AutoCleanPolicy.from_config(self.config)
         self.auto_clean_timer = QTimer(self)
+        self.auto_clean_timer.setSingleShot(True)
         self.auto_clean_timer.timeout.connect(self.check_and_auto_clean)
 
+        # Linux 上优先使用 PSI 压力事件，不可用时退回定时检查
+        self.pressure_bridge = PressureBridge(self)
+        self.pressure_bridge.pressure_detected.connect(self.on_memory_pressure)
+
         self.update_timer_interval()
 
-    def perform_cleanup_action(self):
+        # 每次清理的结果写入清理日志
+        self.journal = None
+        self.update_journal()
+
+        # 可选的本机指标导出
+        self.metrics_exporter = MetricsExporter()
+        self.update_metrics_exporter()
+
+        # 托盘已经显示，热键监听放到事件循环开始后再启动，不拖慢启动
+        QTimer.singleShot(0, self.start_hotkeys)
+
+        probe_seconds = os.environ.get(STARTUP_PROBE_ENV)
+        if probe_seconds:
+            self.start_startup_probe(float(probe_seconds))
+
+    def start_hotkeys(self):
+        from core.hotkey_manager import HotkeyManager
+        self.hotkey_manager = HotkeyManager(self.config.get("hotkeys", {}), self)
+        self.hotkey_manager.action_triggered.connect(self.on_hotkey_action)
+
+    def on_hotkey_action(self, action):
+        """热键动作名见配置项 "hotkeys" 的值"""
+        if action == "clean":
+            self.perform_cleanup_action("hotkey")
+        elif action == "show":
+            self.show_main_window()
+        elif action == "settings":
+            self.show_settings()
+        else:
+            print(f"Unknown hotkey action: {action}")
+
+    # --- 窗口的按需创建与空闲释放 ---
+    def get_main_window(self):
+        if self.main_window is None:
+            from ui.main_window import MainWindow
+            self.main_window = MainWindow()
+            self.main_window.clean_button.clicked.connect(lambda: self.perform_cleanup_action("manual"))
+            self.main_window.hidden.connect(lambda: self.schedule_window_release("main_window"))
+        return self.main_window
+
+    def get_settings_window(self):
+        if self.settings_window is None:
+            from ui.settings_window import SettingsWindow
+            self.settings_window = SettingsWindow()
+            self.settings_window.hidden.connect(lambda: self.schedule_window_release("settings_window"))
+        return self.settings_window
+
+    def schedule_window_release(self, name):
+        """窗口隐藏后开始计时，超时仍未再次显示则释放"""
+        timer = self.window_release_timers.get(name)
+        if timer is None:
+            timer = QTimer(self)
+            timer.setSingleShot(True)
+            timer.timeout.connect(lambda: self.release_window(name))
+            self.window_release_timers[name] = timer
+        timer.start(IDLE_WINDOW_RELEASE_SECONDS * 1000)
+
+    def release_window(self, name):
+        window = getattr(self, name)
+        if window is None or window.isVisible():
+            return
+        cleanup_bridge = getattr(window, 'cleanup_bridge', None)
+        if cleanup_bridge is not None and cleanup_bridge.is_running():
+            # 清理结果还要显示在这个窗口上，稍后再释放
+            self.schedule_window_release(name)
+            return
+        setattr(self, name, None)
+        window.deleteLater()
+
+    def show_main_window(self):
+        self.get_main_window().show_and_raise()
+
+    def start_startup_probe(self, idle_seconds):
+        """输出从进程启动到托盘显示的耗时，以及空闲 idle_seconds 秒后的常驻内存，然后退出"""
+        import json
+        import psutil
+        process = psutil.Process()
+        time_to_tray_ms = (time.time() - process.create_time()) * 1000
+
+        def report():
+            print(json.dumps({
+                'time_to_tray_ms': round(time_to_tray_ms, 1),
+                'idle_rss_mb': round(process.memory_info().rss / (1024 * 1024), 1),
+            }), flush=True)
+            self.quit()
+
+        QTimer.singleShot(int(idle_seconds * 1000), report)
+
+    def perform_cleanup_action(self, source="manual"):
         """执行清理，并增加了双重缓冲逻辑"""
         current_time = time.time()
 
@@ -83,10 +209,22 @@ class MainApplication(QApplication):
             self.tray_manager.show_custom_notification("系统已经很干净啦，休息一下吧~")
             return
 
-        # 设置清理状态为True，开始清理
+        # 设置清理状态为True，在后台开始清理
         self.is_cleaning = True
+        self.cleanup_bridge.submit(source=source, timeout=CLEANUP_TIMEOUT_SECONDS)
+
+    def on_cleanup_finished(self, success, result_data):
+        """后台清理完成后在UI线程中调用"""
+        handle = self.cleanup_bridge.handle
+        source = handle.source if handle is not None else "manual"
+
+        # 3秒后将“正在清理”状态重置为False
+        QTimer.singleShot(3000, lambda: setattr(self, 'is_cleaning', False))
+
+        # 自动清理在后台静默进行，不打扰用户
+        if source in ("auto", "psi"):
+            return
 
-        success, result_data = clean_memory()
         if success:
             # 清理成功后，更新最后清理时间
             self.last_cleanup_time = time.time()
@@ -101,45 +239,95 @@ class MainApplication(QApplication):
             message = f"清理失败: {str(result_data)}"
             self.tray_manager.show_custom_notification(message)
 
-        # 3秒后将“正在清理”状态重置为False
-        QTimer.singleShot(3000, lambda: setattr(self, 'is_cleaning', False))
-
     def show_settings(self):
-        self.settings_window.show()
-        self.settings_window.activateWindow()
+        settings_window = self.get_settings_window()
+        settings_window.show()
+        settings_window.activateWindow()
 
-    def reload_config_and_timer(self):
-        """重新加载配置并更新所有相关设置"""
+    def reload_config_and_timer(self, config=None, changed=None):
+        """配置变化后更新所有相关设置"""
         self.config = load_config()
         self.tray_manager.reload_config()
+        if self.main_window is not None:
+            self.main_window.reload_config()
+        self.auto_clean_policy.update_config(self.config)
         self.update_timer_interval()
-        set_startup(self.config.get("start_on_boot", False))
+        self.update_metrics_exporter()
+        self.update_journal()
+        if self.hotkey_manager is not None:
+            self.hotkey_manager.set_bindings(self.config.get("hotkeys", {}))
+        if changed is None or "start_on_boot" in changed:
+            from core.startup_manager import set_startup
+            set_startup(self.config.get("start_on_boot", False))
+
+    def update_metrics_exporter(self):
+        self.metrics_exporter.configure(self.config.get("metrics_enabled", False),
+                                        self.config.get("metrics_port", 9477))
+
+    def update_journal(self):
+        self.journal = configure_journal(self.journal, self.config, get_cleanup_executor())
 
     def update_timer_interval(self):
-        """根据配置启动或停止定时器"""
-        if self.config.get("auto_clean_enabled", False):
-            interval_ms = self.config.get("clean_interval_minutes", 5) * 60 * 1000
-            self.auto_clean_timer.start(interval_ms)
-        else:
-            self.auto_clean_timer.stop()
+        """根据配置启动或停止自动清理：PSI 可用时由压力事件驱动，定时器以最长间隔检查阈值作为后备"""
+        self.pressure_bridge.stop()
+        self.auto_clean_timer.stop()
+        if not self.config.get("auto_clean_enabled", False):
+            return
+        if self.config.get("psi_enabled", True):
+            self.pressure_bridge.start(self.config.get("psi_path", "/proc/pressure/memory"),
+                                       self.config.get("psi_trigger", "some 150000 1000000"))
+        self.auto_clean_timer.start(int(self.auto_clean_policy.min_interval * 1000))
+
+    def on_memory_pressure(self, event):
+        """PSI 报告内存停顿超过阈值时调用"""
+        if not self.config.get("auto_clean_enabled", False):
+            return
+        decision = self.auto_clean_policy.on_pressure(event['timestamp'])
+        if decision.trigger:
+            self.submit_auto_cleanup("psi", decision)
 
     def check_and_auto_clean(self):
-        """检查内存是否超限并自动清理"""
+        """根据内存趋势判断是否需要自动清理，并按变化快慢安排下一次检查"""
         if not self.config.get("auto_clean_enabled", False):
             return
 
-        # 自动清理不受冷却时间影响
-        current_mem_percent = psutil.virtual_memory().percent
-        threshold = self.config.get("mem_threshold_percent", 80)
-        if current_mem_percent > threshold:
-            # 这里我们直接调用清理的核心逻辑，绕过缓冲检查
-            self.is_cleaning = True
-            clean_memory()
-            QTimer.singleShot(3000, lambda: setattr(self, 'is_cleaning', False))
+        decision = self.auto_clean_policy.check(self.history)
+        if self.pressure_bridge.is_active():
+            # PSI 可用时主要由压力事件驱动，阈值检查只作为后备，以最长间隔运行
+            decision.next_check = self.auto_clean_policy.max_interval
+        # 下一次检查之前，历史数据至少要有同样细的分辨率
+        get_sampler().request_resolution(decision.next_check, duration=decision.next_check * 2)
+        # 自动清理不受冷却时间影响，这里我们直接提交清理，绕过缓冲检查
+        if decision.trigger:
+            self.submit_auto_cleanup("auto", decision)
+        self.auto_clean_timer.start(int(decision.next_check * 1000))
+
+    def submit_auto_cleanup(self, source, decision):
+        """
+        提交自动清理。主窗口、悬浮球等其他组件的清理正在进行时不合并到它们的任务，
+        策略保持启用，下一次检查会再次触发。
+        """
+        handle = self.cleanup_bridge.submit(source=source, timeout=CLEANUP_TIMEOUT_SECONDS, join_running=False)
+        if handle is None:
+            return
+        self.is_cleaning = True
+        self.auto_clean_policy.commit(decision)
 
     def quit(self):
-        self.hotkey_manager.stop()
+        if self.hotkey_manager is not None:
+            self.hotkey_manager.stop()
+        self.pressure_bridge.stop()
+        self.metrics_exporter.stop()
+        get_config_store().stop_watching()
         self.tray_manager.stop_worker_thread()
+        get_sampler().stop()
+        # 等被取消的清理发出 'finished'，清理日志才能写下最后一条记录
+        get_cleanup_executor().shutdown(wait=True, timeout=SHUTDOWN_TIMEOUT_SECONDS)
+        if self.journal is not None:
+            self.journal.close()
+        self.history.close()
+        if tracing.is_enabled():
+            tracing.dump_chrome_trace()
         super().quit()
 
 
@@ -5,15 +5,59 @@
 - 【性能】预编译绘图资源，避免在paintEvent中重复创建对象，彻底解决拖动卡顿。
 - 【视觉】采用全新的纯白主题设计，外观更现代、更精致。
 - 【视觉】所有动画和数值显示均采用平滑算法。
+- 【性能】动画由共享动画时钟按需驱动，数值收敛后停止重绘，隐藏或最小化时不再唤醒。
+- 【性能】背景、内阴影和边框缓存在 QPixmap 中，只在尺寸或 DPI 变化时重绘；
+  水波使用按相位预先计算的正弦表，每帧只构建一次水面折线，水体和高光共用。
 """
 import math
 from PySide6.QtWidgets import QWidget, QMenu, QMessageBox, QApplication
-from PySide6.QtCore import Qt, QTimer, QPoint, Signal
-from PySide6.QtGui import QPainter, QColor, QBrush, QPen, QLinearGradient, QRadialGradient, QFont, QPainterPath
+from PySide6.QtCore import Qt, QPoint, QPointF, QEvent, Signal
+from PySide6.QtGui import (QPainter, QColor, QBrush, QPen, QLinearGradient, QRadialGradient, QFont, QPainterPath,
+                           QPixmap, QPolygonF)
 
 # 从项目其他模块导入
-from core.system_monitor import get_system_stats, clean_memory
+from core.system_monitor import get_system_stats
+from core.qt_bridge import SamplerBridge, CleanupBridge
 from .utils import show_message
+from core.tracing import traced
+from .animation_clock import get_animation_clock
+
+
+# 每个波形一个周期内预先计算的相位数，相位量化误差为 2π/360，肉眼不可见
+WAVE_PHASE_STEPS = 360
+# (振幅, 每像素的角频率)
+WAVE1 = (3, 0.04)
+WAVE2 = (2, 0.06)
+# 两个波形的相位速度 (弧度/秒)
+WAVE1_SPEED = 3.125
+WAVE2_SPEED = 4.375
+
+# 数值平滑的时间常数 (秒)，相当于原来 60 FPS 下每帧保留 0.95
+SMOOTHING_TAU = 0.312
+# 平滑值与原始值之差小于它时视为收敛
+CONVERGED_EPSILON = 0.05
+
+
+class _WaveTable:
+    """
+    一个波形在 WAVE_PHASE_STEPS 个相位下每一列 x 的偏移量。
+    每个相位的一行在第一次用到时计算并保存，之后每帧只需查表。
+    """
+
+    def __init__(self, amplitude, frequency, width):
+        self.amplitude = amplitude
+        self.frequency = frequency
+        self.width = width
+        self._rows = [None] * WAVE_PHASE_STEPS
+
+    def row(self, phase):
+        step = int(phase / (2 * math.pi) * WAVE_PHASE_STEPS) % WAVE_PHASE_STEPS
+        row = self._rows[step]
+        if row is None:
+            shift = 2 * math.pi * step / WAVE_PHASE_STEPS
+            row = [self.amplitude * math.sin(x * self.frequency + shift) for x in range(self.width + 1)]
+            self._rows[step] = row
+        return row
 
 
 class AcceleratorBall(QWidget):
@@ -44,16 +88,19 @@ class AcceleratorBall(QWidget):
         # --- 性能优化：预先创建绘图资源 ---
         self._setup_drawing_resources()
 
-        # --- 双定时器分离数据和动画 ---
-        self.data_timer = QTimer(self)
-        self.data_timer.timeout.connect(self.update_system_data)
-        self.data_timer.start(1000)
+        # --- 数据来自共享采样器，动画由独立定时器驱动 ---
+        # 显示详细数据时至少每秒更新一次
+        self.stats_bridge = SamplerBridge(self, resolution=1.0)
+        self.stats_bridge.sample_ready.connect(self.update_system_data)
 
-        self.animation_timer = QTimer(self)
-        self.animation_timer.timeout.connect(self.tick_animation)
-        self.animation_timer.start(16)  # ~60 FPS
+        # 清理在后台线程执行，避免双击后悬浮球卡住
+        self.cleanup_bridge = CleanupBridge(self)
+        self.cleanup_bridge.finished.connect(self.on_cleanup_finished)
 
+        # 动画由共享动画时钟按需驱动
+        self.animation_clock = get_animation_clock()
         self.update_system_data()
+        self.animation_clock.register(self, self.advance_animation)
 
     def _setup_drawing_resources(self):
         """预先创建所有画笔、画刷、字体等，避免在paintEvent中重复创建。"""
@@ -70,68 +117,126 @@ class AcceleratorBall(QWidget):
         # 外边框画笔
         self.outer_border_pen = QPen(QColor(0, 0, 0, 30), 2)
 
-    def update_system_data(self):
-        """仅负责获取系统原始数据"""
-        stats = get_system_stats()
-        self.raw_cpu = stats['cpu_percent']
-        self.raw_mem = stats['mem_info'].percent
-
-    def tick_animation(self):
-        """仅负责更新动画状态和数值平滑"""
-        self.smoothed_cpu = self.smoothed_cpu * 0.95 + self.raw_cpu * 0.05
-        self.smoothed_mem = self.smoothed_mem * 0.95 + self.raw_mem * 0.05
-        self.wave1_offset = (self.wave1_offset + 0.05) % (2 * math.pi)
-        self.wave2_offset = (self.wave2_offset + 0.07) % (2 * math.pi)
-        self.update()
+        # 与尺寸、DPI 相关的缓存，在第一次绘制或尺寸/DPI 变化时生成
+        self._cache_key = None
+        self._base_layer = None
+        self._border_layer = None
+        self._clip_path = None
+        self._wave_tables = None
+        self._water_gradient = None
+        self._water_gradient_level = None
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
+    def _ensure_cache(self):
+        """尺寸或 DPI 变化时重建静态图层、剪切区和正弦表。"""
+        dpr = self.devicePixelRatioF()
+        key = (self.width(), self.height(), dpr)
+        if key == self._cache_key:
+            return
+        self._cache_key = key
         rect = self.rect()
 
-        # 1. 绘制白色背景球体
+        # 底层：白色球体 + 内阴影
+        self._base_layer = self._new_layer(dpr)
+        painter = QPainter(self._base_layer)
+        painter.setRenderHint(QPainter.Antialiasing)
         painter.setPen(Qt.NoPen)
         painter.setBrush(self.bg_brush)
         painter.drawEllipse(rect)
-
-        # 2. 绘制内阴影，增加立体感
         inner_shadow_gradient = QRadialGradient(rect.center(), rect.width() / 2)
         inner_shadow_gradient.setColorAt(0.85, QColor(0, 0, 0, 0))
         inner_shadow_gradient.setColorAt(1.0, QColor(0, 0, 0, 40))
         painter.setBrush(inner_shadow_gradient)
         painter.drawEllipse(rect)
+        painter.end()
+
+        # 顶层：最外层的边框
+        self._border_layer = self._new_layer(dpr)
+        painter = QPainter(self._border_layer)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setBrush(Qt.NoBrush)
+        painter.setPen(self.outer_border_pen)
+        painter.drawEllipse(rect.adjusted(1, 1, -1, -1))
+        painter.end()
+
+        self._clip_path = QPainterPath()
+        self._clip_path.addEllipse(rect)
+        self._wave_tables = (_WaveTable(*WAVE1, rect.width()), _WaveTable(*WAVE2, rect.width()))
+        self._water_gradient = None
+
+    def _new_layer(self, dpr):
+        layer = QPixmap(self.size() * dpr)
+        layer.setDevicePixelRatio(dpr)
+        layer.fill(Qt.transparent)
+        return layer
+
+    def _water_brush(self, water_level):
+        """水体渐变只依赖水位，水位 (取整到像素) 不变时复用。"""
+        level = int(water_level)
+        if level != self._water_gradient_level:
+            rect = self.rect()
+            gradient = QLinearGradient(rect.center().x(), level, rect.center().x(), rect.bottom())
+            gradient.setColorAt(0, QColor(60, 170, 255, 200))
+            gradient.setColorAt(1, QColor(20, 120, 230, 255))
+            self._water_gradient = QBrush(gradient)
+            self._water_gradient_level = level
+        return self._water_gradient
 
-        # 创建圆形剪切区
-        clip_path = QPainterPath()
-        clip_path.addEllipse(rect)
-        painter.setClipPath(clip_path)
+    def resizeEvent(self, event):
+        self._cache_key = None
+        super().resizeEvent(event)
 
-        # 3. 绘制水体
+    def update_system_data(self, stats=None):
+        """仅负责接收系统原始数据"""
+        if stats is None:
+            stats = get_system_stats()
+        self.raw_cpu = stats['cpu_percent']
+        self.raw_mem = stats['mem_info'].percent
+        if not self._converged():
+            self.animation_clock.wake()
+
+    def _converged(self):
+        return (abs(self.raw_cpu - self.smoothed_cpu) < CONVERGED_EPSILON
+                and abs(self.raw_mem - self.smoothed_mem) < CONVERGED_EPSILON)
+
+    def advance_animation(self, dt):
+        """按经过的时间 dt (秒) 更新动画状态和数值平滑，返回动画是否仍在进行"""
+        k = 1 - math.exp(-dt / SMOOTHING_TAU)
+        self.smoothed_cpu += (self.raw_cpu - self.smoothed_cpu) * k
+        self.smoothed_mem += (self.raw_mem - self.smoothed_mem) * k
+        self.wave1_offset = (self.wave1_offset + WAVE1_SPEED * dt) % (2 * math.pi)
+        self.wave2_offset = (self.wave2_offset + WAVE2_SPEED * dt) % (2 * math.pi)
+        converged = self._converged()
+        if converged:
+            self.smoothed_cpu, self.smoothed_mem = self.raw_cpu, self.raw_mem
+        self.update()
+        return not converged
+
+    @traced("ball.paint")
+    def paintEvent(self, event):
+        self._ensure_cache()
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        rect = self.rect()
+
+        # 1-2. 白色背景球体和内阴影 (缓存)
+        painter.drawPixmap(0, 0, self._base_layer)
+
+        painter.setClipPath(self._clip_path)
+
+        # 3. 水面折线：两个波形查表相加，水体和高光共用同一组点
         water_level = rect.height() * (1 - self.smoothed_mem / 100.0)
-        water_path = QPainterPath()
-        water_path.moveTo(rect.left(), rect.bottom())
-        water_path.lineTo(rect.left(), water_level)
-        for x in range(rect.width() + 1):
-            wave1 = 3 * math.sin(x * 0.04 + self.wave1_offset)
-            wave2 = 2 * math.sin(x * 0.06 + self.wave2_offset)
-            water_path.lineTo(x, water_level + wave1 + wave2)
-        water_path.lineTo(rect.right(), rect.bottom())
-        water_path.closeSubpath()
-
-        water_gradient = QLinearGradient(rect.center().x(), water_level, rect.center().x(), rect.bottom())
-        water_gradient.setColorAt(0, QColor(60, 170, 255, 200))
-        water_gradient.setColorAt(1, QColor(20, 120, 230, 255))
-        painter.fillPath(water_path, water_gradient)
-
-        # 4. 绘制水面高光
-        highlight_path = QPainterPath()
-        highlight_path.moveTo(rect.left(), water_level)
-        for x in range(rect.width() + 1):
-            wave1 = 3 * math.sin(x * 0.04 + self.wave1_offset)
-            wave2 = 2 * math.sin(x * 0.06 + self.wave2_offset)
-            highlight_path.lineTo(x, water_level + wave1 + wave2)
+        table1, table2 = self._wave_tables
+        surface = [QPointF(x, water_level + a + b)
+                   for x, (a, b) in enumerate(zip(table1.row(self.wave1_offset), table2.row(self.wave2_offset)))]
+
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(self._water_brush(water_level))
+        painter.drawPolygon(QPolygonF([QPointF(rect.left(), rect.bottom()), *surface,
+                                       QPointF(rect.right(), rect.bottom())]))
+
+        # 4. 水面高光
         painter.setPen(self.wave_highlight_pen)
-        painter.drawPath(highlight_path)
+        painter.drawPolyline(QPolygonF(surface))
 
         # 重置剪切区
         painter.setClipping(False)
@@ -143,10 +248,24 @@ class AcceleratorBall(QWidget):
         painter.setFont(self.cpu_font)
         painter.drawText(rect.adjusted(0, -25, 0, -25), Qt.AlignCenter, f"CPU: {int(self.smoothed_cpu)}%")
 
-        # 6. 绘制最外层的边框
-        painter.setBrush(Qt.NoBrush)
-        painter.setPen(self.outer_border_pen)
-        painter.drawEllipse(rect.adjusted(1, 1, -1, -1))
+        # 6. 最外层的边框 (缓存)
+        painter.drawPixmap(0, 0, self._border_layer)
+
+    def showEvent(self, event):
+        self.stats_bridge.start()
+        super().showEvent(event)
+        self.animation_clock.wake()
+
+    def hideEvent(self, event):
+        # 隐藏时停止采样订阅，动画时钟会跳过不可见的组件
+        self.stats_bridge.stop()
+        super().hideEvent(event)
+
+    def changeEvent(self, event):
+        # 从最小化恢复时重新驱动动画
+        if event.type() == QEvent.WindowStateChange and not self.isMinimized():
+            self.animation_clock.wake()
+        super().changeEvent(event)
 
     # --- 鼠标事件和菜单逻辑保持不变 ---
     def mousePressEvent(self, event):
@@ -171,7 +290,10 @@ class AcceleratorBall(QWidget):
         event.accept()
 
     def perform_cleanup(self):
-        success, result_data = clean_memory()
+        """在后台执行清理，完成后弹窗提示"""
+        self.cleanup_bridge.submit(source="manual")
+
+    def on_cleanup_finished(self, success, result_data):
         if success:
             if isinstance(result_data, dict) and 'freed_mb' in result_data:
                 freed = result_data['freed_mb']
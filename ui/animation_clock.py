@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+"""
+共享动画时钟
+- 所有带动画的组件注册到同一个时钟，由一个 QTimer 统一驱动，不再各自常驻一个 16 毫秒定时器。
+- 每一帧把距离上一帧的实际时间 dt 传给组件，组件按时间而不是按帧数推进动画，任何帧率下效果一致。
+- 组件返回 False 表示动画已经收敛；所有可见组件都收敛后时钟停止，不再产生任何定时唤醒。
+  数据变化或组件重新显示时调用 wake() 重新启动。
+- 未显示、最小化或窗口未暴露的组件不会被驱动。
+"""
+
+import time
+
+from PySide6.QtCore import QObject, QTimer
+
+# 动画进行时的帧间隔 (~60 FPS)
+FRAME_INTERVAL_MS = 16
+# 单帧 dt 的上限，避免系统卡顿或休眠恢复后动画一步跳到终点
+MAX_FRAME_DT = 0.1
+
+
+def _is_exposed(widget):
+    if not widget.isVisible() or widget.isMinimized():
+        return False
+    handle = widget.windowHandle()
+    return handle is None or handle.isExposed()
+
+
+class AnimationClock(QObject):
+    """按需运行的动画时钟，使用 get_animation_clock() 获取共享实例。"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._clients = {}
+        self._last_tick = None
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._tick)
+
+    def register(self, widget, advance):
+        """
+        注册一个动画组件。
+        :param advance: advance(dt) -> bool，推进 dt 秒的动画并请求重绘；返回 False 表示已收敛
+        """
+        self._clients[widget] = advance
+        # 组件销毁时自动移除
+        clients = self._clients
+        widget.destroyed.connect(lambda *_: clients.pop(widget, None))
+        self.wake()
+
+    def unregister(self, widget):
+        self._clients.pop(widget, None)
+
+    def wake(self):
+        """数据变化或组件重新显示时调用，时钟停止时从下一帧开始重新计时。"""
+        if not self._timer.isActive():
+            self._last_tick = None
+            self._timer.start(FRAME_INTERVAL_MS)
+
+    def is_running(self):
+        return self._timer.isActive()
+
+    def _tick(self):
+        now = time.monotonic()
+        dt = FRAME_INTERVAL_MS / 1000 if self._last_tick is None else min(now - self._last_tick, MAX_FRAME_DT)
+        self._last_tick = now
+
+        animating = False
+        for widget, advance in list(self._clients.items()):
+            if not _is_exposed(widget):
+                continue
+            try:
+                if advance(dt):
+                    animating = True
+            except Exception as e:
+                print(f"Animation client error: {e}")
+        if not animating:
+            self._timer.stop()
+
+
+_clock = None
+
+
+def get_animation_clock():
+    """返回进程内唯一的动画时钟，需要在 QApplication 创建之后调用。"""
+    global _clock
+    if _clock is None:
+        _clock = AnimationClock()
+    return _clock
@@ -3,45 +3,68 @@
 """
 主窗口的UI实现
 - 不再创建和管理悬浮球。
+- 只在窗口可见时订阅共享采样器，隐藏后不再产生任何采样开销。
+- 由应用在第一次打开时创建，隐藏一段时间后释放。
+- 下方的进程面板列出占用内存最多的进程，同样只在窗口可见时刷新。
 """
 
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton, QMessageBox
-from PySide6.QtCore import QTimer
+from PySide6.QtCore import Signal
 
 # 从项目其他模块导入
-from core.system_monitor import get_system_stats, clean_memory
-from .utils import show_message
+from core.config_manager import load_config
+from core.system_monitor import get_system_stats
+from core.qt_bridge import SamplerBridge, CleanupBridge
+from .utils import show_message, clean_action_text
+from .process_panel import ProcessPanel
 
 
 class MainWindow(QWidget):
+    # 窗口被隐藏时发出，应用据此在空闲一段时间后释放窗口
+    hidden = Signal()
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("系统性能监视器")
-        self.setGeometry(200, 200, 320, 180)
+        self.setGeometry(200, 200, 480, 520)
 
         # 设置UI布局
         self.layout = QVBoxLayout(self)
         self.cpu_label = QLabel()
         self.mem_label = QLabel()
-        self.clean_button = QPushButton("一键加速 (Ctrl+Alt+C)")
+        # 按钮文字中的热键来自配置，配置变化时由 reload_config 更新
+        self.clean_button_text = clean_action_text(load_config())
+        self.clean_button = QPushButton(self.clean_button_text)
+        self.process_panel = ProcessPanel(self)
 
         self.layout.addWidget(self.cpu_label)
         self.layout.addWidget(self.mem_label)
         self.layout.addWidget(self.clean_button)
+        self.layout.addWidget(self.process_panel)
 
-        # 连接按钮点击事件
+        # 连接按钮点击事件，清理在后台线程执行
+        self.cleanup_bridge = CleanupBridge(self)
+        self.cleanup_bridge.progress.connect(self.on_cleanup_progress)
+        self.cleanup_bridge.finished.connect(self.on_cleanup_finished)
         self.clean_button.clicked.connect(self.perform_cleanup)
 
-        # 定时器更新主窗口信息
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_info)
-        self.timer.start(1000)
+        # 共享采样器推送数据，显示时订阅、隐藏时退订
+        # 显示详细数据时至少每秒更新一次
+        self.stats_bridge = SamplerBridge(self, resolution=1.0)
+        self.stats_bridge.sample_ready.connect(self.update_info)
 
         self.update_info()
 
-    def update_info(self):
+    def reload_config(self):
+        self.clean_button_text = clean_action_text(load_config())
+        # 清理进行中按钮显示的是进度，结束时再换成新的文字
+        if self.clean_button.isEnabled():
+            self.clean_button.setText(self.clean_button_text)
+
+    def update_info(self, stats=None):
         """更新主窗口的详细信息"""
-        stats = get_system_stats()
+        if stats is None:
+            stats = get_system_stats()
         cpu = stats['cpu_percent']
         mem = stats['mem_info']
         mem_total_gb = mem.total / (1024 ** 3)
@@ -51,8 +74,17 @@ class MainWindow(QWidget):
         self.mem_label.setText(f"内存: {mem_used_gb:.2f} GB / {mem_total_gb:.2f} GB ({mem.percent}%)")
 
     def perform_cleanup(self):
-        """主窗口的清理按钮功能"""
-        success, result_data = clean_memory()
+        """主窗口的清理按钮功能：在后台执行清理，完成后弹窗提示"""
+        self.clean_button.setEnabled(False)
+        self.clean_button.setText("正在加速...")
+        self.cleanup_bridge.submit(source="manual")
+
+    def on_cleanup_progress(self, percent, message):
+        self.clean_button.setText(f"{message} {percent}%")
+
+    def on_cleanup_finished(self, success, result_data):
+        self.clean_button.setEnabled(True)
+        self.clean_button.setText(self.clean_button_text)
         if success:
             if isinstance(result_data, dict) and 'freed_mb' in result_data:
                 freed = result_data['freed_mb']
@@ -70,6 +102,16 @@ class MainWindow(QWidget):
         self.raise_()
         self.activateWindow()
 
+    def showEvent(self, event):
+        self.stats_bridge.start()
+        self.update_info()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.stats_bridge.stop()
+        super().hideEvent(event)
+        self.hidden.emit()
+
     def closeEvent(self, event):
         """
         重写关闭事件。
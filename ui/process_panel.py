@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+"""
+进程内存排行面板
+- 显示占用内存最多的前 K 个进程，可以按 RSS、USS 或交换分区排序。
+- 数据来自共享的 core.process_leaderboard，在后台线程中增量刷新，只在面板可见时订阅。
+- 表格的行和单元格只创建一次，之后每次刷新只修改文字。
+"""
+
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QTableWidget,
+                               QTableWidgetItem, QHeaderView, QAbstractItemView)
+from PySide6.QtCore import Qt
+
+from core.process_leaderboard import DEFAULT_TOP_K
+from core.qt_bridge import LeaderboardBridge
+
+SORT_OPTIONS = (
+    ('rss', "常驻内存 (RSS)"),
+    ('uss', "独占内存 (USS)"),
+    ('swap', "交换分区"),
+)
+COLUMNS = ("PID", "进程", "RSS", "USS", "交换")
+
+
+def _format_mb(value):
+    return "-" if value is None else f"{value / (1024 * 1024):.1f} MB"
+
+
+class ProcessPanel(QWidget):
+    def __init__(self, parent=None, rows=DEFAULT_TOP_K):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        header = QHBoxLayout()
+        header.addWidget(QLabel("内存占用最多的进程"))
+        header.addStretch()
+        self.sort_combo = QComboBox()
+        for key, text in SORT_OPTIONS:
+            self.sort_combo.addItem(text, key)
+        header.addWidget(self.sort_combo)
+        layout.addLayout(header)
+
+        self.table = QTableWidget(rows, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionMode(QAbstractItemView.NoSelection)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        for row in range(rows):
+            for column in range(len(COLUMNS)):
+                item = QTableWidgetItem()
+                if column != 1:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+        layout.addWidget(self.table)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        self.bridge = LeaderboardBridge(self)
+        self.bridge.updated.connect(self.update_rows)
+        self.sort_combo.setCurrentIndex(
+            max(self.sort_combo.findData(self.bridge.leaderboard.sort_key), 0))
+        self.sort_combo.currentIndexChanged.connect(self.on_sort_changed)
+
+    def on_sort_changed(self, index):
+        self.bridge.leaderboard.set_sort_key(self.sort_combo.itemData(index))
+
+    def update_rows(self, rows, stats):
+        table = self.table
+        for row in range(table.rowCount()):
+            if row < len(rows):
+                data = rows[row]
+                values = (str(data.pid), data.name, _format_mb(data.rss), _format_mb(data.uss), _format_mb(data.swap))
+            else:
+                values = ("",) * len(COLUMNS)
+            for column, text in enumerate(values):
+                item = table.item(row, column)
+                if item.text() != text:
+                    item.setText(text)
+        if stats is not None:
+            text = f"共 {stats.processes} 个进程，本次读取 {stats.scanned} 个，耗时 {stats.cpu_ms:.1f} ms"
+            if stats.pending:
+                text += f"，{stats.pending} 个待更新"
+            self.status_label.setText(text)
+
+    def showEvent(self, event):
+        self.bridge.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.bridge.stop()
+        super().hideEvent(event)
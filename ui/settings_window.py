@@ -10,10 +10,12 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QCheckBox,
                                QLabel, QSpinBox, QPushButton, QGroupBox,
                                QRadioButton)
 from PySide6.QtCore import Qt, Signal
-from core.config_manager import load_config, save_config
+from core.config_manager import load_config, get_config_store
 
 class SettingsWindow(QWidget):
     settings_saved = Signal()
+    # 窗口被隐藏时发出，应用据此在空闲一段时间后释放窗口
+    hidden = Signal()
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -51,7 +53,7 @@ class SettingsWindow(QWidget):
         self.enable_checkbox.stateChanged.connect(self.toggle_controls)
         group_layout.addWidget(self.enable_checkbox)
         interval_layout = QHBoxLayout()
-        interval_layout.addWidget(QLabel("当内存占用超过阈值时，每隔"))
+        interval_layout.addWidget(QLabel("两次自动清理之间至少间隔"))
         self.interval_spinbox = QSpinBox()
         self.interval_spinbox.setMinimum(1)
         self.interval_spinbox.setMaximum(120)
@@ -98,14 +100,14 @@ class SettingsWindow(QWidget):
         self.toggle_controls()
 
     def save_and_close(self):
-        config = {
+        # 只更新本窗口展示的配置项，其余配置保持不变；应用通过配置变更通知重新加载
+        get_config_store().update({
             "start_on_boot": self.startup_checkbox.isChecked(),
             "auto_clean_enabled": self.enable_checkbox.isChecked(),
             "clean_interval_minutes": self.interval_spinbox.value(),
             "mem_threshold_percent": self.threshold_spinbox.value(),
             "display_metric": "cpu" if self.cpu_radio.isChecked() else "mem"
-        }
-        save_config(config)
+        })
         self.settings_saved.emit()
         self.close()
 
@@ -117,3 +119,7 @@ class SettingsWindow(QWidget):
     def showEvent(self, event):
         self.load_settings()
         super().showEvent(event)
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.hidden.emit()
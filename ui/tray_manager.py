@@ -2,41 +2,23 @@
 
 """
 系统托盘图标管理模块 (最终视觉优化版)
-- 采用独立数据线程和阻塞式采样，数据与任务管理器完全同步。
+- 订阅共享采样总线，与主窗口、加速球使用同一份数据。
 - 根据用户配置，动态显示CPU或内存使用率。
 - 双击图标直接执行清理，单击无反应。
+- 图标只取决于 (显示指标, 整数百分比, 颜色档位)，每种状态只绘制一次并缓存；
+  状态不变时不调用 setIcon/setToolTip。字体或 DPI 变化时清空缓存。
 """
-import math
-import psutil
-import time
-from PySide6.QtWidgets import QSystemTrayIcon, QMenu
-from PySide6.QtCore import Qt, Signal, QTimer, QObject, QThread, QRect
-from PySide6.QtGui import QPainter, QColor, QFont, QIcon, QPixmap, QPen, QBrush
+from PySide6.QtWidgets import QSystemTrayIcon, QMenu, QApplication
+from PySide6.QtCore import Qt, Signal, QRect
+from PySide6.QtGui import QPainter, QColor, QFont, QIcon, QPixmap, QPen
 
 # 导入配置加载器和新的通知窗口
 from core.config_manager import load_config
+from core.qt_bridge import SamplerBridge
+from core import tracing
+from core.tracing import traced
 from .notification import NotificationWidget
-
-
-class StatsWorker(QObject):
-    """在独立线程中运行的数据采集器"""
-    stats_updated = Signal(float, float)
-
-    def __init__(self):
-        super().__init__()
-        self.running = True
-
-    def run(self):
-        """循环采集数据"""
-        while self.running:
-            cpu = psutil.cpu_percent(interval=1)
-            mem = psutil.virtual_memory().percent
-            if not self.running:
-                break
-            self.stats_updated.emit(cpu, mem)
-
-    def stop(self):
-        self.running = False
+from .utils import clean_action_text
 
 
 class TrayManager(QSystemTrayIcon):
@@ -57,31 +39,57 @@ class TrayManager(QSystemTrayIcon):
         self.progress_pen = QPen(QColor(), 5.5)
         self.text_pen = QPen(QColor(0, 0, 0))
 
+        # --- 图标缓存 ---
+        self._icon_cache = {}
+        self._icon_state = None
+        self._tooltip = None
+        self._last_values = (0, 0)
+        app = QApplication.instance()
+        if app is not None:
+            app.fontChanged.connect(self.invalidate_icon_cache)
+            app.primaryScreenChanged.connect(self._watch_screen)
+            self._watch_screen(app.primaryScreen())
+
         # --- 设置托盘菜单 ---
         self.menu = QMenu()
         self.menu.addAction("显示主窗口").triggered.connect(self.show_main_window_requested.emit)
         self.menu.addAction("设置").triggered.connect(self.show_settings_requested.emit)
         self.menu.addSeparator()
-        self.menu.addAction("一键加速 (Alt+Alt)").triggered.connect(self.cleanup_requested.emit)
+        self.clean_action = self.menu.addAction(clean_action_text(self.config))
+        self.clean_action.triggered.connect(self.cleanup_requested.emit)
         self.menu.addSeparator()
+        if tracing.is_enabled():
+            self.menu.addAction("导出性能追踪").triggered.connect(self.dump_trace)
+            self.menu.addSeparator()
         self.menu.addAction("退出").triggered.connect(self.stop_and_quit)
         self.setContextMenu(self.menu)
 
         self.activated.connect(self.on_activated)
 
-        # --- 创建并启动数据采集线程 ---
-        self.thread = QThread()
-        self.worker = StatsWorker()
-        self.worker.moveToThread(self.thread)
-        self.thread.started.connect(self.worker.run)
-        self.worker.stats_updated.connect(self.update_icon)
-        self.thread.start()
+        # --- 订阅共享采样器，托盘图标不要求固定分辨率，数值平稳时允许采样器放慢 ---
+        self.stats_bridge = SamplerBridge(self)
+        self.stats_bridge.stats_updated.connect(self.update_icon)
+        self.stats_bridge.start()
 
         self.update_icon(0, 0)
         self.show()
 
     def reload_config(self):
         self.config = load_config()
+        self.clean_action.setText(clean_action_text(self.config))
+        # 显示指标可能已改变，立即按最近一次数据刷新图标
+        self.update_icon(*self._last_values)
+
+    def _watch_screen(self, screen):
+        if screen is not None:
+            screen.logicalDotsPerInchChanged.connect(self.invalidate_icon_cache)
+            screen.physicalDotsPerInchChanged.connect(self.invalidate_icon_cache)
+
+    def invalidate_icon_cache(self, *_):
+        """字体或 DPI 变化后丢弃缓存的图标，并重新绘制当前图标"""
+        self._icon_cache.clear()
+        self._icon_state = None
+        self.update_icon(*self._last_values)
 
     def on_activated(self, reason):
         if reason == QSystemTrayIcon.ActivationReason.DoubleClick:
@@ -113,7 +121,17 @@ class TrayManager(QSystemTrayIcon):
         """【新】用于清空通知引用的槽函数"""
         self.current_notification = None
 
+    def dump_trace(self):
+        try:
+            path = tracing.dump_chrome_trace()
+        except OSError as e:
+            self.show_custom_notification(f"导出失败: {e}")
+            return
+        self.show_custom_notification(f"性能追踪已导出到 {path}")
+
+    @traced("tray.update_icon")
     def update_icon(self, cpu_val, mem_val):
+        self._last_values = (cpu_val, mem_val)
         display_metric = self.config.get("display_metric", "mem")
 
         if display_metric == "cpu":
@@ -121,6 +139,29 @@ class TrayManager(QSystemTrayIcon):
         else:
             primary_val, primary_name, secondary_val, secondary_name = mem_val, "内存", cpu_val, "CPU"
 
+        value = int(primary_val)
+        if value < 60:
+            band = "#27AE60"
+        elif value < 85:
+            band = "#F39C12"
+        else:
+            band = "#C0392B"
+
+        state = (display_metric, value, band)
+        if state != self._icon_state:
+            icon = self._icon_cache.get(state)
+            if icon is None:
+                icon = self._icon_cache[state] = self._render_icon(value, band)
+            self._icon_state = state
+            self.setIcon(icon)
+
+        tooltip = f"{primary_name}: {value}%\n{secondary_name}: {int(secondary_val)}%\n(双击加速)"
+        if tooltip != self._tooltip:
+            self._tooltip = tooltip
+            self.setToolTip(tooltip)
+
+    @traced("tray.render_icon")
+    def _render_icon(self, value, band):
         size = 64
         pixmap = QPixmap(size, size)
         pixmap.fill(self.bg_color)
@@ -131,30 +172,19 @@ class TrayManager(QSystemTrayIcon):
         painter.setPen(self.progress_bg_pen)
         painter.drawEllipse(rect)
 
-        if primary_val < 60:
-            self.progress_pen.setColor(QColor("#27AE60"))
-        elif primary_val < 85:
-            self.progress_pen.setColor(QColor("#F39C12"))
-        else:
-            self.progress_pen.setColor(QColor("#C0392B"))
-
+        self.progress_pen.setColor(QColor(band))
         painter.setPen(self.progress_pen)
-        span_angle = primary_val / 100.0 * 360 * 16
+        span_angle = int(value / 100.0 * 360 * 16)
         painter.drawArc(rect, 90 * 16, -span_angle)
 
         painter.setPen(self.text_pen)
         painter.setFont(self.font)
-        painter.drawText(rect, Qt.AlignCenter, str(int(primary_val)))
+        painter.drawText(rect, Qt.AlignCenter, str(value))
         painter.end()
-
-        self.setIcon(QIcon(pixmap))
-        self.setToolTip(f"{primary_name}: {int(primary_val)}%\n{secondary_name}: {int(secondary_val)}%\n(双击加速)")
+        return QIcon(pixmap)
 
     def stop_worker_thread(self):
-        if self.thread.isRunning():
-            self.worker.stop()
-            self.thread.quit()
-            self.thread.wait(1000)
+        self.stats_bridge.stop()
 
     def stop_and_quit(self):
         self.parent().instance().quit()
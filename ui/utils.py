@@ -6,6 +6,15 @@ UI相关的辅助工具模块
 
 from PySide6.QtWidgets import QMessageBox
 
+from core.hotkey_engine import describe_action
+
+
+def clean_action_text(config):
+    """“一键加速”菜单项和按钮的文字，括号中是配置里绑定到清理动作的热键。"""
+    keys = describe_action(config.get("hotkeys", {}), "clean")
+    return f"一键加速 ({keys})" if keys else "一键加速"
+
+
 def show_message(title, text, icon_type=QMessageBox.Information, parent=None):
     """
     显示一个简单的消息提示框。